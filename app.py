@@ -1,12 +1,32 @@
 import os
+import hmac
+import uuid
 import logging
 from urllib.parse import urlparse, parse_qs
-from flask import Flask, render_template, request, jsonify, Response, send_file
+from flask import Flask, render_template, request, jsonify, Response, send_file, redirect, url_for
 from werkzeug.middleware.proxy_fix import ProxyFix
-from scraper import process_all_cids_sequential, start_progress_ticker
+from scraper import process_all_cids_sequential
 from flask import Flask
 from scraper import print_file
+from price_quote import parse_price, compute_discount, same_currency
+from cids import SEARCH_CIDS, ALL_CIDS
+from page_text_store import clean_job_id, make_key
+from profiling import run_profiled, is_job_enabled
+from tracing import job_scope, span, instant
+from price_history import record_observation, cached_price
+from preflight import preflight
+from scheduler import get_scheduler, tenant_key
+from prefetch import claim_prefetch
+from deadline import Deadline, job_budget, cid_deadline, CID_MIN_SEC, STALE_MAX_AGE_SEC
+from scraper import extract_cid_from_url, canonical_url
+from cid_ranking import plan_cids, full_plan, should_stop
+from progress_tracker import start_job, resume_job, get_job, drop_job, job_progress, tracking
+from shared_state import reset_job_state, set_job_status, cancel_job, job_cancelled, job_state
+from shared_state import save_checkpoint, load_checkpoints
 from flask import session
+from flask.json.provider import DefaultJSONProvider
+from records import ScrapeResult, PriceEntry, CidResult, StepResult, EMPTY_RESULT, iter_ndjson
+import records
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,46 +34,101 @@ logging.basicConfig(level=logging.INFO)
 global_base_price = None
 global_base_price_cid_name = ''
 global_page_title = ''
-is_cancelled = False  # 분석 중단 플래그
 
 # create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "default_secret_key_for_development")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """jsonify/request.get_json 을 records.dumps/loads 로 - 레코드(StepResult 등)를 그대로 넘기고, orjson 이 있으면 orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return records.dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return records.loads(s)
+
+
+app.json = RecordJSONProvider(app)
+
 logging.getLogger("werkzeug").setLevel(logging.WARNING)  # INFO 로그 숨김
 
-def _start_ticker_once():
-    # 개발 서버(reloader) 중복 실행 회피는 필요 시 추가
-    start_progress_ticker(logger=app.logger)
+# 템플릿에서 asset_url('script.js') → 해시가 붙은 /assets/ 경로 (assets.py)
+from assets import asset_url
+app.jinja_env.globals['asset_url'] = asset_url
 
 @app.route('/')
 def index():
     """Main page with URL input form"""
     return render_template('index.html')
 
+def _profile_requested(data, job_id):
+    """X-Profile 헤더 / JSON profile: true (관리자 토큰이 있을 때만) / 관리 페이지에서 켠 job_id"""
+    opted_in = request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes') or data.get('profile') is True
+    if opted_in and _admin_allowed():
+        return True
+    return is_job_enabled(job_id)
+
 @app.route('/scrape', methods=['POST'])
 def scrape():
     """Handle single CID scraping request"""
+    data = request.get_json(silent=True) or {}
+    step = data.get('step', 0)
+
+    # 분석 1회(step 0 ~ 끝)를 묶는 job id - 다운로드 파일, 트레이스 등의 네임스페이스
+    job_id = clean_job_id(data.get('job_id'))
+    if not job_id:
+        job_id = session.get('job_id') if step != 0 else None
+        job_id = job_id or uuid.uuid4().hex[:16]
+    session['job_id'] = job_id
+
+    with job_scope(job_id, step=step):
+        instant('admission', step=step)
+        if _profile_requested(data, job_id):
+            return run_profiled('scrape', _scrape, job_id, job_id=job_id)
+        return _scrape(job_id)
+
+# 단계를 이어 가는 데 필요한 세션 값 - 체크포인트에 함께 저장해 다른 워커/재접속에서도 복원
+CHECKPOINT_SESSION_KEYS = ('cid_plan', 'fast_state', 'base_price', 'base_currency', 'base_price_cid_name',
+                           'base_page_title', 'job_deadline')
+
+def _checkpoint_state():
+    return {key: session.get(key) for key in CHECKPOINT_SESSION_KEYS if key in session}
+
+def _restore_session(state):
+    for key, value in (state or {}).items():
+        session[key] = value
+
+def _job_progress(job_id, finished=False, status='done'):
+    """단계 응답에 싣는 진행률 (중단으로 job 이 지워졌으면 완료로 본다)"""
+    tracker = get_job(job_id)
+    if tracker is None:
+        return {'pct': 100, 'msg': '', 'eta': None}
+    if finished:
+        tracker.finish()
+        set_job_status(job_id, status)
+    return tracker.snapshot()
+
+def _request_tenant():
+    """스크래핑 자리를 공정하게 나누는 단위 - X-API-Key 가 있으면 키(해시), 없으면 접속 주소"""
+    return tenant_key(request.headers.get('X-API-Key'), request.remote_addr)
+
+def _scrape(job_id):
     try:
-        # 중단 플래그 확인
-        global is_cancelled
-
-        app.logger.info(f"is_cancelled: {is_cancelled}")
-
         data = request.get_json()
         url = data.get('url', '').strip()
         step = data.get('step', 0)
+        tenant = _request_tenant()
 
-        # 새 시작은 언제나 취소 플래그 무시하고 초기화
+        # 중단 플래그는 job 단위로 공유 상태(shared_state.py)에 있다 - /cancel 이 다른 워커로 가도 반영
         if step == 0:
-            is_cancelled = False
-            app.logger.info("새로운 분석 시작 - 중단 플래그 초기화")
-        else:
+            reset_job_state(job_id)
+            app.logger.info(f"새로운 분석 시작: job {job_id}")
+        elif job_cancelled(job_id):
             # 진행 중 단계에서만 취소 반영
-            if is_cancelled:
-                is_cancelled = False
-                return jsonify({'status': 'cancelled', 'message': '분석이 중단되었습니다.'}), 200
+            return jsonify({'status': 'cancelled', 'message': '분석이 중단되었습니다.'}), 200
 
         if not url:
             return jsonify({'error': 'URL을 입력해주세요'}), 400
@@ -62,43 +137,52 @@ def scrape():
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
 
-        # [검색창리스트] CID 값들
-        search_cids = [
-            ('-1', '시크릿창'),
-            ('1829968', '구글지도A'),
-            ('1917614', '구글지도B'),
-            ('1833981', '구글지도C'),
-            ('1776688', '구글 검색A'),
-            ('1922868', '구글 검색B'),
-            ('1908612', '구글 검색C'),
-            ('1807747', 'VIO'),
-            ('1838029', '호텔스컴바인'),
-            ('1928503', 'BluePillow'),
-            ('1729890', '네이버'),
-            ('1587497', 'TripAdvisor')
-        ]
-
-        # [카드리스트] CID 값들
-        card_cids = [
-            ('1942636', '카카오페이'),
-            ('1895693', '현대카드'),
-            ('1563295', '국민카드'),
-            ('1654104', '우리카드'),
-            ('1748498', 'BC카드'),
-            ('1760133', '신한카드'),
-            ('1729471', '하나카드'),
-            ('1917334', '토스'),
-            ('1783115', '삼성카드'),
-            ('1827579', '농협카드'),
-            ('1917349', '트레블월렛'),
-            ('1845157', '페이코'),
-            ('1889319', '비자'),
-            ('1889572', '마스터카드'),
-            ('1801110', '유니온페이')
-        ]
+        # 브라우저를 쓰기 전에 링크 검사 - 잘못된 링크는 크롬 없이 바로 거절 (preflight.py)
+        if step == 0:
+            with span('preflight'):
+                checked = preflight(url)
+            if not checked.ok:
+                app.logger.info(f"사전 검사 거절: {checked.reason} - {url}")
+                set_job_status(job_id, 'invalid_link')
+                return jsonify({'error': checked.reason, 'error_type': 'invalid_link', 'step': 0,
+                                'job_id': job_id}), 400
+            if checked.hotel_id:
+                app.logger.info(f"사전 검사 통과: hotel id {checked.hotel_id}{' (캐시)' if checked.cached else ''}")
+
+        # 이미 끝난 단계면 저장된 결과를 바로 재생 (워커 재시작 / 클라이언트 재접속 후 같은 job 으로 다시 요청)
+        url_key = canonical_url(url)
+        saved = load_checkpoints(job_id, url_key, step)
+        if saved:
+            _restore_session(saved[0]['state'])
+            app.logger.info(f"체크포인트 재생: job {job_id} step {step}")
+            return jsonify(dict(saved[0]['result'], replayed=True))
+        if step != 0 and not session.get('cid_plan'):
+            # 세션이 없는 요청 - 마지막 체크포인트 시점의 계획/기준가로 이어서 진행
+            previous = load_checkpoints(job_id, url_key)
+            if previous:
+                _restore_session(previous[-1]['state'])
+
+        search_cids = SEARCH_CIDS
+        search_cid_values = {cid for cid, _ in search_cids}
+
+        # 이번 분석의 CID 순서 - 빠른 모드: 과거 기록 기반 순위 + 조기 종료 / 전체 모드: 기존 순서 전체
+        if step == 0:
+            mode = data.get('mode') if data.get('mode') in ('fast', 'full') else 'fast'
+            plan = plan_cids(url, mode).to_session()
+            session['cid_plan'] = plan
+            session['fast_state'] = {'checked': 0, 'since_improvement': 0, 'best_price': None, 'best_currency': None}
+            # 분석 전체 시간 예산 - 단계마다 남은 예산을 남은 CID 에 나눠 준다 (deadline.py)
+            session['job_deadline'] = Deadline.after(job_budget(data.get('budget_sec'))).at
+        else:
+            plan = session.get('cid_plan') or full_plan().to_session()
+        all_cids = [tuple(c) for c in plan['order']]
+        job_deadline = Deadline(session['job_deadline']) if session.get('job_deadline') else Deadline.after(job_budget())
 
-        # 모든 CID를 합친 리스트
-        all_cids = search_cids + card_cids
+        # job 진행률/ETA - 기준가 1건 + 남은 CID (다른 워커에서 시작된 job 이면 남은 CID 로 새로 만든다)
+        if step == 0:
+            start_job(job_id, [extract_cid_from_url(url)] + [cid for cid, _ in all_cids], url)
+        elif get_job(job_id) is None:
+            resume_job(job_id, [cid for cid, _ in all_cids[step - 1:]], url)
 
         # 유효한 단계인지 확인 (step 0는 기준가격만 설정)
         if step >= len(all_cids) + 1:
@@ -111,7 +195,8 @@ def scrape():
             current_cid, current_name = all_cids[step - 1]  # step 1: all_cids[0], step 2: all_cids[1] ...
 
         # URL에서 CID 교체하고 currencyCode 유지
-        from scraper import extract_cid_from_url, scrape_prices_simple, reorder_url_parameters, set_progress, get_progress_state
+        from scraper import replace_cid_in_url, reorder_url_parameters
+        from async_orchestrator import scrape_url
         from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
         import re
 
@@ -121,17 +206,19 @@ def scrape():
         if currency_match:
             original_currency = currency_match.group(1)
 
+        # 통화 기호 없이 숫자만 있는 가격(StickyNavPrice 등)에 붙일 통화 코드
+        price_currency = original_currency
+        if not price_currency:
+            currency_param = re.search(r'[?&]currency=([^&]+)', reorder_url_parameters(url))
+            price_currency = currency_param.group(1) if currency_param else None
+
         original_cid = extract_cid_from_url(url)
 
         # step이 0이면 원본 URL 사용, 1 이상이면 CID 교체
         if step == 0:
             new_url = url  # 원본 URL 그대로 사용
         else:
-            if original_cid:
-                new_url = url.replace(f"cid={original_cid}", f"cid={current_cid}")
-            else:
-                separator = "&" if "?" in url else "?"
-                new_url = f"{url}{separator}cid={current_cid}"
+            new_url = replace_cid_in_url(url, current_cid)
 
         # currencyCode가 바뀌었다면 원본으로 복원
         if original_currency:
@@ -158,7 +245,7 @@ def scrape():
             is_search_phase = False  # 기준가격은 검색창 리스트에 표시하지 않음
             phase_name = "기준가격 설정"
         else:
-            is_search_phase = step <= len(search_cids)  # step 1부터 search_cids 처리
+            is_search_phase = current_cid in search_cid_values
             phase_name = "검색창리스트" if is_search_phase else "카드리스트"
 
         app.logger.info(f"Processing 스텝 {step+1}/{len(all_cids) + 1}: CID {current_name}({current_cid})")
@@ -177,7 +264,7 @@ def scrape():
                 # 원본 URL에 CID가 있으면 그것으로 기준 가격 추출
                 base_url = url  # 원본 URL 사용
                 # 원본 CID의 이름 찾기
-                for cid_value, cid_name in all_cids:
+                for cid_value, cid_name in ALL_CIDS:
                     if cid_value == original_cid:
                         global_base_price_cid_name = cid_name
                         break
@@ -190,9 +277,6 @@ def scrape():
 
             base_url_new = reorder_url_parameters(base_url)
 
-            from scraper import set_progress
-            set_progress(0, f"{current_name} 시작")
-
             # 기준 가격 스크래핑
             import time
             start_time = time.time()
@@ -200,59 +284,78 @@ def scrape():
 
             print_file(f"기준 가격 스크래핑 시작")
             
-            base_resp = scrape_prices_simple(
-                base_url_new,
-                original_currency_code=original_currency,
-                progress_cb=lambda pct, msg=None: set_progress(pct, f"기준가 {msg or ''}".strip())
-            )
-
-            global_page_title = base_resp.get('page_title', '')
+            # 기준가는 예산이 모자라도 조회 (비교의 기준이므로)
+            base_deadline = cid_deadline(job_deadline, len(all_cids) + 1) or Deadline.after(CID_MIN_SEC)
+            with job_scope(cid=original_cid or current_cid), span('cid', phase='base'), \
+                    tracking(job_id, original_cid, '기준가'):
+                # 링크를 붙여 넣을 때 미리 시작한 조회가 있으면 그 결과 (prefetch.py)
+                base_resp = claim_prefetch(base_url_new)
+                if base_resp is not None and base_resp.prices:
+                    instant('prefetch_hit', cid=original_cid)
+                else:
+                    base_resp = scrape_url(
+                        base_url_new,
+                        original_currency_code=original_currency,
+                        job_id=job_id,
+                        deadline=base_deadline,
+                        lane='interactive',
+                        tenant=tenant
+                    )
+
+            global_page_title = base_resp.page_title
             app.logger.info(f"page title : {global_page_title}")
             print_file(f"page title : {global_page_title}")
 
             
-            base_prices = base_resp.get('prices', [])
-            
+            base_prices = base_resp.prices
+            base_quote = None
+
             if base_prices:
                 base_price_str = base_prices[0]['price']
-                # 숫자만 추출하여 기준 가격 설정
-                import re
-                base_price_match = re.search(r'[\d,]+', base_price_str)
-                if base_price_match:
-                    global_base_price = int(base_price_match.group().replace(',', ''))
-                    app.logger.info(f"기준 가격 설정: {base_price_str} ({global_base_price}) - {global_base_price_cid_name}")
-                    print_file(f"기준 가격 설정: {base_price_str} ({global_base_price}) - {global_base_price_cid_name}")
-                    session['base_price'] = global_base_price
+                # 통화 코드와 소수점까지 포함해 정확히 파싱
+                base_quote = parse_price(base_price_str, default_currency=price_currency)
+                if base_quote:
+                    global_base_price = float(base_quote.amount)
+                    app.logger.info(f"기준 가격 설정: {base_price_str} ({base_quote.amount} {base_quote.currency}) - {global_base_price_cid_name}")
+                    print_file(f"기준 가격 설정: {base_price_str} ({base_quote.amount} {base_quote.currency}) - {global_base_price_cid_name}")
+                    session['base_price'] = str(base_quote.amount)
+                    session['base_currency'] = base_quote.currency
                     session['base_price_cid_name'] = global_base_price_cid_name
                     session['base_page_title'] = global_page_title
+                    session['fast_state'] = {'checked': 0, 'since_improvement': 0,
+                                             'best_price': str(base_quote.amount), 'best_currency': base_quote.currency}
+                record_observation(job_id=job_id, url=base_url_new, cid=original_cid,
+                                   cid_name=global_base_price_cid_name, phase='base',
+                                   base_price=base_quote.amount if base_quote else None,
+                                   price=base_quote.amount if base_quote else None,
+                                   currency=base_quote.currency if base_quote else price_currency,
+                                   latency=time.time() - start_time)
 
         # step이 0이면 기준가격만 설정하고 바로 리턴
         if step == 0:
-            progress = get_progress_state()
-            result = {
-                'step': step + 1,
-                'total_steps': len(all_cids) + 1,  # step 0도 포함
-                'cid': None,
-                'cid_name': current_name,
-                'url': new_url,
-                'prices': [],
-                'found_count': 0,
-                'process_time': 0,
-                'has_next': True,
-                'next_step': 1,
-                'is_search_phase': is_search_phase,
-                'phase_name': phase_name,
-                'search_phase_completed': False,
-                'download_link': None,
-                'download_filename': None,
-                'base_price': global_base_price,
-                'base_price_cid_name': global_base_price_cid_name,
-                'current_price': None,
-                'discount_percentage': None,
-                'subprogress_pct': progress.get('pct', 100),
-                'subprogress_msg': progress.get('msg', '기준가격 설정 완료'),
-                'page_title': global_page_title
-            }
+            progress = _job_progress(job_id, finished=not all_cids)
+            result = StepResult(
+                step=step + 1,
+                job_id=job_id,
+                total_steps=len(all_cids) + 1,  # step 0도 포함
+                # 기준가 단계의 가격은 base_price 로만 보낸다 (prices 는 비움)
+                result=CidResult(cid=None, cid_name=current_name, url=new_url, currency=price_currency,
+                                 result=ScrapeResult(page_title=global_page_title, rooms=base_resp.rooms)),
+                has_next=bool(all_cids),
+                next_step=1 if all_cids else None,
+                next_cid_name=all_cids[0][1] if all_cids else None,
+                mode=plan['mode'],
+                is_search_phase=is_search_phase,
+                phase_name=phase_name,
+                base_price=global_base_price,
+                base_price_cid_name=global_base_price_cid_name,
+                subprogress_pct=progress['pct'],
+                subprogress_msg='기준가격 설정 완료',
+                eta=progress['eta'],
+                budget_remaining=round(job_deadline.remaining(), 1),
+            )
+            instant('emit', cid=original_cid, found_count=len(base_prices))
+            save_checkpoint(job_id, url_key, step, original_cid, result, _checkpoint_state())
             return jsonify(result)
 
         # 현재 CID 스크래핑 실행 (step 1 이상에서만)
@@ -260,98 +363,159 @@ def scrape():
         start_time = time.time()
         #time.sleep(1)
         print_file(f"현재 CID 스크래핑 시작: {current_cid}")
-        resp = scrape_prices_simple(
-            new_url,
-            original_currency_code=original_currency,
-            progress_cb=lambda pct, msg=None: set_progress(pct, f"{current_name} {msg or ''}".strip())
-        )
-        # 실패 시 1회 재시도 그대로 유지
-        if len(resp.get('prices', [])) == 0:
-            resp = scrape_prices_simple(
-                new_url,
-                original_currency_code=original_currency,
-                progress_cb=lambda pct, msg=None: set_progress(pct, f"{current_name} {msg or ''}".strip())
-            )
+        page_text_key = make_key(job_id, url, current_cid)
+        # 남은 예산을 남은 CID 수로 나눈 이번 CID 의 마감 - None 이면 예산 부족으로 스크래핑하지 않는다
+        deadline = cid_deadline(job_deadline, len(all_cids) - step + 1)
+        stale, dropped, cached_at = False, False, None
+        if deadline is None:
+            with tracking(job_id, current_cid, current_name):   # 진행률은 이 CID 를 끝난 것으로
+                cached = cached_price(new_url, current_cid, STALE_MAX_AGE_SEC)
+                if cached:
+                    stale, cached_at = True, cached['ts']
+                    cached_str = f"{cached['currency']} {cached['price']}" if cached['currency'] else cached['price']
+                    resp = ScrapeResult(prices=(PriceEntry(
+                        cached_str, f"캐시 {time.strftime('%m-%d %H:%M', time.localtime(cached_at))}", 'cache'),))
+                else:
+                    dropped = True
+                    resp = EMPTY_RESULT
+            app.logger.info(f"예산 부족으로 스크래핑 생략: CID {current_name}({current_cid}) - "
+                            f"{'캐시 가격 사용' if stale else '결과 없음'}")
+            instant('budget_skip', cid=current_cid, stale=stale)
+        else:
+            with tracking(job_id, current_cid, current_name):
+                with job_scope(cid=current_cid), span('cid', phase=phase_name):
+                    resp = scrape_url(
+                        new_url,
+                        original_currency_code=original_currency,
+                        page_text_key=page_text_key,
+                        job_id=job_id,
+                        deadline=deadline,
+                        lane='interactive',
+                        tenant=tenant
+                    )
+                # 실패 시 1회 재시도 (이번 CID 마감 안에서 한 번 더 돌 시간이 있을 때만)
+                if not resp.prices and deadline.remaining() >= CID_MIN_SEC:
+                    with job_scope(cid=current_cid), span('retry', phase=phase_name):
+                        resp = scrape_url(
+                            new_url,
+                            original_currency_code=original_currency,
+                            page_text_key=page_text_key,
+                            job_id=job_id,
+                            deadline=deadline,
+                            lane='interactive',
+                            tenant=tenant
+                        )
 
         global_base_price = session.get('base_price')
+        global_base_price = float(global_base_price) if global_base_price is not None else None
         global_base_price_cid_name = session.get('base_price_cid_name', '')
         global_page_title = session.get('base_page_title', '')
 
-        prices = resp.get('prices', [])
-        global_page_title = resp.get('page_title', '')
+        prices = resp.prices
+        global_page_title = resp.page_title
 
         process_time = time.time() - start_time
 
-        # 텍스트 파일 다운로드 링크 생성
-        download_filename = f"page_text_cid_{current_cid}.txt"
-        download_link = f"/download/{download_filename}"
+        # 텍스트 파일 다운로드 링크 생성 (job / 호텔별 네임스페이스) - 페이지 텍스트가 저장소에 들어간 경우만
+        # (페이지 로드 실패/빈 페이지/예외로 끝난 스크래핑은 저장한 텍스트가 없다)
+        scraped = deadline is not None
+        download_filename = page_text_key.split('/', 1)[1] if resp.page_text else None
+        download_link = f"/download/{page_text_key}" if resp.page_text else None
 
         # 할인율 계산
         discount_percentage = None
         current_price = None
+        current_quote = None
 
         print(f"global_base_price: {global_base_price}")
         print_file(f"global_base_price: {global_base_price}")
         print(f"prices: {prices}")
         print_file(f"prices: {prices}")
         
-        if prices and global_base_price:
+        if prices and global_base_price is not None:
             current_price_str = prices[0]['price']
-            # 숫자만 추출
-            import re
-            current_price_match = re.search(r'[\d,]+', current_price_str)
-            print(f"current_price_match: {current_price_match}")
-            if current_price_match:
-                current_price = int(current_price_match.group().replace(',', ''))
+            base_quote = parse_price(session.get('base_price'), default_currency=session.get('base_currency'))
+            current_quote = parse_price(current_price_str, default_currency=price_currency)
+            if current_quote:
+                current_price = float(current_quote.amount)
 
                 print(f"current_price: {current_price}")
                 print_file(f"current_price: {current_price}")
-                
-                if current_price < global_base_price:
-                    discount_percentage = round(((global_base_price - current_price) / global_base_price) * 100, 1)
-                    app.logger.info(f"할인율: {discount_percentage}% (기준: {global_base_price}, 현재: {current_price})")
-                elif current_price > global_base_price:
-                    # 더 비싼 경우 음수로 표시 (예: -5%)
-                    discount_percentage = round(((global_base_price - current_price) / global_base_price) * 100, 1)
-                    app.logger.info(f"가격 상승: {discount_percentage}% (기준: {global_base_price}, 현재: {current_price})")
-                else:
-                    discount_percentage = 0
+
+                # 저렴하면 양수, 더 비싼 경우 음수로 표시 (예: -5%)
+                discount_percentage = compute_discount(base_quote, current_quote)
+                app.logger.info(f"할인율: {discount_percentage}% (기준: {base_quote.amount}, 현재: {current_quote.amount} {current_quote.currency})")
 
                 print(f"discount_percentage: {discount_percentage}")
                 print_file(f"discount_percentage: {discount_percentage}")
 
-        progress = get_progress_state()
+        # 가격 이력 기록 (캐시로 대신한 결과는 새 관측이 아니므로 제외) + 빠른 모드 조기 종료 판단
+        if scraped:
+            record_observation(job_id=job_id, url=new_url, cid=current_cid, cid_name=current_name,
+                               phase=phase_name, base_price=session.get('base_price'),
+                               price=current_quote.amount if current_quote else None,
+                               currency=current_quote.currency if current_quote else price_currency,
+                               discount=discount_percentage, latency=process_time)
+
+        fast_state = dict(session.get('fast_state') or {'checked': 0, 'since_improvement': 0, 'best_price': None})
+        fast_state['checked'] += 1
+        # 최저가는 같은 통화끼리만 비교 (예전 세션의 fast_state 에는 best_currency 가 없다 → 기준 통화)
+        best_currency = fast_state.get('best_currency') or session.get('base_currency')
+        best = parse_price(fast_state['best_price'], default_currency=best_currency) if fast_state['best_price'] else None
+        comparable = current_quote is not None and (best is None or same_currency(best.currency, current_quote.currency))
+        if comparable and (best is None or current_quote.amount < best.amount):
+            fast_state['best_price'] = str(current_quote.amount)
+            fast_state['best_currency'] = current_quote.currency
+            fast_state['since_improvement'] = 0
+        else:
+            fast_state['since_improvement'] += 1
+        session['fast_state'] = fast_state
+
+        has_next = step < len(all_cids)
+        stopped_early = has_next and plan['early_stop'] and should_stop(fast_state['checked'], fast_state['since_improvement'])
+        if stopped_early:
+            has_next = False
+            app.logger.info(f"빠른 모드 조기 종료: {fast_state['checked']}개 확인, {len(all_cids) - step}개 생략")
+        next_cid = all_cids[step] if has_next else None
+
+        progress = _job_progress(job_id, finished=not has_next, status='stopped_early' if stopped_early else 'done')
 
         print(f"progress: {progress}")
         print(f"step: {step}")
         print(f"len(all_cids): {len(all_cids)}")
                 
         # 결과 반환
-        result = {
-            'step': step + 1,
-            'total_steps': len(all_cids) + 1,  # step 0도 포함
-            'cid': current_cid,
-            'cid_name': current_name,
-            'url': new_url,
-            'prices': prices,
-            'found_count': len(prices),
-            'process_time': round(process_time, 1),
-            'has_next': step + 1 <= len(all_cids),  # step이 len(all_cids)까지 가능
-            'next_step': step + 1 if step + 1 <= len(all_cids) else None,
-            'is_search_phase': is_search_phase,
-            'phase_name': phase_name,
-            'search_phase_completed': step == len(search_cids),  # step이 search_cids 길이와 같을 때 완료
-            'download_link': download_link,
-            'download_filename': download_filename,
-            'base_price': global_base_price,
-            'base_price_cid_name': global_base_price_cid_name,
-            'current_price': current_price,
-            'discount_percentage': discount_percentage,
-            'subprogress_pct': progress.get('pct', 0),
-            'subprogress_msg': progress.get('msg', ''),
-            'page_title': global_page_title
-        }
+        result = StepResult(
+            step=step + 1,
+            job_id=job_id,
+            total_steps=len(all_cids) + 1,  # step 0도 포함
+            result=CidResult(cid=current_cid, cid_name=current_name, url=new_url, result=resp, quote=current_quote,
+                             currency=price_currency, discount=discount_percentage,
+                             process_time=round(process_time, 1), phase=phase_name,
+                             stale=stale, cached_at=cached_at, dropped=dropped),
+            has_next=has_next,
+            next_step=step + 1 if has_next else None,
+            next_cid_name=next_cid[1] if next_cid else None,
+            mode=plan['mode'],
+            stopped_early=stopped_early,
+            skipped_count=len(all_cids) - step if stopped_early else 0,
+            equivalent_cids=tuple(name for _, name in plan['members'].get(current_cid, [])),
+            budget_remaining=round(job_deadline.remaining(), 1),
+            is_search_phase=is_search_phase,
+            phase_name=phase_name,
+            # 카드 CID 결과이거나 다음 CID 가 검색창리스트가 아니면(또는 끝이면) 카드 결과 영역을 연다
+            search_phase_completed=not is_search_phase or next_cid is None or next_cid[0] not in search_cid_values,
+            download_link=download_link,
+            download_filename=download_filename,
+            base_price=global_base_price,
+            base_price_cid_name=global_base_price_cid_name,
+            subprogress_pct=progress['pct'],
+            subprogress_msg=progress['msg'],
+            eta=progress['eta'],
+        )
 
+        instant('emit', cid=current_cid, found_count=len(prices), discount=discount_percentage)
+        save_checkpoint(job_id, url_key, step, current_cid, result, _checkpoint_state())
         return jsonify(result)
 
     except Exception as e:
@@ -366,21 +530,37 @@ def guide():
     lang = request.args.get('lang', 'ko')  # 기본값은 한국어
     return render_template('guide.html', lang=lang)
 
-@app.route('/download/<filename>')
-def download_file(filename):
-    """텍스트 파일 다운로드 엔드포인트"""
+@app.route('/download/<path:key>')
+def download_file(key):
+    """텍스트 파일 다운로드 엔드포인트 (압축 저장본을 스트리밍으로 전달)"""
     try:
-        import os
-        file_path = os.path.join('downloads', filename)
+        from page_text_store import get_store, is_valid_key
+        from flask import stream_with_context
 
-        if not os.path.exists(file_path):
+        if not is_valid_key(key):
             return jsonify({'error': '파일을 찾을 수 없습니다'}), 404
 
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/plain; charset=utf-8'
+        store = get_store()
+        path, codec = store.find(key)
+        if path is None:
+            # 스크래핑이 페이지를 받지 못했거나(로드 실패/빈 페이지) 저장본이 정리된 경우
+            return jsonify({'error': '이 CID 의 페이지 텍스트가 없습니다 (페이지를 불러오지 못했거나 보관 기간이 지났습니다)'}), 404
+
+        filename = key.split('/', 1)[1]
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+
+        # gzip 저장본이고 클라이언트가 gzip 을 받으면 압축 그대로 전달
+        if codec == 'gzip' and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            headers['Vary'] = 'Accept-Encoding'
+            body = store.iter_raw(path)
+        else:
+            body = store.iter_text(path, codec)
+
+        return Response(
+            stream_with_context(body),
+            mimetype='text/plain; charset=utf-8',
+            headers=headers
         )
 
     except Exception as e:
@@ -402,17 +582,227 @@ def split_view_page():
     """분할 뷰 페이지 라우트"""
     return send_file('static/pages/split_view.html')
 
+@app.route('/sweep')
+def sweep_page():
+    """체크인 날짜 스윕 페이지"""
+    return render_template('sweep.html')
+
+@app.route('/sweep/start', methods=['POST'])
+def sweep_start():
+    """날짜 × CID 스윕 시작"""
+    from sweep import start_sweep, SweepBusyError
+    try:
+        data = request.get_json() or {}
+        url = (data.get('url') or '').strip()
+        if not url:
+            return jsonify({'error': 'URL을 입력해주세요'}), 400
+        # 날짜는 스윕이 정하므로 구조만 검사
+        checked = preflight(url if url.startswith(('http://', 'https://')) else 'https://' + url, require_dates=False)
+        if not checked.ok:
+            return jsonify({'error': checked.reason, 'error_type': 'invalid_link'}), 400
+        los_list = data.get('los_list') or None
+        job = start_sweep(
+            url,
+            start_date=data.get('start_date') or None,
+            days=int(data.get('days', 7)),
+            los_list=los_list,
+            profile=data.get('profile') is True and _admin_allowed(),
+            # 예약 갱신은 'scheduled', 그 밖의 스윕은 'bulk' - 어느 쪽이든 /scrape(interactive) 보다 뒤
+            lane='scheduled' if data.get('priority') == 'scheduled' else 'bulk',
+            tenant=_request_tenant(),
+        )
+        return jsonify({'job_id': job.id, 'total': len(job.cells)})
+    except SweepBusyError as e:
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error starting sweep: {str(e)}")
+        return jsonify({'error': f'스윕 시작 실패: {str(e)}'}), 500
+
+@app.route('/prefetch', methods=['POST'])
+def prefetch_link():
+    """링크를 붙여 넣은 직후의 힌트 - 사전 검사 + 브라우저 준비 + 기준가 추측 조회 (결과는 step 0 이 가져간다)"""
+    from prefetch import prefetch_enabled, get_prefetcher, prefetch_key
+    from browser_pool import get_pool
+    if not prefetch_enabled():
+        return jsonify({'status': 'disabled'})   # 페이지는 더 보내지 않는다
+    data = request.get_json(silent=True) or {}
+    url = (data.get('url') or '').strip()
+    if not url:
+        return jsonify({'status': 'ignored'})
+    url = prefetch_key(url)
+    if not get_prefetcher().accepts(url):
+        return jsonify({'status': 'busy'})   # 자리가 없으면 사전 검사/브라우저 준비도 하지 않는다
+    checked = preflight(url)   # 결과는 캐시에 남아 step 0 의 검사가 바로 끝난다
+    if not checked.ok:
+        return jsonify({'status': 'invalid_link', 'error': checked.reason})
+    get_pool().warm(timeout=0)   # 기다리지 않고 빈 자리만 채우기 시작
+    return jsonify({'status': get_prefetcher().start(url, tenant=_request_tenant())}), 202
+
+@app.route('/sweep/<job_id>', methods=['GET'])
+def sweep_status(job_id):
+    """스윕 진행 상황 + 달력 행렬 (cursor 이후 새 결과만)"""
+    from sweep import get_sweep
+    job = get_sweep(job_id)
+    if job is None:
+        # 다른 워커에서 실행 중인 스윕 - 결과는 그 워커에만 있으므로 상태/개수만
+        state = job_state(job_id)
+        if state is None or state['kind'] != 'sweep':
+            return jsonify({'error': '스윕 작업을 찾을 수 없습니다'}), 404
+        progress = state['progress'] or {}
+        return jsonify({'job_id': job_id, 'status': state['status'], 'total': progress.get('total'),
+                        'done': progress.get('done', 0), 'remote': True})
+    cursor = request.args.get('cursor', 0, type=int)
+    compact = request.args.get('format') == 'compact'
+    try:
+        return jsonify(job.to_dict(cursor, compact=compact))
+    except ValueError as e:
+        # 통화가 섞인 결과는 금액끼리 비교할 수 없다 - 결과는 그대로, 달력만 빼고
+        body = job.to_dict(cursor, compact=compact, calendar=False)
+        body['calendar_error'] = str(e)
+        return jsonify(body)
+
+@app.route('/sweep/<job_id>/results.ndjson', methods=['GET'])
+def sweep_results_stream(job_id):
+    """스윕 셀 결과를 한 줄에 하나씩 (cursor 이후) - 큰 스윕도 응답 전체를 메모리에 만들지 않는다"""
+    from sweep import get_sweep
+    from flask import stream_with_context
+    job = get_sweep(job_id)
+    if job is None:
+        return jsonify({'error': '스윕 작업을 찾을 수 없습니다'}), 404
+    cursor = request.args.get('cursor', 0, type=int)
+    return Response(stream_with_context(iter_ndjson(job.results_since(cursor))), mimetype='application/x-ndjson')
+
+@app.route('/sweep/<job_id>/cancel', methods=['POST'])
+def sweep_cancel(job_id):
+    from sweep import get_sweep
+    job = get_sweep(job_id)
+    if job is not None:
+        job.cancel()
+    else:
+        state = job_state(job_id)
+        if state is None or state['kind'] != 'sweep':
+            return jsonify({'error': '스윕 작업을 찾을 수 없습니다'}), 404
+        cancel_job(job_id)
+    return jsonify({'status': 'cancelled', 'message': '스윕이 중단되었습니다.'})
+
+@app.route('/jobs', methods=['POST'])
+def enqueue_job():
+    """공유 작업 큐에 비교 작업 등록 (처리는 worker.py 가 담당)"""
+    from task_queue import enqueue_comparison
+    try:
+        data = request.get_json() or {}
+        url = (data.get('url') or '').strip()
+        if not url:
+            return jsonify({'error': 'URL을 입력해주세요'}), 400
+        checked = preflight(url if url.startswith(('http://', 'https://')) else 'https://' + url)
+        if not checked.ok:
+            return jsonify({'error': checked.reason, 'error_type': 'invalid_link'}), 400
+        job_id = clean_job_id(data.get('job_id')) or uuid.uuid4().hex[:16]
+        total = enqueue_comparison(job_id, url)
+        return jsonify({'job_id': job_id, 'total': total}), 202
+    except Exception as e:
+        app.logger.error(f"Error enqueueing job: {str(e)}")
+        return jsonify({'error': f'작업 등록 실패: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """큐 작업 진행 상황 + 기준가 대비 할인율"""
+    from task_queue import job_summary
+    summary = job_summary(clean_job_id(job_id))
+    if summary is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다'}), 404
+    return jsonify(summary.to_dict(compact=request.args.get('format') == 'compact'))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    from task_queue import get_queue
+    cancelled = get_queue().cancel_job(clean_job_id(job_id))
+    return jsonify({'status': 'cancelled', 'cancelled_tasks': cancelled, 'message': '분석이 중단되었습니다.'})
+
+@app.route('/jobs/<job_id>/trace')
+def job_trace(job_id):
+    """job 타임라인 (Chrome trace-event JSON - chrome://tracing / ui.perfetto.dev 에서 열기)"""
+    from tracing import get_trace
+    trace = get_trace(clean_job_id(job_id))
+    if trace is None:
+        return jsonify({'error': '트레이스를 찾을 수 없습니다'}), 404
+    response = jsonify(trace)
+    if request.args.get('download'):
+        response.headers['Content-Disposition'] = f'attachment; filename="trace_{clean_job_id(job_id)}.json"'
+    return response
+
+@app.route('/resume', methods=['POST'])
+def resume_analysis():
+    """끊긴 분석 이어 하기 - 체크포인트된 단계 결과(순서대로)와 다음 단계, 세션은 마지막 단계 시점으로 복원"""
+    data = request.get_json(silent=True) or {}
+    job_id = clean_job_id(data.get('job_id'))
+    url = (data.get('url') or '').strip()
+    if not job_id or not url:
+        return jsonify({'error': 'job_id 와 URL 이 필요합니다'}), 400
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    # step 0 부터 빈틈없이 이어진 단계까지만 (중간이 빠졌으면 그 단계부터 다시)
+    results = []
+    for checkpoint in load_checkpoints(job_id, canonical_url(url)):
+        if checkpoint['step'] != len(results):
+            break
+        results.append(checkpoint)
+    if not results:
+        return jsonify({'job_id': job_id, 'results': [], 'next_step': 0, 'finished': False})
+
+    last = results[-1]
+    _restore_session(last['state'])
+    session['job_id'] = job_id
+    finished = not last['result'].get('has_next')
+    if not finished:
+        # 남은 단계에는 남은 비율만큼 새 예산 (끊긴 동안 지난 시간 때문에 나머지가 모두 생략되지 않도록)
+        total = last['result'].get('total_steps') or len(results)
+        remaining = max(1, total - len(results))
+        session['job_deadline'] = Deadline.after(job_budget() * remaining / total).at
+    app.logger.info(f"분석 이어 하기: job {job_id}, 완료 {len(results)}단계")
+    return jsonify({
+        'job_id': job_id,
+        'results': [checkpoint['result'] for checkpoint in results],
+        'next_step': None if finished else last['result'].get('next_step'),
+        'finished': finished,
+    })
+
 @app.route('/progress', methods=['GET'])
 def progress_state():
-    from scraper import get_progress_state
-    return jsonify(get_progress_state())
+    """진행 중인 CID 의 진행률(pct/msg) + job 전체 진행률과 ETA (?job_id= 없으면 세션의 job)"""
+    job_id = clean_job_id(request.args.get('job_id')) or session.get('job_id')
+    progress = job_progress(job_id) if job_id else None
+    if progress is None:
+        return jsonify({'pct': 0, 'msg': '', 'job_pct': 0, 'eta': None, 'status': None})
+    state = job_state(job_id)
+    progress['status'] = state['status'] if state else None
+    return jsonify(progress)
+
+@app.route('/assets/<path:filename>')
+def asset_file(filename):
+    """해시가 붙은 정적 파일 (immutable 캐시, gzip/brotli, ETag/304)"""
+    from assets import send_asset
+    response = send_asset(filename)
+    if response is None:
+        return jsonify({'error': '파일을 찾을 수 없습니다'}), 404
+    return response
+
+_status_html = None
 
 @app.route('/status')
 def status_page():
-    """시스템 상태 페이지"""
+    """시스템 상태 페이지 (내용이 프로세스 동안 바뀌지 않으므로 한 번 렌더링해서 재사용)"""
+    global _status_html
+    if _status_html is None:
+        _status_html = _render_status()
+    return _status_html
+
+def _render_status():
     import platform
     import sys
-    import os
 
     status_info = {
         'app_status': 'Running',
@@ -431,70 +821,93 @@ def status_page():
         ]
     }
 
-    # 간단한 HTML 응답
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="ko">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>시스템 상태 - agoda-magic-price</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-        <style>
-            body {{ background: linear-gradient(135deg, #2d3748 0%, #4a5568 100%); min-height: 100vh; color: white; }}
-            .card {{ background: rgba(255,255,255,0.1); border: none; border-radius: 15px; }}
-            .btn-custom {{ background: linear-gradient(45deg, #4299e1, #3182ce); border: none; color: white; }}
-        </style>
-    </head>
-    <body>
-        <div class="container py-5">
-            <div class="row justify-content-center">
-                <div class="col-md-8">
-                    <div class="card">
-                        <div class="card-body p-5">
-                            <h1 class="text-center mb-4">⚙️ 시스템 상태</h1>
-                            <div class="row">
-                                <div class="col-md-6">
-                                    <h5>📊 앱 상태</h5>
-                                    <p>✅ {status_info['app_status']}</p>
-                                    <h5>🌐 접속 정보</h5>
-                                    <p>도메인: {status_info['domain']}</p>
-                                    <p>포트: {status_info['server_port']}</p>
-                                </div>
-                                <div class="col-md-6">
-                                    <h5>🖥️ 시스템 정보</h5>
-                                    <p>Python: {status_info['python_version'].split()[0]}</p>
-                                    <p>OS: {status_info['platform']}</p>
-                                </div>
-                            </div>
-                            <div class="mt-4">
-                                <h5>📄 사용 가능한 페이지</h5>
-                                <ul class="list-unstyled">
-                                    {''.join(f'<li>• {page}</li>' for page in status_info['static_pages'])}
-                                </ul>
-                            </div>
-                            <div class="text-center mt-4">
-                                <a href="/" class="btn btn-custom me-2">메인 페이지</a>
-                                <a href="/test" class="btn btn-custom me-2">테스트 페이지</a>
-                                <a href="/info" class="btn btn-custom me-2">정보 페이지</a>
-                                <a href="/split" class="btn btn-custom">분할 뷰</a>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    return html
+    return render_template('status.html', status=status_info)
+
+@app.route('/ready')
+def readiness():
+    """준비 상태 확인 (브라우저 풀이 채워진 워커만 200)"""
+    from browser_pool import get_pool
+    pool = get_pool()
+    ready = pool.is_ready()
+    body = {'ready': ready, 'idle_browsers': pool.idle_count(), 'pool_size': pool.size,
+            'scheduler': get_scheduler().stats()}
+    return jsonify(body), (200 if ready else 503)
+
+def warm_up_worker():
+    """워커가 트래픽을 받기 전에 호출 - 템플릿 컴파일 + 브라우저 미리 실행"""
+    from browser_pool import get_pool
+    with app.test_request_context('/'):
+        render_template('index.html')
+        render_template('guide.html', lang='ko')
+        status_page()
+    warmed = get_pool().warm()
+    app.logger.info(f"워커 예열 완료 (브라우저 준비: {warmed})")
+    return warmed
+
+def _admin_allowed():
+    """?token= 또는 X-Admin-Token 헤더가 ADMIN_TOKEN 과 일치해야 함 (ADMIN_TOKEN 이 없으면 항상 거부)"""
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        return False
+    return any(hmac.compare_digest(token.encode('utf-8'), supplied.encode('utf-8'))
+               for supplied in (request.args.get('token'), request.headers.get('X-Admin-Token')) if supplied)
+
+@app.route('/admin/profiles')
+def profiles_page():
+    """최근 프로파일 목록"""
+    from profiling import list_profiles, enabled_jobs
+    if not _admin_allowed():
+        return jsonify({'error': '권한이 없습니다'}), 403
+    return render_template('profiles.html', profiles=list_profiles(),
+                           jobs=enabled_jobs(), token=request.args.get('token'))
+
+@app.route('/admin/profiles/jobs', methods=['POST'])
+def profile_jobs():
+    """job_id 단위 프로파일 켜기/끄기 (폼 또는 JSON)"""
+    from profiling import enable_job, disable_job
+    if not _admin_allowed():
+        return jsonify({'error': '권한이 없습니다'}), 403
+    data = request.get_json(silent=True) or request.form
+    job_id = clean_job_id(data.get('job_id'))
+    if not job_id:
+        return jsonify({'error': 'job_id 가 필요합니다'}), 400
+    if data.get('action', 'enable') == 'disable':
+        disable_job(job_id)
+    else:
+        enable_job(job_id)
+    if request.is_json:
+        return jsonify({'job_id': job_id, 'action': data.get('action', 'enable')})
+    return redirect(url_for('profiles_page', token=request.args.get('token')))
+
+@app.route('/admin/profiles/<name>')
+def profile_file(name):
+    """프로파일 파일 다운로드 (speedscope JSON / folded 스택)"""
+    from profiling import profile_path
+    if not _admin_allowed():
+        return jsonify({'error': '권한이 없습니다'}), 403
+    path = profile_path(name)
+    if path is None:
+        return jsonify({'error': '파일을 찾을 수 없습니다'}), 404
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=name)
 
 @app.route('/cancel', methods=['POST'])
 def cancel_analysis():
-    """분석 중단 요청 처리"""
-    global is_cancelled
-    is_cancelled = True
-    app.logger.info("분석 중단 요청 받음")
+    """분석 중단 요청 처리 (job_id 는 본문 또는 세션)"""
+    data = request.get_json(silent=True) or {}
+    job_id = clean_job_id(data.get('job_id')) or session.get('job_id')
+    app.logger.info(f"분석 중단 요청 받음: job {job_id}")
+    if not job_id:
+        return jsonify({'status': 'cancelled', 'message': '분석이 중단되었습니다.'})
+    try:
+        cancel_job(job_id)
+    except Exception as e:
+        app.logger.error(f"중단 플래그 기록 실패: {str(e)}")
+        return jsonify({'error': f'중단 실패: {str(e)}'}), 500
+    # 이 워커의 오케스트레이터에서 진행 중인 스크래핑도 바로 취소
+    from async_orchestrator import ASYNC_ORCHESTRATOR, get_orchestrator
+    if ASYNC_ORCHESTRATOR:
+        get_orchestrator().cancel_job(job_id)
+    drop_job(job_id)
     return jsonify({'status': 'cancelled', 'message': '분석이 중단되었습니다.'})
 
 
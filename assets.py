@@ -0,0 +1,195 @@
+"""
+정적 파일 파이프라인 - 내용 해시가 붙은 파일명 + 미리 압축한 gzip/brotli 로 /assets/ 에서 서빙
+
+템플릿에서는 asset_url('script.js') → /assets/script.<hash>.js
+- 파일 내용이 바뀌면 이름이 바뀌므로 1년 immutable 캐시 (모바일 재방문 시 재다운로드 없음)
+- ETag 는 해시 + 인코딩, If-None-Match 가 맞으면 304
+- 텍스트 파일(js/css/html/svg)은 빌드 디렉터리에 .gz / .br 로 한 번만 압축해 두고 Accept-Encoding 에 맞춰 선택
+  (brotli 패키지가 없으면 gzip 만)
+- 이전 배포의 해시로 요청하면 현재 파일 이름으로 리다이렉트
+
+배포 시 미리 빌드 (없으면 첫 요청 때 파일별로 빌드):
+    python assets.py
+"""
+import os
+import sys
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+
+from flask import Response, request, send_file, redirect, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSETS_ENABLED = os.environ.get("ASSETS_ENABLED", "1") == "1"
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+BUILD_DIR = os.environ.get("ASSET_BUILD_DIR", "static_build")
+CACHE_MAX_AGE = 365 * 24 * 3600
+HASH_LEN = 12
+COMPRESSIBLE = {'.js', '.css', '.html', '.svg', '.json', '.txt'}
+MIN_COMPRESS_BYTES = 512
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Asset:
+    source: str                                   # static/ 기준 경로 (images/a.png)
+    hashed: str                                   # images/a.<hash>.png
+    digest: str
+    mtime: float
+    mimetype: str
+    variants: dict = field(default_factory=dict)  # 인코딩(identity/gzip/br) → 파일 경로
+
+
+def hashed_name(source, digest):
+    stem, ext = os.path.splitext(source)
+    return f"{stem}.{digest}{ext}"
+
+
+def source_name(hashed):
+    """images/a.<hash>.png → (images/a.png, hash)"""
+    stem, ext = os.path.splitext(hashed)
+    stem, _, digest = stem.rpartition('.')
+    if not stem or len(digest) != HASH_LEN:
+        return None, None
+    return stem + ext, digest
+
+
+class AssetManifest:
+    def __init__(self, static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self._by_source = {}
+        self._lock = threading.Lock()
+
+    def _source_path(self, source):
+        path = os.path.realpath(os.path.join(self.static_dir, source))
+        if not path.startswith(os.path.realpath(self.static_dir) + os.sep):
+            return None
+        return path
+
+    def get(self, source):
+        """원본 경로 → Asset (파일이 바뀌었으면 다시 빌드, 없으면 None)"""
+        path = self._source_path(source)
+        if path is None or not os.path.isfile(path):
+            return None
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            asset = self._by_source.get(source)
+            if asset is None or asset.mtime != mtime:
+                asset = self._by_source[source] = self._build(source, path, mtime)
+            return asset
+
+    def _build(self, source, path, mtime):
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+        hashed = hashed_name(source, digest)
+        asset = Asset(source=source, hashed=hashed, digest=digest, mtime=mtime,
+                      mimetype=mimetypes.guess_type(source)[0] or 'application/octet-stream',
+                      variants={'identity': path})
+
+        if os.path.splitext(source)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            encoders = [('gzip', '.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                encoders.append(('br', '.br', lambda d: brotli.compress(d, quality=11)))
+            for encoding, suffix, compress in encoders:
+                out = os.path.join(self.build_dir, hashed + suffix)
+                if not os.path.exists(out):
+                    os.makedirs(os.path.dirname(out), exist_ok=True)
+                    tmp = f"{out}.tmp{os.getpid()}"
+                    with open(tmp, 'wb') as f:
+                        f.write(compress(data))
+                    os.replace(tmp, out)
+                # 압축해도 줄지 않으면 쓰지 않음
+                if os.path.getsize(out) < len(data):
+                    asset.variants[encoding] = out
+        return asset
+
+    def build_all(self):
+        built = []
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                source = os.path.relpath(os.path.join(root, name), self.static_dir).replace(os.sep, '/')
+                asset = self.get(source)
+                if asset:
+                    built.append(asset)
+        return built
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = AssetManifest()
+        return _manifest
+
+
+def asset_url(source):
+    """템플릿용 - 해시가 붙은 /assets/ URL (비활성화/파일 없음이면 기존 /static/)"""
+    if ASSETS_ENABLED:
+        asset = get_manifest().get(source)
+        if asset is not None:
+            return url_for('asset_file', filename=asset.hashed)
+    return url_for('static', filename=source)
+
+
+def _choose_encoding(asset):
+    for encoding in ('br', 'gzip'):
+        if encoding in asset.variants and request.accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+
+def send_asset(hashed):
+    """/assets/<hashed> 응답 - 없으면 None"""
+    source, digest = source_name(hashed)
+    asset = get_manifest().get(source) if source else None
+    if asset is None:
+        return None
+    if asset.digest != digest:
+        return redirect(url_for('asset_file', filename=asset.hashed))
+
+    encoding = _choose_encoding(asset)
+    etag = f"{asset.digest}-{encoding}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, mimetype=asset.mimetype)
+    else:
+        response = send_file(asset.variants[encoding], mimetype=asset.mimetype, conditional=False, etag=False)
+        # .gz/.br 빌드 파일 이름이 노출되지 않도록
+        response.headers.pop('Content-Disposition', None)
+    response.set_etag(etag)
+    return _cache_headers(response, encoding)
+
+
+def _cache_headers(response, encoding):
+    response.headers['Cache-Control'] = f"public, max-age={CACHE_MAX_AGE}, immutable"
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    assets = get_manifest().build_all()
+    for asset in sorted(assets, key=lambda a: a.source):
+        sizes = ', '.join(f"{enc} {os.path.getsize(p):,}" for enc, p in asset.variants.items())
+        logger.info(f"{asset.hashed} ({sizes})")
+    logger.info(f"{len(assets)}개 파일 빌드 완료 → {BUILD_DIR} (brotli: {'사용' if brotli else '없음'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
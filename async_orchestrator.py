@@ -0,0 +1,303 @@
+import os
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+
+from tracing import span
+from progress_tracker import stage
+from scheduler import get_scheduler, DEFAULT_LANE
+from records import ScrapeResult, EMPTY_RESULT
+
+# asyncio 기반 CID 스크래핑 오케스트레이터 (ASYNC_ORCHESTRATOR=1 일 때 /scrape, 날짜 스윕이 사용)
+# - 프로세스당 이벤트 루프 1개를 백그라운드 스레드에서 돌리고, Flask 는 run_sync() 로 결과만 기다린다
+# - 동시 스크래핑 수는 스레드 수가 아니라 브라우저 수로 제한 - 입장 순서는 scheduler.py 의 레인(우선순위)/테넌트 순
+# - 폴링 대기는 asyncio.sleep, page_source 는 asyncio.timeout 으로 감싸서 폴링마다 스레드를 새로 띄우지 않는다
+# - CID 1건 전체에도 asyncio.timeout 을 걸고, 취소되면 브라우저는 finally 에서 반납
+#   (deadline.Deadline 을 주면 CID_TIMEOUT 과 마감까지 남은 시간 중 짧은 쪽, 내부 대기도 마감에 맞춰 줄어든다)
+# - BeautifulSoup 파싱/추출(CPU)은 작은 전용 실행기(PARSE_WORKERS)에서 처리해 루프를 막지 않는다
+# - SCRAPER_BACKEND=cdp 이면 cdp_backend 의 루프를 그대로 쓰고 내비게이션/준비 대기/페이지 읽기는
+#   CDPPage 코루틴을 직접 await (io_executor 스레드는 풀에서 꺼내는 데만 쓴다)
+# 결과 형식은 scraper.scrape_prices_simple 과 동일 (records.ScrapeResult)
+
+ASYNC_ORCHESTRATOR = os.environ.get("ASYNC_ORCHESTRATOR", "0") == "1"
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "2"))
+CID_TIMEOUT = float(os.environ.get("CID_TIMEOUT", "60"))
+POLL_INTERVAL = 0.5
+MAX_POLLS = 20
+PAGE_LOAD_TIMEOUT = 20
+PAGE_SOURCE_TIMEOUT = 20
+EXTRACT_GRACE_SEC = 2
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_poll(html):
+    """폴링 1회분 파싱 (실행기 스레드) - (가격, 호텔명, 텍스트 길이, 객실 요금)
+    가격을 찾은 폴링에서는 같은 soup 으로 객실 요금까지 뽑는다 (ROOM_OFFERS=1)"""
+    from bs4 import BeautifulSoup
+    from scraper import extract_sticky_price, extract_room_offers, ROOM_OFFERS
+
+    soup = BeautifulSoup(html, 'html.parser')
+    price, title = extract_sticky_price(soup)
+    if price:
+        return price, title, 0, (extract_room_offers(soup) if ROOM_OFFERS else None)
+    return None, title, len(soup.get_text()), None
+
+
+def _parse_fallback(html, title, currency=None):
+    from bs4 import BeautifulSoup
+    from scraper import extract_fallback_prices, extract_room_offers, ROOM_OFFERS
+
+    soup = BeautifulSoup(html or '', 'html.parser')
+    result = extract_fallback_prices(soup, title, currency=currency)
+    if ROOM_OFFERS:
+        result = result.with_rooms(extract_room_offers(soup))
+    return result
+
+
+class Orchestrator:
+    def __init__(self, capacity=None):
+        from browser_pool import POOL_SIZE, SCRAPER_BACKEND
+
+        self.capacity = max(1, capacity or POOL_SIZE)
+        self.direct_cdp = SCRAPER_BACKEND == 'cdp'
+        if self.direct_cdp:
+            # CDP 페이지(웹소켓 연결)는 cdp_backend 루프에 묶여 있다 - 같은 루프에서 돌아야 직접 await 할 수 있다
+            from cdp_backend import get_loop
+            self.loop = get_loop()
+        else:
+            self.loop = asyncio.new_event_loop()
+        self.parse_executor = ThreadPoolExecutor(max_workers=max(1, PARSE_WORKERS), thread_name_prefix='parse')
+        # 브라우저 I/O(selenium 호출)는 블로킹이므로 브라우저 수만큼의 스레드에서만 실행
+        self.io_executor = ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix='browser-io')
+        self._thread = None
+        if not self.direct_cdp:
+            self._thread = threading.Thread(target=self._run_loop, name='orchestrator', daemon=True)
+            self._thread.start()
+        self._jobs = {}   # job_id → {asyncio.Task}
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # ---- Flask 스레드에서 호출 ----
+    def submit(self, coro):
+        """루프에 태스크로 올리고 concurrent Future 반환 (호출 스레드의 contextvars - 트레이스 job 등 - 유지)"""
+        ctx = contextvars.copy_context()
+        future = Future()
+
+        def _done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def _start():
+            self.loop.create_task(coro, context=ctx).add_done_callback(_done)
+
+        self.loop.call_soon_threadsafe(_start)
+        return future
+
+    def run_sync(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    def cancel_job(self, job_id):
+        """job 에 속한 진행 중인 스크래핑을 모두 취소"""
+        def _cancel():
+            for task in self._jobs.pop(job_id, set()):
+                task.cancel()
+        self.loop.call_soon_threadsafe(_cancel)
+
+    # ---- 코루틴 ----
+    async def _io(self, fn, *args):
+        # run_in_executor 는 contextvars 를 넘기지 않으므로 직접 복사 (browser_pool 의 span 기록용)
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await self.loop.run_in_executor(self.io_executor, call)
+
+    def _io_future(self, fn, *args):
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return self.loop.run_in_executor(self.io_executor, call)
+
+    async def _parse(self, fn, *args):
+        return await self.loop.run_in_executor(self.parse_executor, fn, *args)
+
+    async def _acquire(self, pool):
+        """풀에서 드라이버 - 기다리던 태스크가 취소/시간 초과돼도 실행기 스레드는 드라이버를 받으므로,
+        그때는 받는 즉시 반납한다 (크롬이 새지 않도록)"""
+        future = self._io_future(pool.acquire)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            def _give_back(done):
+                if not done.cancelled() and done.exception() is None:
+                    pool.release(done.result())
+            future.add_done_callback(_give_back)
+            raise
+
+    async def scrape(self, url, original_currency_code=None, page_text_key=None, timeout=CID_TIMEOUT, job_id=None,
+                     deadline=None, lane=DEFAULT_LANE, tenant=None):
+        """CID 1건 - 레인 순서대로 자리를 받은 뒤 timeout(또는 deadline) 안에 끝내지 못하면 빈 결과"""
+        task = asyncio.current_task()
+        if job_id:
+            self._jobs.setdefault(job_id, set()).add(task)
+        if deadline is not None:
+            # 폴링이 마감에서 멈춘 뒤 마지막 페이지로 추출할 여유
+            timeout = deadline.timeout(timeout) + EXTRACT_GRACE_SEC
+        try:
+            async with get_scheduler().slot_async(lane, tenant):
+                async with asyncio.timeout(timeout):
+                    return await self._scrape(url, page_text_key, deadline, original_currency_code)
+        except TimeoutError:
+            logger.warning(f"CID 스크래핑 시간 초과 ({timeout}초): {url}")
+            return EMPTY_RESULT
+        finally:
+            if job_id and job_id in self._jobs:
+                self._jobs[job_id].discard(task)
+                if not self._jobs[job_id]:
+                    del self._jobs[job_id]
+
+    async def _scrape(self, url, page_text_key=None, deadline=None, currency=None):
+        from browser_pool import get_pool
+
+        def wait_for(cap):
+            return deadline.timeout(cap) if deadline else cap
+
+        pool = get_pool()
+        driver = None
+        # 기다림을 그만뒀지만(시간 초과/취소) 실행기 스레드에서 아직 돌고 있을 수 있는 드라이버 호출
+        # - 이런 드라이버는 다른 호출과 겹치지 않도록 더 쓰지 않고 풀에 돌려주지도 않는다 (폐기)
+        pending = []
+        stuck = False   # page_source 시간 초과 - CDP 페이지도 더 쓰지 않는다
+
+        async def driver_io(fn, *args):
+            future = self._io_future(fn, *args)
+            pending.append(future)
+            result = await asyncio.shield(future)
+            pending.remove(future)
+            return result
+
+        def give_back(used):
+            if stuck or any(not f.done() for f in pending):
+                logger.info("응답하지 않는 브라우저 호출이 남아 있어 폐기")
+                pool.discard(used)
+            else:
+                pool.release(used)
+
+        try:
+            stage('lease')
+            with span('browser.lease'):
+                driver = await self._acquire(pool)
+            # CDP 백엔드는 드라이버(동기 어댑터)를 거치지 않고 페이지를 직접 await
+            page = driver.page if self.direct_cdp else None
+
+            try:
+                stage('navigate')
+                with span('navigate'):
+                    if page is not None:
+                        await page.navigate(url, timeout=wait_for(PAGE_LOAD_TIMEOUT))
+                    else:
+                        await driver_io(driver.get, url)
+                with span('ready_state'):
+                    if page is not None:
+                        # DOMContentLoaded 이벤트 (navigate 가 이전 페이지의 신호를 지우므로 먼저 쉬지 않아도 된다)
+                        await page.wait_ready(wait_for(2))
+                    else:
+                        await asyncio.sleep(POLL_INTERVAL)
+                        async with asyncio.timeout(wait_for(2)):
+                            while await driver_io(driver.execute_script, "return document.readyState") not in ("interactive", "complete"):
+                                await asyncio.sleep(0.1)
+            except Exception as e:
+                logger.info(f"driver.get() fail: {e!r}")
+                return EMPTY_RESULT
+
+            stage('poll')
+            price, title, page_html, rooms = None, '', '', None
+            for attempt in range(MAX_POLLS):
+                if deadline and deadline.expired():
+                    # 마감 - 마지막으로 읽은 페이지로 보조 추출만
+                    logger.info(f"CID 마감 도달 (폴링 {attempt}회): {url}")
+                    break
+                with span('poll.wait', attempt=attempt):
+                    await asyncio.sleep(wait_for(POLL_INTERVAL))
+                try:
+                    with span('poll.page_source', attempt=attempt):
+                        async with asyncio.timeout(wait_for(PAGE_SOURCE_TIMEOUT)):
+                            if page is not None:
+                                page_html = await page.content(timeout=wait_for(PAGE_SOURCE_TIMEOUT))
+                            else:
+                                page_html = await driver_io(lambda: driver.page_source)
+                except TimeoutError:
+                    # 멈춘 브라우저 - 더 폴링하지 않고 마지막으로 읽은 페이지로 보조 추출 (드라이버는 폐기)
+                    logger.info(f"page_source 시간 초과 (폴링 {attempt}회) - 폴링 중단: {url}")
+                    stuck = True
+                    break
+                with span('poll.parse', attempt=attempt, bytes=len(page_html)):
+                    price, found_title, text_len, rooms = await self._parse(_parse_poll, page_html)
+                if len(title) <= 1 and found_title:
+                    title = found_title
+                if price:
+                    break
+                if text_len == 0 and attempt > 5:
+                    logger.info("driver time out")
+                    return EMPTY_RESULT
+                if text_len > 40000:
+                    break
+
+            # 파싱에는 브라우저가 필요 없으므로 바로 반납
+            give_back(driver)
+            driver = None
+
+            stage('extract')
+            if price:
+                result = ScrapeResult.starting(price, title)
+                if rooms is not None:
+                    result = result.with_rooms(rooms)
+            else:
+                with span('extract.fallback'):
+                    result = await self._parse(_parse_fallback, page_html, title, currency)
+
+            from snapshot_archive import capture_snapshot
+            capture_snapshot(url, page_html, result)
+            if page_text_key and page_html:
+                from page_text_store import get_store
+                result = result.with_page_text(get_store().submit(page_text_key, url, page_html))
+            return result
+        finally:
+            # 취소/시간 초과 경로 포함 항상 반납 (끝나지 않은 호출이 있으면 폐기)
+            if driver is not None:
+                give_back(driver)
+
+
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator():
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            _orchestrator = Orchestrator()
+        return _orchestrator
+
+
+def scrape_url(url, original_currency_code=None, progress_cb=None, page_text_key=None, job_id=None, deadline=None,
+               lane=DEFAULT_LANE, tenant=None):
+    """scrape_prices_simple 과 같은 호출 형태 - ASYNC_ORCHESTRATOR=1 이면 이벤트 루프에서 실행
+    lane/tenant: 브라우저 자리를 받는 순서 (scheduler.py)"""
+    if not ASYNC_ORCHESTRATOR:
+        from scraper import scrape_prices_simple
+        with get_scheduler().slot(lane, tenant):
+            return scrape_prices_simple(url, original_currency_code=original_currency_code,
+                                        progress_cb=progress_cb, page_text_key=page_text_key, deadline=deadline)
+    orchestrator = get_orchestrator()
+    try:
+        return orchestrator.run_sync(orchestrator.scrape(
+            url, original_currency_code=original_currency_code, page_text_key=page_text_key, job_id=job_id,
+            deadline=deadline, lane=lane, tenant=tenant))
+    except CancelledError:
+        return EMPTY_RESULT
@@ -0,0 +1,247 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+from tracing import span
+
+# 워커마다 미리 띄워 두는 크롬 드라이버 풀
+# - CID 귀속(쿠키) 문제 때문에 드라이버는 1회 사용 후 폐기하고, 백그라운드에서 새로 채워 둔다
+# - 요청 경로에서는 이미 떠 있는 브라우저를 꺼내 쓰기만 하므로 콜드 스타트 비용이 없다
+
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "1"))
+ACQUIRE_TIMEOUT = float(os.environ.get("BROWSER_ACQUIRE_TIMEOUT", "30"))
+# 미리 실행이 실패하면 이 간격(실패할 때마다 2배, 최대 MAX)으로 다시 시도 - 풀이 찰 때까지 /ready 는 503
+LAUNCH_RETRY_SEC = float(os.environ.get("BROWSER_LAUNCH_RETRY_SEC", "2"))
+LAUNCH_RETRY_MAX_SEC = float(os.environ.get("BROWSER_LAUNCH_RETRY_MAX_SEC", "60"))
+# 1이면 브라우저를 종료하지 않고 쿠키/스토리지만 지운 뒤 다음 CID 에 재사용 (DNS/TLS/메모리 캐시 유지)
+REUSE_BROWSER = os.environ.get("CHROME_REUSE_BROWSER", "0") == "1"
+MAX_BROWSER_REUSE = int(os.environ.get("CHROME_MAX_REUSE", "28"))
+# selenium(기본) | cdp | fake - cdp 는 chromedriver 없이 DevTools 프로토콜로 직접 제어 (cdp_backend.py)
+# fake 는 부하 테스트용 가짜 브라우저 (fake_browser.py)
+SCRAPER_BACKEND = os.environ.get("SCRAPER_BACKEND", "selenium")
+
+logger = logging.getLogger(__name__)
+
+
+def make_chrome_options():
+    """scrape_prices_simple 에서 쓰던 크롬 옵션 그대로"""
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=640,360')
+    chrome_options.add_argument('--disable-logging')
+    chrome_options.add_argument('--log-level=3')
+    chrome_options.page_load_strategy = 'none'
+    chrome_options.add_argument('--disable-extensions')
+    # 실제 브라우저처럼 보이게 하는 옵션들
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_argument('--accept-language=en-US,en;q=0.9')
+    chrome_options.add_argument('--accept-encoding=gzip, deflate, br')
+    chrome_options.add_argument('--accept=text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8')
+    return chrome_options
+
+
+def launch_driver():
+    """새 크롬 드라이버 실행 (타임아웃 기본값 포함)"""
+    if SCRAPER_BACKEND == 'fake':
+        # 부하 테스트용 (loadtest.py) - 크롬 없이 지연 시간만 흉내
+        from fake_browser import launch_fake_driver
+        driver = launch_fake_driver()
+        driver._agoda_profile_dir = None
+        driver._agoda_uses = 0
+        return driver
+    if SCRAPER_BACKEND == 'cdp':
+        # 공유 크롬 프로세스에 새 컨텍스트/탭만 열기 때문에 드라이버 실행보다 훨씬 가볍다
+        from cdp_backend import launch_cdp_driver
+        driver = launch_cdp_driver()
+        driver._agoda_profile_dir = None
+        driver._agoda_uses = 0
+        return driver
+
+    from selenium import webdriver
+    from chrome_profiles import PROFILE_CACHE_ENABLED, get_profile_manager, add_profile_arguments
+
+    chrome_options = make_chrome_options()
+    profile_dir = None
+    if PROFILE_CACHE_ENABLED:
+        # 캐시가 남아 있는 프로필 템플릿으로 실행 (쿠키/스토리지는 lease 시점에 비워져 있음)
+        profile_dir = get_profile_manager().lease()
+        add_profile_arguments(chrome_options, profile_dir)
+
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+    except Exception:
+        if profile_dir:
+            get_profile_manager().release(profile_dir)
+        raise
+    driver._agoda_profile_dir = profile_dir
+    driver._agoda_uses = 0
+    driver.set_page_load_timeout(20)
+    driver.implicitly_wait(20)
+    driver.set_script_timeout(20)
+    return driver
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    profile_dir = getattr(driver, '_agoda_profile_dir', None)
+    if profile_dir:
+        # 크롬이 종료된 뒤에야 프로필 파일을 정리할 수 있다
+        from chrome_profiles import get_profile_manager
+        get_profile_manager().release(profile_dir)
+
+
+class BrowserPool:
+    """미리 실행된 드라이버를 보관하는 풀 (1회용 드라이버 + 백그라운드 보충)"""
+
+    def __init__(self, size=POOL_SIZE, factory=launch_driver):
+        self.size = max(0, int(size))
+        self.factory = factory
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0        # 실행 중인 보충 작업 수
+        self._closed = False
+        self._warmed = threading.Event()
+        if self.size == 0:
+            self._warmed.set()
+
+    def _launch_one(self):
+        # 실패하면 간격을 늘려 가며 다시 시도 (그동안 이 자리는 pending 으로 남아 중복 실행되지 않는다)
+        delay = LAUNCH_RETRY_SEC
+        while True:
+            try:
+                driver = self.factory()
+                break
+            except Exception as e:
+                logger.warning(f"브라우저 미리 실행 실패 - {delay:g}초 후 다시 시도: {e}")
+                driver = None
+            if self._closed:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, LAUNCH_RETRY_MAX_SEC)
+        with self._lock:
+            self._pending -= 1
+            closed = self._closed
+        if driver is None:
+            return
+        if closed:
+            _quit_quietly(driver)
+            return
+        self._idle.put(driver)
+        if self._idle.qsize() >= self.size:
+            self._warmed.set()
+
+    def _refill_async(self):
+        """비어 있는 자리만큼 백그라운드에서 드라이버를 채운다"""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - self._idle.qsize() - self._pending
+            self._pending += max(0, missing)
+        for _ in range(max(0, missing)):
+            threading.Thread(target=self._launch_one, daemon=True).start()
+
+    def warm(self, timeout=60):
+        """풀이 가득 찰 때까지 대기 (워커가 트래픽을 받기 전에 호출)"""
+        self._refill_async()
+        return self._warmed.wait(timeout)
+
+    def is_ready(self):
+        if not self._warmed.is_set() and not self._closed:
+            # 빈 자리가 있는데 아무도 채우고 있지 않으면 다시 채우기 시작 (pending 은 세지 않음)
+            self._refill_async()
+        return self._warmed.is_set() and not self._closed
+
+    def idle_count(self):
+        return self._idle.qsize()
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """준비된 드라이버를 꺼낸다. 풀이 비었으면 그 자리에서 새로 실행"""
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            driver = None
+        if not REUSE_BROWSER:
+            # 1회용 - 꺼낸 자리는 바로 다음 드라이버로 채운다
+            # (재사용 모드는 빌려 간 드라이버가 돌아오므로 실제로 종료될 때만 채운다 - _retire)
+            self._refill_async()
+        if driver is not None:
+            return driver
+        if self.size == 0:
+            with span('browser.launch', cat='browser'):
+                return self.factory()
+        try:
+            with span('browser.wait_idle', cat='browser'):
+                return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with span('browser.launch', cat='browser'):
+                return self.factory()
+
+    def release(self, driver):
+        """사용한 드라이버는 종료 (재사용 모드면 세션만 지우고 풀에 되돌림)"""
+        if driver is None:
+            return
+        threading.Thread(target=self._recycle, args=(driver,), daemon=True).start()
+
+    def discard(self, driver):
+        """재사용하지 않고 종료 (호출이 끝나지 않은 채 멈춘 드라이버 등)"""
+        if driver is None:
+            return
+        threading.Thread(target=self._retire, args=(driver,), daemon=True).start()
+
+    def _retire(self, driver):
+        _quit_quietly(driver)
+        if REUSE_BROWSER:
+            self._refill_async()
+
+    def _recycle(self, driver):
+        driver._agoda_uses = getattr(driver, '_agoda_uses', 0) + 1
+        if REUSE_BROWSER and driver._agoda_uses < MAX_BROWSER_REUSE and not self._closed:
+            try:
+                from chrome_profiles import clear_live_session
+                clear_live_session(driver)
+                with self._lock:
+                    full = self._idle.qsize() + self._pending >= self.size
+                if not full:
+                    self._idle.put(driver)
+                    return
+            except Exception as e:
+                logger.warning(f"브라우저 재사용 준비 실패 - 종료: {e}")
+        self._retire(driver)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                _quit_quietly(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        from chrome_profiles import PROFILE_CACHE_ENABLED, get_profile_manager
+        if PROFILE_CACHE_ENABLED:
+            get_profile_manager().cleanup()
+        if SCRAPER_BACKEND == 'cdp':
+            from cdp_backend import shutdown_cdp
+            shutdown_cdp()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """프로세스(워커)당 하나의 풀"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+        return _pool
@@ -0,0 +1,339 @@
+import os
+import re
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import itertools
+import threading
+import subprocess
+
+# chromedriver 를 거치지 않고 DevTools 프로토콜(CDP)로 크롬을 직접 제어하는 백엔드 (SCRAPER_BACKEND=cdp)
+# - 크롬 프로세스 1개 + 웹소켓 연결 1개에 여러 페이지를 동시에 붙인다 (Target.attachToTarget flatten 세션)
+# - CID 마다 새 브라우저 컨텍스트(시크릿 창과 같음)를 만들어 쿠키가 섞이지 않게 하고, 끝나면 컨텍스트째 폐기
+# - Page.domContentEventFired 를 구독해서 준비 대기(readyState 'interactive')를 폴링 없이 이벤트로 기다린다
+# - CDPDriver 는 scrape_prices_simple 이 쓰는 Selenium 드라이버 메서드만 흉내 내는 동기 어댑터
+#   (get / page_source / execute_script / execute_cdp_cmd / quit + wait_ready) - 내부 비동기 루프는 프로세스당 1개
+#   async_orchestrator 는 같은 루프(get_loop)에서 CDPPage 를 직접 await 한다 (스레드 경유 없음)
+# 필요 패키지: websockets (선택 의존성, pyproject 의 [cdp] extra)
+
+CHROME_BINARY = os.environ.get("CHROME_BINARY")
+CDP_COMMAND_TIMEOUT = float(os.environ.get("CDP_COMMAND_TIMEOUT", "20"))
+CDP_LAUNCH_TIMEOUT = float(os.environ.get("CDP_LAUNCH_TIMEOUT", "20"))
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r'DevTools listening on (ws://\S+)')
+
+
+class CDPError(Exception):
+    pass
+
+
+def find_chrome():
+    if CHROME_BINARY:
+        return CHROME_BINARY
+    for name in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome'):
+        path = shutil.which(name)
+        if path:
+            return path
+    raise CDPError("크롬 실행 파일을 찾을 수 없습니다 (CHROME_BINARY 설정 필요)")
+
+
+def chrome_arguments(user_data_dir):
+    """browser_pool.make_chrome_options 와 같은 옵션 + 원격 디버깅"""
+    return [
+        '--headless=new',
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu',
+        '--window-size=640,360',
+        '--disable-logging',
+        '--log-level=3',
+        '--disable-extensions',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        '--accept-language=en-US,en;q=0.9',
+        '--remote-debugging-port=0',
+        f'--user-data-dir={user_data_dir}',
+        'about:blank',
+    ]
+
+
+class CDPConnection:
+    """웹소켓 1개 위의 CDP 명령/이벤트 다중화 (sessionId 로 페이지 구분)"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}     # (session_id, method) → [callback]
+        self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, url):
+        if websockets is None:
+            raise CDPError("SCRAPER_BACKEND=cdp 를 쓰려면 websockets 패키지가 필요합니다")
+        ws = await websockets.connect(url, max_size=None, ping_interval=None)
+        return cls(ws)
+
+    async def send(self, method, params=None, session_id=None, timeout=CDP_COMMAND_TIMEOUT):
+        msg_id = next(self._ids)
+        message = {'id': msg_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self.ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def on(self, method, callback, session_id=None):
+        self._listeners.setdefault((session_id, method), []).append(callback)
+
+    def off_session(self, session_id):
+        for key in [k for k in self._listeners if k[0] == session_id]:
+            del self._listeners[key]
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self._pending.get(message['id'])
+                    if future and not future.done():
+                        if 'error' in message:
+                            future.set_exception(CDPError(message['error'].get('message', str(message['error']))))
+                        else:
+                            future.set_result(message.get('result', {}))
+                    continue
+                key = (message.get('sessionId'), message.get('method'))
+                for callback in self._listeners.get(key, []):
+                    try:
+                        callback(message.get('params', {}))
+                    except Exception as e:
+                        logger.warning(f"CDP 이벤트 처리 실패 {key[1]}: {e}")
+        except Exception as e:
+            logger.warning(f"CDP 연결 종료: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("CDP 연결이 끊어졌습니다"))
+
+    async def close(self):
+        self._reader.cancel()
+        await self.ws.close()
+
+
+class CDPPage:
+    """브라우저 컨텍스트 1개 + 탭 1개"""
+
+    def __init__(self, conn, context_id, target_id, session_id):
+        self.conn = conn
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+        self.dom_ready = asyncio.Event()
+
+    @classmethod
+    async def open(cls, conn):
+        context_id = (await conn.send('Target.createBrowserContext', {'disposeOnDetach': True}))['browserContextId']
+        target_id = (await conn.send('Target.createTarget', {
+            'url': 'about:blank', 'browserContextId': context_id}))['targetId']
+        session_id = (await conn.send('Target.attachToTarget', {'targetId': target_id, 'flatten': True}))['sessionId']
+        page = cls(conn, context_id, target_id, session_id)
+        page._subscribe()
+        await asyncio.gather(
+            page.send('Page.enable'),
+            page.send('Runtime.enable'),
+        )
+        return page
+
+    def _subscribe(self):
+        self.conn.on('Page.domContentEventFired', lambda p: self.dom_ready.set(), session_id=self.session_id)
+
+    async def send(self, method, params=None, timeout=CDP_COMMAND_TIMEOUT):
+        return await self.conn.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def navigate(self, url, timeout=CDP_COMMAND_TIMEOUT):
+        """page_load_strategy='none' 과 같이 내비게이션 시작까지만 기다린다"""
+        self.dom_ready.clear()
+        result = await self.send('Page.navigate', {'url': url}, timeout=timeout)
+        if result.get('errorText'):
+            raise CDPError(f"내비게이션 실패: {result['errorText']}")
+        return result
+
+    async def wait_ready(self, timeout=CDP_COMMAND_TIMEOUT):
+        """마지막 navigate 의 DOMContentLoaded 까지 (readyState 'interactive' 와 같은 시점) - 넘으면 TimeoutError"""
+        await asyncio.wait_for(self.dom_ready.wait(), timeout)
+
+    async def evaluate(self, expression, timeout=CDP_COMMAND_TIMEOUT):
+        result = await self.send('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True, 'awaitPromise': True}, timeout=timeout)
+        if result.get('exceptionDetails'):
+            raise CDPError(result['exceptionDetails'].get('text', 'Runtime.evaluate 실패'))
+        return result.get('result', {}).get('value')
+
+    async def content(self, timeout=CDP_COMMAND_TIMEOUT):
+        return await self.evaluate("document.documentElement ? document.documentElement.outerHTML : ''", timeout)
+
+    async def close(self):
+        self.conn.off_session(self.session_id)
+        try:
+            await self.conn.send('Target.closeTarget', {'targetId': self.target_id})
+        finally:
+            await self.conn.send('Target.disposeBrowserContext', {'browserContextId': self.context_id})
+
+
+class CDPBrowser:
+    """크롬 프로세스 1개 + CDP 연결 1개 (여러 CDPPage 가 공유)"""
+
+    def __init__(self, process, conn, user_data_dir):
+        self.process = process
+        self.conn = conn
+        self.user_data_dir = user_data_dir
+
+    @classmethod
+    async def launch(cls):
+        user_data_dir = tempfile.mkdtemp(prefix='agoda-cdp-')
+        process = subprocess.Popen([find_chrome(), *chrome_arguments(user_data_dir)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        ws_url = await asyncio.wait_for(asyncio.to_thread(cls._read_ws_url, process), CDP_LAUNCH_TIMEOUT)
+        conn = await CDPConnection.connect(ws_url)
+        return cls(process, conn, user_data_dir)
+
+    @staticmethod
+    def _read_ws_url(process):
+        for line in process.stderr:
+            match = _WS_RE.search(line)
+            if match:
+                # 나머지 stderr 는 계속 비워 줘야 파이프가 차서 크롬이 멈추지 않는다
+                threading.Thread(target=lambda: all(True for _ in process.stderr), daemon=True).start()
+                return match.group(1)
+        raise CDPError("크롬 DevTools 주소를 읽지 못했습니다")
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    async def close(self):
+        try:
+            await self.conn.send('Browser.close', timeout=5)
+        except Exception:
+            pass
+        try:
+            await self.conn.close()
+        except Exception:
+            pass
+        try:
+            # 프로세스 종료 대기는 블로킹이므로 루프(다른 페이지들이 공유) 밖에서
+            await asyncio.to_thread(self.process.wait, 5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+# ---- 동기 어댑터 (Flask 스레드에서 사용) ----
+
+_loop = None
+_browser = None
+_browser_lock = None     # asyncio.Lock (루프 스레드에서 생성)
+_state_lock = threading.Lock()
+
+
+def get_loop():
+    """프로세스당 1개의 이벤트 루프를 백그라운드 스레드에서 실행"""
+    global _loop
+    with _state_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='cdp-loop', daemon=True).start()
+        return _loop
+
+
+def run_sync(coro, timeout=None):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+async def _shared_browser():
+    """동시에 여러 페이지를 열어도 크롬은 하나만 실행"""
+    global _browser, _browser_lock
+    if _browser_lock is None:
+        _browser_lock = asyncio.Lock()
+    async with _browser_lock:
+        if _browser is None or not _browser.is_alive():
+            _browser = await CDPBrowser.launch()
+        return _browser
+
+
+class CDPDriver:
+    """scrape_prices_simple 이 쓰는 Selenium WebDriver 메서드만 구현한 어댑터"""
+
+    def __init__(self, page):
+        self.page = page
+        self._page_load_timeout = CDP_COMMAND_TIMEOUT
+        self._script_timeout = CDP_COMMAND_TIMEOUT
+
+    # 타임아웃 설정 (Selenium 과 같은 이름)
+    def set_page_load_timeout(self, seconds):
+        self._page_load_timeout = seconds
+
+    def set_script_timeout(self, seconds):
+        self._script_timeout = seconds
+
+    def implicitly_wait(self, seconds):
+        pass  # 요소 탐색을 하지 않으므로 의미 없음
+
+    def get(self, url):
+        run_sync(self.page.navigate(url, timeout=self._page_load_timeout), timeout=self._page_load_timeout + 5)
+
+    def wait_ready(self, timeout):
+        """readyState 폴링 대신 DOMContentLoaded 이벤트를 기다린다 (Selenium 드라이버에는 없는 메서드)"""
+        run_sync(self.page.wait_ready(timeout), timeout=timeout + 5)
+
+    @property
+    def page_source(self):
+        return run_sync(self.page.content(timeout=self._script_timeout), timeout=self._script_timeout + 5)
+
+    def execute_script(self, script, *args):
+        """Selenium 처럼 함수 본문으로 실행 (인자는 JSON 으로 전달)"""
+        expression = f"(function(){{ {script} }}).apply(null, {json.dumps(list(args))})"
+        return run_sync(self.page.evaluate(expression, timeout=self._script_timeout), timeout=self._script_timeout + 5)
+
+    def execute_cdp_cmd(self, cmd, params):
+        return run_sync(self.page.send(cmd, params), timeout=CDP_COMMAND_TIMEOUT + 5)
+
+    def delete_all_cookies(self):
+        self.execute_cdp_cmd('Network.clearBrowserCookies', {})
+
+    def quit(self):
+        try:
+            run_sync(self.page.close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"CDP 페이지 종료 실패: {e}")
+
+
+def launch_cdp_driver():
+    """공유 크롬에 새 컨텍스트/탭을 열어 CDPDriver 로 반환 (browser_pool 의 factory)"""
+    async def _open():
+        browser = await _shared_browser()
+        return await CDPPage.open(browser.conn)
+    return CDPDriver(run_sync(_open(), timeout=CDP_LAUNCH_TIMEOUT + CDP_COMMAND_TIMEOUT))
+
+
+def shutdown_cdp():
+    global _browser
+    if _browser is not None and _loop is not None:
+        try:
+            run_sync(_browser.close(), timeout=15)
+        except Exception:
+            pass
+        _browser = None
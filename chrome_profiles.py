@@ -0,0 +1,134 @@
+import os
+import shutil
+import logging
+import threading
+
+# 크롬 user-data-dir 템플릿 관리
+# - 디스크 캐시(JS 번들, CSS, 이미지)는 스크래핑 사이에 유지해서 28개 CID 가 같은 자원을 다시 받지 않게 한다
+# - 쿠키/스토리지 등 CID 귀속에 영향을 주는 상태는 매 사용 전후로 삭제
+# - 템플릿은 사용 횟수/디스크 크기 한도를 넘으면 통째로 지우고 새로 만든다
+# CHROME_PROFILE_CACHE=1 일 때만 사용 (기본은 기존처럼 빈 프로필)
+
+PROFILE_CACHE_ENABLED = os.environ.get("CHROME_PROFILE_CACHE", "0") == "1"
+PROFILE_ROOT = os.environ.get("CHROME_PROFILE_ROOT", "/tmp/agoda-chrome-profiles")
+MAX_PROFILE_MB = int(os.environ.get("CHROME_PROFILE_MAX_MB", "300"))
+MAX_PROFILE_USES = int(os.environ.get("CHROME_PROFILE_MAX_USES", "200"))
+DISK_CACHE_MB = int(os.environ.get("CHROME_DISK_CACHE_MB", "200"))
+
+# 매번 지우는 항목 (Default/ 기준) - 캐시류(Cache, Code Cache, GPUCache)는 남긴다
+WIPE_PATHS = [
+    'Cookies', 'Cookies-journal',
+    'Network/Cookies', 'Network/Cookies-journal',
+    'Local Storage', 'Session Storage', 'IndexedDB', 'databases',
+    'Service Worker', 'Storage', 'Shared Storage', 'WebStorage',
+    'Sessions', 'Current Session', 'Current Tabs', 'Last Session', 'Last Tabs',
+    'History', 'History-journal', 'Visited Links', 'Web Data', 'Web Data-journal',
+    'Login Data', 'Login Data-journal', 'Trust Tokens', 'Trust Tokens-journal',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _dir_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def wipe_session_state(profile_dir):
+    """쿠키/스토리지/세션 등 CID 귀속에 영향을 주는 상태만 삭제"""
+    default_dir = os.path.join(profile_dir, 'Default')
+    for rel in WIPE_PATHS:
+        path = os.path.join(default_dir, rel)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"프로필 정리 실패 {path}: {e}")
+
+
+class ProfileManager:
+    """
+    동시에 실행되는 크롬 수만큼 user-data-dir 를 빌려준다
+    (같은 user-data-dir 를 두 크롬이 동시에 쓸 수 없으므로 사용 중인 템플릿은 잠근다)
+    """
+
+    def __init__(self, root=PROFILE_ROOT, max_mb=MAX_PROFILE_MB, max_uses=MAX_PROFILE_USES):
+        # 워커 프로세스마다 별도 디렉터리 (gunicorn 워커끼리 충돌 방지)
+        self.root = os.path.join(root, f"pid-{os.getpid()}")
+        self.max_mb = max_mb
+        self.max_uses = max_uses
+        self._lock = threading.Lock()
+        self._free = []
+        self._uses = {}
+        self._count = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def lease(self):
+        with self._lock:
+            if self._free:
+                profile_dir = self._free.pop()
+            else:
+                self._count += 1
+                profile_dir = os.path.join(self.root, f"profile-{self._count}")
+                self._uses[profile_dir] = 0
+            self._uses[profile_dir] += 1
+        os.makedirs(profile_dir, exist_ok=True)
+        # 이전 사용이 비정상 종료됐을 수도 있으니 실행 전에도 한 번 정리
+        wipe_session_state(profile_dir)
+        return profile_dir
+
+    def release(self, profile_dir):
+        """크롬 종료 후 호출 - 상태 정리, 한도 초과 시 템플릿 교체"""
+        wipe_session_state(profile_dir)
+        uses = self._uses.get(profile_dir, 0)
+        if uses >= self.max_uses or _dir_size_mb(profile_dir) > self.max_mb:
+            logger.info(f"프로필 템플릿 교체: {profile_dir} (사용 {uses}회)")
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            with self._lock:
+                self._uses[profile_dir] = 0
+        with self._lock:
+            self._free.append(profile_dir)
+
+    def cleanup(self):
+        """워커 종료 시 이 프로세스의 템플릿 전체 삭제"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def add_profile_arguments(chrome_options, profile_dir):
+    chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+    chrome_options.add_argument(f'--disk-cache-size={DISK_CACHE_MB * 1024 * 1024}')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--no-default-browser-check')
+
+
+def clear_live_session(driver, origin='https://www.agoda.com'):
+    """
+    실행 중인 브라우저를 다음 CID 에 재사용할 때 - 쿠키/스토리지만 CDP 로 삭제
+    (HTTP 캐시와 DNS/TLS 연결은 그대로 남는다)
+    """
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+        'origin': origin,
+        'storageTypes': 'cookies,local_storage,session_storage,indexeddb,websql,service_workers,shader_cache',
+    })
+    driver.get('about:blank')
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_profile_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ProfileManager()
+        return _manager
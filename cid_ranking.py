@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from cids import ALL_CIDS
+from price_quote import parse_price
+
+# 빠른 모드(fast mode): 과거 기록(price_history)으로 CID 순서를 정하고, 확신이 서면 일찍 멈춘다
+# - 순위: CID 가 그 분석에서 최저가(동률 포함)였던 비율. 호텔 → 지역 → 전체 순으로 부족한 표본을 보정
+# - 동치 클래스: 함께 조회된 분석에서 가격이 항상 같았던 CID 들은 하나만 조회하고 나머지는 같은 결과로 본다
+# - 조기 종료: 상위 FAST_TOP_K 개를 확인한 뒤 추가로 FAST_PATIENCE 개 연속 더 싼 가격이 없으면 종료
+# 과거 분석이 MIN_HISTORY_JOBS 개 미만이면 기존 순서 그대로 전체 조회 (학습할 근거가 없음)
+
+FAST_TOP_K = int(os.environ.get("FAST_TOP_K", "5"))
+FAST_PATIENCE = int(os.environ.get("FAST_PATIENCE", "4"))
+MIN_HISTORY_JOBS = int(os.environ.get("FAST_MIN_HISTORY_JOBS", "10"))
+EQUIV_MIN_JOBS = int(os.environ.get("FAST_EQUIV_MIN_JOBS", "8"))
+PRIOR_STRENGTH = 3.0
+HISTORY_LIMIT = 50000
+GLOBAL_CACHE_SEC = 300
+
+_global_cache = {}   # cid 집합 → (계산 시각, 전체 분석 기록)
+_global_cache_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def group_jobs(rows, cid_values):
+    """관측치 → {job_id: {cid: Decimal 가격}} (기준가 행과 가격 없는 행 제외)"""
+    jobs = {}
+    for row in rows:
+        if row['phase'] == 'base' or row['cid'] not in cid_values or not row['price']:
+            continue
+        quote = parse_price(row['price'], default_currency=row['currency'])
+        if quote is None:
+            continue
+        jobs.setdefault(row['job_id'], {})[row['cid']] = quote.amount
+    return {job_id: prices for job_id, prices in jobs.items() if len(prices) >= 2}
+
+
+def count_wins(jobs):
+    """CID 별 (최저가였던 횟수, 조회된 횟수)"""
+    wins, seen = {}, {}
+    for prices in jobs.values():
+        lowest = min(prices.values())
+        for cid, amount in prices.items():
+            seen[cid] = seen.get(cid, 0) + 1
+            if amount <= lowest:
+                wins[cid] = wins.get(cid, 0) + 1
+    return wins, seen
+
+
+def mean_gaps(jobs):
+    """CID 별 최저가 대비 평균 차이 비율 - 최저가였던 적이 없는 CID 끼리의 순서를 정할 때 사용"""
+    total, seen = {}, {}
+    for prices in jobs.values():
+        lowest = min(prices.values())
+        if lowest <= 0:
+            continue
+        for cid, amount in prices.items():
+            total[cid] = total.get(cid, 0.0) + float(amount / lowest - 1)
+            seen[cid] = seen.get(cid, 0) + 1
+    return {cid: total[cid] / seen[cid] for cid in total}
+
+
+def smoothed_rates(levels, cid_values):
+    """levels: [(wins, seen), ...] 넓은 범위(전체) → 좁은 범위(호텔) 순. 상위 범위를 사전분포로 삼아 보정"""
+    rates = {}
+    for cid in cid_values:
+        rate = 0.5
+        for wins, seen in levels:
+            rate = (wins.get(cid, 0) + PRIOR_STRENGTH * rate) / (seen.get(cid, 0) + PRIOR_STRENGTH)
+        rates[cid] = rate
+    return rates
+
+
+def equivalence_classes(jobs, cid_values):
+    """항상 같은 가격이었던 CID 묶음 → {cid: 대표 후보 집합 id} (union-find)"""
+    by_cid = {}
+    for job_id, prices in jobs.items():
+        for cid, amount in prices.items():
+            by_cid.setdefault(cid, {})[job_id] = amount
+
+    parent = {cid: cid for cid in cid_values}
+
+    def find(cid):
+        while parent[cid] != cid:
+            parent[cid] = parent[parent[cid]]
+            cid = parent[cid]
+        return cid
+
+    cids = [c for c in cid_values if c in by_cid]
+    for i, a in enumerate(cids):
+        for b in cids[i + 1:]:
+            common = by_cid[a].keys() & by_cid[b].keys()
+            if len(common) >= EQUIV_MIN_JOBS and all(by_cid[a][j] == by_cid[b][j] for j in common):
+                parent[find(b)] = find(a)
+    return {cid: find(cid) for cid in cid_values}
+
+
+def _global_jobs(history, cid_values):
+    """전체 기록은 크고 자주 바뀌지 않으므로 GLOBAL_CACHE_SEC 동안 재사용"""
+    key = (id(history), frozenset(cid_values))
+    with _global_cache_lock:
+        cached = _global_cache.get(key)
+    if cached and time.time() - cached[0] < GLOBAL_CACHE_SEC:
+        return cached[1]
+    jobs = group_jobs(history.observations(limit=HISTORY_LIMIT), cid_values)
+    with _global_cache_lock:
+        _global_cache[key] = (time.time(), jobs)
+    return jobs
+
+
+@dataclass
+class CidPlan:
+    """분석 1회의 CID 조회 순서 (세션에 저장)"""
+    mode: str
+    order: list                                   # [(cid, name), ...] 실제로 조회할 CID
+    members: dict = field(default_factory=dict)   # 대표 cid → 같은 가격으로 간주한 [(cid, name), ...]
+    early_stop: bool = False
+    history_jobs: int = 0
+
+    def to_session(self):
+        return {
+            'mode': self.mode,
+            'order': [list(c) for c in self.order],
+            'members': {cid: [list(m) for m in ms] for cid, ms in self.members.items()},
+            'early_stop': self.early_stop,
+            'history_jobs': self.history_jobs,
+        }
+
+
+def full_plan(cids=ALL_CIDS):
+    return CidPlan(mode='full', order=list(cids))
+
+
+def plan_cids(url, mode='fast', cids=ALL_CIDS, history=None):
+    """URL 의 호텔/지역 기록으로 CID 순서 결정 (mode='full' 이면 기존 순서 전체)"""
+    if mode != 'fast':
+        return full_plan(cids)
+
+    from price_history import get_history, region_slug
+    from page_text_store import hotel_slug
+
+    cid_values = {cid for cid, _ in cids}
+    try:
+        history = history or get_history()
+        global_jobs = _global_jobs(history, cid_values)
+        region = region_slug(url)
+        region_jobs = group_jobs(history.observations(region=region, limit=HISTORY_LIMIT), cid_values) if region else {}
+        hotel_jobs = group_jobs(history.observations(hotel=hotel_slug(url), limit=HISTORY_LIMIT), cid_values)
+    except Exception as e:
+        logger.warning(f"가격 이력 조회 실패 - 전체 조회로 진행: {e}")
+        return full_plan(cids)
+
+    if len(global_jobs) < MIN_HISTORY_JOBS:
+        plan = full_plan(cids)
+        plan.mode = 'fast'
+        plan.history_jobs = len(global_jobs)
+        return plan
+
+    rates = smoothed_rates([count_wins(global_jobs), count_wins(region_jobs), count_wins(hotel_jobs)], cid_values)
+    # 최저가 비율이 같으면 평균적으로 최저가에 가까운 CID 부터 (가장 좁은 범위의 기록 우선)
+    gaps = {**mean_gaps(global_jobs), **mean_gaps(region_jobs), **mean_gaps(hotel_jobs)}
+    position = {cid: i for i, (cid, _) in enumerate(cids)}
+    ranked = sorted(cids, key=lambda c: (-round(rates[c[0]], 6), gaps.get(c[0], float('inf')), position[c[0]]))
+
+    # 동치 클래스는 순위가 가장 높은 CID 하나만 조회
+    classes = equivalence_classes(global_jobs, [cid for cid, _ in cids])
+    order, members, representative = [], {}, {}
+    for cid, name in ranked:
+        root = classes[cid]
+        if root in representative:
+            members.setdefault(representative[root], []).append((cid, name))
+        else:
+            representative[root] = cid
+            order.append((cid, name))
+
+    return CidPlan(mode='fast', order=order, members=members, early_stop=True, history_jobs=len(global_jobs))
+
+
+def should_stop(checked, since_improvement, top_k=FAST_TOP_K, patience=FAST_PATIENCE):
+    """상위 top_k 개를 확인한 뒤, 추가로 patience 개 연속 더 싼 가격이 없으면 True"""
+    return min(since_improvement, checked - top_k) >= patience
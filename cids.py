@@ -0,0 +1,41 @@
+# 비교 대상 CID 목록 (app.scrape / 날짜 스윕 등에서 공용)
+
+# [검색창리스트] CID 값들
+SEARCH_CIDS = [
+    ('-1', '시크릿창'),
+    ('1829968', '구글지도A'),
+    ('1917614', '구글지도B'),
+    ('1833981', '구글지도C'),
+    ('1776688', '구글 검색A'),
+    ('1922868', '구글 검색B'),
+    ('1908612', '구글 검색C'),
+    ('1807747', 'VIO'),
+    ('1838029', '호텔스컴바인'),
+    ('1928503', 'BluePillow'),
+    ('1729890', '네이버'),
+    ('1587497', 'TripAdvisor')
+]
+
+# [카드리스트] CID 값들
+CARD_CIDS = [
+    ('1942636', '카카오페이'),
+    ('1895693', '현대카드'),
+    ('1563295', '국민카드'),
+    ('1654104', '우리카드'),
+    ('1748498', 'BC카드'),
+    ('1760133', '신한카드'),
+    ('1729471', '하나카드'),
+    ('1917334', '토스'),
+    ('1783115', '삼성카드'),
+    ('1827579', '농협카드'),
+    ('1917349', '트레블월렛'),
+    ('1845157', '페이코'),
+    ('1889319', '비자'),
+    ('1889572', '마스터카드'),
+    ('1801110', '유니온페이')
+]
+
+# 모든 CID를 합친 리스트
+ALL_CIDS = SEARCH_CIDS + CARD_CIDS
+
+CID_NAMES = dict(ALL_CIDS)
@@ -0,0 +1,159 @@
+import numpy as np
+from dataclasses import dataclass
+
+from price_quote import parse_price
+
+# 호텔 × CID × 날짜 가격 행렬을 만들고 할인율/순위/최저 CID/가격 폭을 한 번에(벡터 연산) 계산
+# - 가격이 없는 칸은 NaN
+# - 한 호텔 안에서는 통화가 같아야 한다 (다르면 ValueError)
+
+
+@dataclass
+class PriceMatrix:
+    hotels: list
+    cids: list
+    dates: list
+    prices: np.ndarray       # shape (H, C, D), float64, 없는 값은 NaN
+    currencies: list         # 호텔별 통화 코드
+
+    def index_of_cid(self, cid):
+        return self.cids.index(cid)
+
+
+@dataclass
+class ComparisonResult:
+    matrix: PriceMatrix
+    base_prices: np.ndarray  # (H, D)
+    discounts: np.ndarray    # (H, C, D) 기준가 대비 할인율 %, 소수 1자리
+    ranks: np.ndarray        # (H, C, D) 1 = 최저가, 가격 없음 = 0
+    best_cid_idx: np.ndarray # (H, D) 최저가 CID 인덱스, 가격이 하나도 없으면 -1
+    best_prices: np.ndarray  # (H, D)
+    spreads: np.ndarray      # (H, D) 최고가 - 최저가
+
+    def best_cid(self, hotel_idx, date_idx=0):
+        idx = int(self.best_cid_idx[hotel_idx, date_idx])
+        return self.matrix.cids[idx] if idx >= 0 else None
+
+    def to_rows(self):
+        """JSON 으로 내보내기 쉬운 (호텔, 날짜) 단위 요약"""
+        rows = []
+        m = self.matrix
+        for h, hotel in enumerate(m.hotels):
+            for d, date in enumerate(m.dates):
+                best = self.best_cid(h, d)
+                rows.append({
+                    'hotel': hotel,
+                    'date': date,
+                    'currency': m.currencies[h],
+                    'base_price': _nan_to_none(self.base_prices[h, d]),
+                    'best_cid': best,
+                    'best_price': _nan_to_none(self.best_prices[h, d]),
+                    'spread': _nan_to_none(self.spreads[h, d]),
+                    'discounts': {cid: _nan_to_none(self.discounts[h, c, d]) for c, cid in enumerate(m.cids)},
+                })
+        return rows
+
+
+def _nan_to_none(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def build_price_matrix(records, hotels=None, cids=None, dates=None):
+    """
+    records: (hotel, cid, date, price) 튜플들 - price 는 PriceQuote / 문자열 / 숫자 / None
+    hotels, cids, dates 를 주면 그 순서를 따르고, 없으면 처음 나온 순서대로
+    """
+    records = list(records)
+    hotels = list(hotels) if hotels is not None else list(dict.fromkeys(r[0] for r in records))
+    cids = list(cids) if cids is not None else list(dict.fromkeys(r[1] for r in records))
+    dates = list(dates) if dates is not None else list(dict.fromkeys(r[2] for r in records))
+
+    hotel_pos = {h: i for i, h in enumerate(hotels)}
+    cid_pos = {c: i for i, c in enumerate(cids)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+
+    prices = np.full((len(hotels), len(cids), len(dates)), np.nan, dtype=np.float64)
+    currencies = [None] * len(hotels)
+
+    for hotel, cid, date, price in records:
+        if hotel not in hotel_pos or cid not in cid_pos or date not in date_pos:
+            continue
+        quote = parse_price(price) if price is not None and not isinstance(price, (int, float)) else price
+        if quote is None:
+            continue
+        h = hotel_pos[hotel]
+        if isinstance(quote, (int, float)):
+            amount = float(quote)
+        else:
+            amount = float(quote.amount)
+            if quote.currency:
+                if currencies[h] is None:
+                    currencies[h] = quote.currency
+                elif currencies[h] != quote.currency:
+                    raise ValueError(f"호텔 {hotel} 의 통화가 섞여 있습니다: {currencies[h]} / {quote.currency}")
+        prices[h, cid_pos[cid], date_pos[date]] = amount
+
+    return PriceMatrix(hotels=hotels, cids=cids, dates=dates, prices=prices, currencies=currencies)
+
+
+def compare_matrix(matrix, base_cid=None):
+    """
+    기준 CID(없으면 첫 번째 CID) 대비 전 구간을 한 번에 계산
+    할인율 부호는 app.scrape 와 동일 - 저렴하면 양수, 비싸면 음수
+    """
+    prices = matrix.prices
+    base_idx = matrix.index_of_cid(base_cid) if base_cid is not None else 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        base = prices[:, base_idx, :]                                  # (H, D)
+        base_b = base[:, np.newaxis, :]
+        discounts = np.round((base_b - prices) / base_b * 100, 1)
+        discounts[~np.isfinite(discounts)] = np.nan
+
+    missing = np.isnan(prices)
+    filled = np.where(missing, np.inf, prices)
+    # 같은 가격이면 CID 목록 순서가 앞선 쪽이 높은 순위 (stable)
+    order = np.argsort(filled, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, prices.shape[1] + 1)[np.newaxis, :, np.newaxis], axis=1)
+    ranks = np.where(missing, 0, ranks)
+
+    any_price = ~missing.all(axis=1)                                   # (H, D)
+    best_idx = np.where(any_price, order[:, 0, :], -1)
+    best = np.where(any_price, filled.min(axis=1), np.nan)
+    worst = np.where(any_price, np.where(missing, -np.inf, prices).max(axis=1), np.nan)
+
+    return ComparisonResult(
+        matrix=matrix,
+        base_prices=base,
+        discounts=discounts,
+        ranks=ranks,
+        best_cid_idx=best_idx,
+        best_prices=best,
+        spreads=worst - best,
+    )
+
+
+def room_key(offer):
+    """객실 비교 키 - 객실명 / 조식 / 취소 규정 / 요금 기준 (하나라도 다르면 다른 상품)"""
+    return ' / '.join(str(v) for v in (offer.get('room'), offer.get('board'),
+                                       offer.get('cancellation'), offer.get('basis')) if v)
+
+
+def build_room_matrix(rooms_by_cid, date=None, cids=None):
+    """
+    {cid: [객실 요금 dict (scraper.extract_room_offers)]} → 객실 키를 호텔 축으로 쓰는 PriceMatrix
+    한 CID 안에 같은 키의 요금이 여러 개면 최저가 - compare_matrix 로 객실별 할인율/최저 CID 를 계산
+    """
+    lowest = {}
+    for cid, offers in rooms_by_cid.items():
+        for offer in offers or ():
+            quote = parse_price(offer.get('price'))
+            if quote is None:
+                continue
+            key = (room_key(offer), cid)
+            if key not in lowest or quote.amount < lowest[key].amount:
+                lowest[key] = quote
+    records = [(room, cid, date, quote) for (room, cid), quote in lowest.items()]
+    return build_price_matrix(records, cids=cids if cids is not None else list(rooms_by_cid), dates=[date])
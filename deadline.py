@@ -0,0 +1,65 @@
+import os
+import time
+
+# 분석 1회(job)의 전체 시간 예산과, 거기서 나눠 주는 CID 별 마감
+# - step 0 에서 job 마감(절대 시각)을 정해 세션에 두고, 단계마다 남은 예산을 남은 CID 수로 나눠 CID 마감을 만든다
+#   (CID_MIN_SEC ~ CID_MAX_SEC 로 제한, job 마감을 넘지 않음)
+# - 스크래퍼 안의 모든 대기(페이지 로드, 폴링, page_source, 재시도)는 CID 마감까지 남은 시간으로 줄어든다
+# - 남은 예산이 CID_MIN_SEC 보다 적으면 그 CID 는 스크래핑하지 않는다 → 최근 기록(STALE_MAX_AGE_SEC 이내)이
+#   있으면 캐시 가격(stale), 없으면 생략. CID 순서는 우선순위 순이라 뒤쪽(낮은 순위) CID 부터 빠진다
+# 시각은 time.time() 기준 - 단계마다 다른 워커가 받아도 같은 마감을 본다
+
+JOB_BUDGET_SEC = float(os.environ.get("JOB_BUDGET_SEC", "300"))
+MAX_JOB_BUDGET_SEC = float(os.environ.get("MAX_JOB_BUDGET_SEC", "1800"))
+CID_MIN_SEC = float(os.environ.get("CID_MIN_SEC", "8"))
+CID_MAX_SEC = float(os.environ.get("CID_MAX_SEC", "40"))
+STALE_MAX_AGE_SEC = int(os.environ.get("STALE_MAX_AGE_SEC", str(7 * 24 * 3600)))
+MIN_WAIT_SEC = 0.1   # 마감이 지나도 블로킹 호출에 0 을 넘기지 않도록
+
+
+class Deadline:
+    """절대 시각 마감 - remaining()/timeout() 으로 대기 시간을 잘라 쓴다"""
+
+    def __init__(self, at):
+        self.at = float(at)
+
+    @classmethod
+    def after(cls, seconds):
+        return cls(time.time() + seconds)
+
+    def remaining(self):
+        return max(0.0, self.at - time.time())
+
+    def expired(self):
+        return time.time() >= self.at
+
+    def timeout(self, cap):
+        """기존 고정 타임아웃(cap) 과 남은 시간 중 작은 값"""
+        return max(MIN_WAIT_SEC, min(cap, self.remaining()))
+
+    def child(self, seconds):
+        """지금부터 seconds 뒤와 이 마감 중 빠른 쪽"""
+        return Deadline(min(self.at, time.time() + seconds))
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.1f}s)"
+
+
+def job_budget(requested=None):
+    """요청에 실린 예산(초) - 없거나 이상하면 기본값, MAX_JOB_BUDGET_SEC 로 제한"""
+    try:
+        budget = float(requested) if requested is not None else JOB_BUDGET_SEC
+    except (TypeError, ValueError):
+        budget = JOB_BUDGET_SEC
+    if budget <= 0:
+        budget = JOB_BUDGET_SEC
+    return min(budget, MAX_JOB_BUDGET_SEC)
+
+
+def cid_deadline(job_deadline, remaining_cids):
+    """이번 CID 의 마감 - 예산이 CID_MIN_SEC 도 안 남았으면 None (스크래핑하지 않음)"""
+    left = job_deadline.remaining()
+    if left < CID_MIN_SEC:
+        return None
+    share = left / max(1, remaining_cids)
+    return job_deadline.child(min(CID_MAX_SEC, max(CID_MIN_SEC, share)))
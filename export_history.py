@@ -0,0 +1,184 @@
+"""
+가격 이력(price_history.db) 을 분석용 컬럼 파일(Parquet / Arrow IPC)로 증분 내보내기
+
+- 출력: <out>/date=<관측일 UTC>/hotel=<호텔>/part-<첫 id>-<끝 id>.parquet  (Hive 파티션 - pyarrow.dataset, DuckDB, Spark 로 바로 읽힘)
+- 증분/추가 전용: 마지막으로 내보낸 관측 id 를 <out>/_export_state.json 에 두고 그 다음 행부터만 쓴다
+  (이미 쓴 파일은 건드리지 않음, 같은 구간을 다시 내보내면 같은 파일명이라 중복이 생기지 않는다)
+- 메모리는 배치 크기(--batch-size)만큼만 사용 - 배치 1개를 읽어 파티션별로 나눠 쓰고 버린다
+- 필요 패키지: pyarrow (선택 의존성, pyproject 의 [analytics] extra)
+
+사용법:
+    python export_history.py --out history_export
+    python export_history.py --out history_export --format arrow --batch-size 200000
+    python export_history.py --out history_export --full      # 상태 파일 무시하고 처음부터
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from price_history import PriceHistory, PRICE_HISTORY_DB
+from scraper import canonical_url
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+STATE_FILE = '_export_state.json'
+PRICE_SCALE = 2
+# app.py 의 phase 이름 → 분석용 구분 (그 밖의 값 - sweep 등 - 은 그대로)
+PHASE_KINDS = {'base': 'base', '검색창리스트': 'search', '카드리스트': 'card'}
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def schema():
+    pa = pyarrow
+    return pa.schema([
+        ('id', pa.int64()),
+        ('ts', pa.timestamp('ms', tz='UTC')),
+        ('job_id', pa.string()),
+        ('canonical_url', pa.string()),
+        ('hotel', pa.string()),
+        ('region', pa.string()),
+        ('check_in', pa.string()),
+        ('los', pa.int32()),
+        ('cid', pa.string()),
+        ('cid_name', pa.string()),
+        ('phase', pa.string()),
+        ('phase_kind', pa.string()),
+        ('base_price', pa.decimal128(18, PRICE_SCALE)),
+        ('price', pa.decimal128(18, PRICE_SCALE)),
+        ('currency', pa.string()),
+        ('discount', pa.float64()),
+        ('latency', pa.float64()),
+    ])
+
+
+def _query_value(url, *names):
+    for pair in urlparse(url or '').query.split('&'):
+        key, _, value = pair.partition('=')
+        if key.lower() in names:
+            return value
+    return None
+
+
+def _decimal(text):
+    if text is None:
+        return None
+    try:
+        return Decimal(text).quantize(Decimal(1).scaleb(-PRICE_SCALE))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def to_record(row):
+    los = _query_value(row['url'], 'los')
+    return {
+        'id': row['id'],
+        'ts': datetime.fromtimestamp(row['ts'], tz=timezone.utc),
+        'job_id': row['job_id'],
+        'canonical_url': canonical_url(row['url']),
+        'hotel': row['hotel'],
+        'region': row['region'],
+        'check_in': _query_value(row['url'], 'checkin'),
+        'los': int(los) if los and los.isdigit() else None,
+        'cid': row['cid'],
+        'cid_name': row['cid_name'],
+        'phase': row['phase'],
+        'phase_kind': PHASE_KINDS.get(row['phase'], row['phase']),
+        'base_price': _decimal(row['base_price']),
+        'price': _decimal(row['price']),
+        'currency': row['currency'],
+        'discount': row['discount'],
+        'latency': row['latency'],
+    }
+
+
+def partition_of(row):
+    day = datetime.fromtimestamp(row['ts'], tz=timezone.utc).strftime('%Y-%m-%d')
+    return day, row['hotel'] or 'unknown'
+
+
+def load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'last_id': 0, 'rows': 0}
+
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def write_part(out_dir, day, hotel, records, fmt):
+    """파티션 1개 분량을 임시 파일에 쓰고 이름 변경 (읽는 쪽이 쓰다 만 파일을 보지 않도록)"""
+    table = pyarrow.Table.from_pylist(records, schema=schema())
+    part_dir = os.path.join(out_dir, f"date={day}", f"hotel={hotel}")
+    os.makedirs(part_dir, exist_ok=True)
+    path = os.path.join(part_dir, f"part-{records[0]['id']:012d}-{records[-1]['id']:012d}.{EXTENSIONS[fmt]}")
+    tmp = f"{path}.tmp"
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression='zstd')
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, tmp, compression='zstd')
+    os.replace(tmp, path)
+    return path
+
+
+def export(history, out_dir, fmt='parquet', batch_size=50000, full=False):
+    """마지막 내보내기 이후의 관측치를 파티션 파일로 - (내보낸 행 수, 쓴 파일 수)"""
+    os.makedirs(out_dir, exist_ok=True)
+    state = {'last_id': 0, 'rows': 0} if full else load_state(out_dir)
+    exported = files = 0
+    for batch in history.iter_batches(after_id=state['last_id'], batch_size=batch_size):
+        partitions = {}
+        for row in batch:
+            partitions.setdefault(partition_of(row), []).append(to_record(row))
+        for (day, hotel), records in partitions.items():
+            write_part(out_dir, day, hotel, records, fmt)
+            files += 1
+        # 배치 파일을 다 쓴 뒤에 상태를 넘긴다 - 중간에 죽으면 같은 배치를 같은 파일명으로 다시 쓴다
+        exported += len(batch)
+        state = {'last_id': batch[-1]['id'], 'rows': state['rows'] + len(batch), 'updated_at': time.time()}
+        save_state(out_dir, state)
+    return exported, files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가격 이력 Parquet/Arrow 증분 내보내기")
+    parser.add_argument('--db', default=PRICE_HISTORY_DB)
+    parser.add_argument('--out', default='history_export', help="출력 디렉터리")
+    parser.add_argument('--format', choices=tuple(EXTENSIONS), default='parquet')
+    parser.add_argument('--batch-size', type=int, default=50000, help="한 번에 읽는 행 수 (메모리 사용량 기준)")
+    parser.add_argument('--full', action='store_true', help="상태 파일을 무시하고 처음부터 다시 내보내기")
+    args = parser.parse_args(argv)
+
+    if pyarrow is None:
+        print("pyarrow 패키지가 필요합니다 (pip install '.[analytics]')")
+        return 1
+    if not os.path.exists(args.db):
+        print(f"가격 이력 DB 가 없습니다: {args.db}")
+        return 1
+
+    start = time.perf_counter()
+    exported, files = export(PriceHistory(args.db), args.out, args.format, max(1, args.batch_size), args.full)
+    elapsed = time.perf_counter() - start
+    state = load_state(args.out)
+    print(f"내보낸 행: {exported:,} (파일 {files}개, {elapsed:.1f}초) · 누적 {state['rows']:,}행 · 마지막 id {state['last_id']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
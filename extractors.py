@@ -0,0 +1,393 @@
+import os
+import re
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from records import Record
+
+# 사이트별 가격 추출 정의 (레지스트리) - 새 사이트는 코드 대신 정의(dict / JSON)만 추가
+#   primary       : 가격이 확실한 요소 (CSS 셀렉터 + 가격이 든 속성) - 아고다 StickyNavPrice
+#   title         : 호텔명 요소
+#   candidates    : 보조 가격 후보 셀렉터 (단순 셀렉터만: tag, .class, [attr], [attr="v"], [attr*="v"])
+#   price_patterns: 후보 요소 텍스트에서 가격을 뽑는 정규식
+#   negative      : 후보 주변 텍스트에 있으면 버리는 단어 (평균가 등)
+#   text_patterns / text_negative : 페이지 전체 텍스트 검색용
+#   start_patterns: 최종 결과로 쓰는 "시작가 <가격>" 패턴 (첫 매치)
+#   rooms         : 객실별 요금 (ROOM_OFFERS=1) - room/name/offer/price 셀렉터와 조식·취소 규정·요금 기준 키워드
+#                   네 셀렉터도 같은 매처로 한 번에 모으고, 요소의 조상 관계로 객실 ↔ 요금 행을 잇는다
+# 후보 셀렉터는 하나의 매처로 컴파일해 문서를 한 번만 순회하면서 모든 셀렉터의 후보를 모은다
+# (셀렉터마다 soup.select() 로 전체 트리를 다시 도는 방식과 달리 규칙이 늘어도 순회 비용은 그대로)
+# SITE_EXTRACTORS_FILE 에 JSON 목록을 주면 같은 형식의 정의를 추가/덮어쓴다
+
+SITE_EXTRACTORS_FILE = os.environ.get("SITE_EXTRACTORS_FILE")
+DEFAULT_SITE = 'agoda'
+
+logger = logging.getLogger(__name__)
+
+AGODA = {
+    'name': 'agoda',
+    'hosts': ['agoda.com'],
+    'primary': {'selector': 'div.StickyNavPrice', 'attr': 'data-element-cheapest-room-price'},
+    'title': {'selector': 'h1[data-selenium="hotel-header-name"]'},
+    'candidates': [
+        # 일반적인 호텔 예약 사이트 가격 클래스들
+        '[class*="price"]',
+        '[class*="cost"]',
+        '[class*="rate"]',
+        '[class*="amount"]',
+        '[class*="total"]',
+        '[class*="nightly"]',
+        '[data-testid*="price"]',
+        '[data-price]',
+        # 더 구체적인 셀렉터들
+        '.room-price',
+        '.hotel-price',
+        '.booking-price',
+        '.final-price',
+    ],
+    'price_patterns': [
+        r'(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # $100-99999.99
+        r'([1-9]\d{2,4}(?:\.\d{2})?\s*USD)',  # 123.45 USD
+        r'(\$[1-9]\d{1,2})',  # $10-999
+    ],
+    'negative': ['average', 'avg', 'stands at', 'typical', '평균'],
+    'text_patterns': [
+        # 실제 예약 가격이 나올 가능성이 높은 패턴들
+        r'(\$[1-9]\d{2,4}(?:\.\d{2})?)\s*(?:per night|night|/night)',  # $123 per night
+        r'(\$[1-9]\d{2,4}(?:\.\d{2})?)\s*(?:total|Total)',  # $123 total
+        r'(?:from|From)\s*(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # from $123
+        r'(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # 일반 $123
+        r'([1-9]\d{2,4}(?:\.\d{2})?\s*USD)',  # 123 USD
+    ],
+    'text_negative': [
+        'with an average room price of',
+        'which stands at',
+        'average room price',
+        'typical price',
+        'generally costs',
+        'usually costs',
+        '평균 객실 요금',
+    ],
+    'start_patterns': [
+        r'시작가\s*(USD\s+[\d,]+(?:\.\d+)?)',         # USD 46 형태
+        r'시작가\s*(KRW\s+[\d,]+(?:\.\d+)?)',         # KRW 46000 형태
+        r'시작가\s*(THB\s+[\d,]+(?:\.\d+)?)',         # THB 1500 형태
+        r'시작가\s*([₩]\s*[\d,]+(?:\.\d+)?)',         # ₩ 33,458 형태 (공백 포함)
+        r'시작가\s*([₩][\d,]+(?:\.\d+)?)',           # ₩46000 형태
+        r'시작가\s*([฿]\s*[\d,]+(?:\.\d+)?)',         # ฿ 1,500 형태 (공백 포함)
+        r'시작가\s*([฿][\d,]+(?:\.\d+)?)',           # ฿1500 형태
+        r'시작가\s*(\$\s*[\d,]+(?:\.\d+)?)',         # $ 46 형태 (공백 포함)
+        r'시작가\s*(\$[\d,]+(?:\.\d+)?)',            # $46 형태
+        r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*USD)',      # 46 USD 형태
+        r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*THB)',      # 46 THB 형태
+        r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*KRW)',      # 46 KRW 형태
+    ],
+    'rooms': {
+        'room': '[data-selenium="MasterRoom"]',
+        'name': '[data-selenium="masterroom-title-name"]',
+        'offer': '[data-selenium="ChildRoomsList-room"]',
+        'price': '[data-selenium="display-price"]',
+        # 키워드는 소문자, 위에서부터 먼저 맞는 값 (불포함을 포함보다 먼저)
+        'board': [
+            ('room_only', ['room only', 'no meals', 'breakfast not included', '조식 불포함', '식사 불포함']),
+            ('half_board', ['half board', 'dinner included', '석식 포함']),
+            ('breakfast', ['breakfast included', 'breakfast for', '조식 포함']),
+        ],
+        'cancellation': [
+            ('non_refundable', ['non-refundable', 'nonrefundable', '환불 불가']),
+            ('free', ['free cancellation', '무료 취소']),
+        ],
+        'basis': [
+            ('total', ['total', 'for all nights', '총 요금', '총액']),
+            ('night', ['per night', '/night', '1박당', '1박 요금']),
+        ],
+    },
+}
+
+_SELECTOR_RE = re.compile(r'^(?P<tag>[A-Za-z][\w-]*)?(?P<rest>(?:\.[\w-]+|\[[^\]]+\])*)$')
+_PART_RE = re.compile(r'\.(?P<cls>[\w-]+)|\[(?P<attr>[\w-]+)(?:(?P<op>\*?=)"(?P<value>[^"]*)")?\]')
+
+
+def compile_selector(selector):
+    """단순 셀렉터 → (태그, [(연산, 속성, 값), ...]) - 지원하지 않는 형식은 ValueError"""
+    match = _SELECTOR_RE.match(selector.strip())
+    if not match or not (match.group('tag') or match.group('rest')):
+        raise ValueError(f"지원하지 않는 셀렉터: {selector}")
+    conditions = []
+    for part in _PART_RE.finditer(match.group('rest')):
+        if part.group('cls'):
+            conditions.append(('class', 'class', part.group('cls')))
+        elif part.group('op') == '*=':
+            conditions.append(('contains', part.group('attr'), part.group('value')))
+        elif part.group('op') == '=':
+            conditions.append(('eq', part.group('attr'), part.group('value')))
+        else:
+            conditions.append(('has', part.group('attr'), None))
+    return (match.group('tag') or '').lower() or None, conditions
+
+
+def _attr_text(value):
+    return ' '.join(value) if isinstance(value, (list, tuple)) else str(value)
+
+
+def _condition_ok(attrs, op, attr, value):
+    if attr not in attrs:
+        return False
+    if op == 'has':
+        return True
+    if op == 'class':
+        raw = attrs[attr]
+        return value in (raw if isinstance(raw, (list, tuple)) else raw.split())
+    if op == 'eq':
+        return _attr_text(attrs[attr]) == value
+    return value in _attr_text(attrs[attr])
+
+
+class CandidateMatcher:
+    """여러 셀렉터를 한 번의 문서 순회로 매칭 - 요소의 속성 이름으로 검사할 규칙만 골라서 확인"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self._by_attr = {}   # 첫 조건의 속성 → [(규칙 번호, 태그, 조건들)]
+        self._by_tag = {}    # 조건 없이 태그만 있는 규칙
+        for i, selector in enumerate(self.selectors):
+            tag, conditions = compile_selector(selector)
+            if conditions:
+                self._by_attr.setdefault(conditions[0][1], []).append((i, tag, conditions))
+            else:
+                self._by_tag.setdefault(tag, []).append(i)
+
+    def match(self, soup):
+        """규칙 순서별 요소 목록 (각 목록은 문서 순서, soup.select() 결과와 동일)"""
+        buckets = [[] for _ in self.selectors]
+        for element in soup.find_all(True):
+            attrs = element.attrs
+            for i in self._by_tag.get(element.name, ()):
+                buckets[i].append(element)
+            for attr in attrs:
+                for i, tag, conditions in self._by_attr.get(attr, ()):
+                    if tag and tag != element.name:
+                        continue
+                    if all(_condition_ok(attrs, *c) for c in conditions):
+                        buckets[i].append(element)
+        return buckets
+
+
+@dataclass(frozen=True, slots=True)
+class RoomOffer(Record):
+    """객실 요금 1건 - price 는 페이지 표기 그대로 (price_quote.parse_price 로 해석)"""
+    room: str
+    price: str
+    board: str = None          # breakfast / half_board / room_only
+    cancellation: str = None   # free / non_refundable
+    basis: str = None          # night / total
+
+    def to_dict(self):
+        return {'room': self.room, 'price': self.price, 'board': self.board,
+                'cancellation': self.cancellation, 'basis': self.basis}
+
+
+def _classify(text, rules):
+    for value, keywords in rules or ():
+        if any(keyword in text for keyword in keywords):
+            return value
+    return None
+
+
+def _nearest(element, targets):
+    """element 의 조상 중 targets(id → 요소)에 있는 가장 가까운 것"""
+    parent = element.parent
+    while parent is not None:
+        if id(parent) in targets:
+            return parent
+        parent = parent.parent
+    return None
+
+
+@dataclass
+class SiteExtractor:
+    name: str
+    hosts: list = field(default_factory=list)
+    primary: dict = None
+    title: dict = None
+    candidates: list = field(default_factory=list)
+    price_patterns: list = field(default_factory=list)
+    negative: list = field(default_factory=list)
+    text_patterns: list = field(default_factory=list)
+    text_negative: list = field(default_factory=list)
+    start_patterns: list = field(default_factory=list)
+    rooms: dict = None
+
+    def __post_init__(self):
+        self.matcher = CandidateMatcher(self.candidates)
+        self.room_matcher = None
+        if self.rooms:
+            self.room_matcher = CandidateMatcher(
+                [self.rooms['room'], self.rooms['name'], self.rooms.get('offer') or self.rooms['room'], self.rooms['price']])
+        self.price_res = [re.compile(p, re.IGNORECASE) for p in self.price_patterns]
+        self.text_res = [re.compile(p, re.IGNORECASE) for p in self.text_patterns]
+        self.start_res = [re.compile(p, re.IGNORECASE) for p in self.start_patterns]
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(**{k: v for k, v in spec.items() if k in cls.__dataclass_fields__})
+
+    def handles(self, host):
+        return any(host == h or host.endswith('.' + h) for h in self.hosts)
+
+    # ---- 추출 ----
+    def primary_price(self, soup):
+        """확실한 가격 요소 → (가격, 호텔명) - 없으면 (0, "")"""
+        if not self.primary:
+            return 0, ""
+        element = soup.select_one(self.primary['selector'])
+        if element is None:
+            return 0, ""
+        price = element.get(self.primary['attr']) if self.primary.get('attr') else element.get_text(strip=True)
+        if not price:
+            return 0, ""
+        title = ""
+        if self.title:
+            title_element = soup.select_one(self.title['selector'])
+            if title_element is not None:
+                title = title_element.get_text()
+        return price, title
+
+    def candidate_prices(self, soup, limit=3):
+        """후보 셀렉터 요소에서 가격 (셀렉터 순서 → 문서 순서, 최대 limit 개)"""
+        found, seen = [], set()
+        parent_text = {}   # 같은 부모를 여러 후보가 공유하므로 텍스트는 한 번만
+
+        for selector, elements in zip(self.candidates, self.matcher.match(soup)):
+            for element in elements:
+                text = element.get_text(strip=True)
+                for pattern in self.price_res:
+                    for price_text in pattern.findall(text):
+                        if price_text in seen:
+                            continue
+                        parent = element.parent
+                        if parent is None:
+                            context = text.lower()
+                        else:
+                            if id(parent) not in parent_text:
+                                parent_text[id(parent)] = parent.get_text(strip=True).lower()
+                            context = parent_text[id(parent)]
+                        if any(word in context for word in self.negative):
+                            continue
+                        seen.add(price_text)
+                        found.append({
+                            'price': price_text,
+                            'context': f"Found in {selector}: {text[:100]}",
+                            'source': 'targeted_element',
+                        })
+                        if len(found) >= limit:
+                            return found
+        return found
+
+    def text_prices(self, text, seen=(), limit=5):
+        """페이지 전체 텍스트에서 가격 (주변 80자에 제외 단어가 있으면 버림)"""
+        found, seen = [], set(seen)
+        for pattern in self.text_res:
+            for match in pattern.finditer(text):
+                price_text = match.group(1).strip()
+                if price_text in seen:
+                    continue
+                context = text[max(0, match.start() - 80):min(len(text), match.end() + 80)].strip()
+                if any(word in context.lower() for word in self.text_negative):
+                    continue
+                seen.add(price_text)
+                found.append({
+                    'price': price_text,
+                    'context': re.sub(r'\s+', ' ', context)[:150],
+                    'source': 'text_search',
+                })
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def room_offers(self, soup):
+        """페이지의 모든 객실 요금 → [RoomOffer] (문서 1회 순회, 객실 정의가 없으면 빈 목록)"""
+        from price_quote import parse_price
+
+        if self.room_matcher is None:
+            return []
+        rooms, names, offers, prices = self.room_matcher.match(soup)
+        room_ids = {id(e): e for e in rooms}
+        offer_ids = {id(e): e for e in offers}
+
+        room_names = {}
+        for element in names:
+            room = _nearest(element, room_ids)
+            if room is not None and id(room) not in room_names:
+                room_names[id(room)] = element.get_text(' ', strip=True)
+        offer_prices = {}
+        for element in prices:
+            # 객실 자체가 요금 행인 레이아웃(offer 셀렉터 없음)도 있으므로 자기 자신부터 본다
+            offer = element if id(element) in offer_ids else _nearest(element, offer_ids)
+            if offer is not None and id(offer) not in offer_prices:
+                offer_prices[id(offer)] = element.get_text(' ', strip=True)
+
+        found = []
+        for offer in offers:
+            price = offer_prices.get(id(offer))
+            if not price or parse_price(price) is None:
+                continue
+            room = offer if id(offer) in room_ids else _nearest(offer, room_ids)
+            text = offer.get_text(' ', strip=True).lower()
+            found.append(RoomOffer(
+                room=room_names.get(id(room), '') if room is not None else '',
+                price=price,
+                board=_classify(text, self.rooms.get('board')),
+                cancellation=_classify(text, self.rooms.get('cancellation')),
+                basis=_classify(text, self.rooms.get('basis')),
+            ))
+        return found
+
+    def start_price(self, text):
+        """"시작가 <가격>" 첫 매치 - 없으면 None"""
+        for pattern in self.start_res:
+            match = pattern.search(text)
+            if match:
+                return match.group(1).strip() or None
+        return None
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register(spec):
+    """정의(dict 또는 SiteExtractor) 등록 - 같은 이름이면 교체"""
+    extractor = spec if isinstance(spec, SiteExtractor) else SiteExtractor.from_dict(spec)
+    with _registry_lock:
+        _registry[extractor.name] = extractor
+    return extractor
+
+
+def load_extractors(path):
+    with open(path, encoding='utf-8') as f:
+        specs = json.load(f)
+    return [register(spec) for spec in (specs if isinstance(specs, list) else [specs])]
+
+
+def get_extractor(url=None, name=None):
+    """이름 또는 URL 호스트로 추출기 선택 (없으면 아고다)"""
+    with _registry_lock:
+        if name and name in _registry:
+            return _registry[name]
+        host = (urlparse(url).hostname or '').lower() if url else ''
+        for extractor in _registry.values():
+            if host and extractor.handles(host):
+                return extractor
+        return _registry[DEFAULT_SITE]
+
+
+register(AGODA)
+if SITE_EXTRACTORS_FILE:
+    try:
+        load_extractors(SITE_EXTRACTORS_FILE)
+    except Exception as e:
+        logger.error(f"사이트 추출 정의 로드 실패 ({SITE_EXTRACTORS_FILE}): {e}")
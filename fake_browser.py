@@ -0,0 +1,84 @@
+import os
+import time
+import random
+import hashlib
+import logging
+
+# 부하 테스트용 가짜 브라우저 (SCRAPER_BACKEND=fake) - 크롬 없이 실제 스크래핑 경로(풀, 폴링, 파싱, 추출)를 그대로 태운다
+# - get(): FAKE_NAV_SEC 동안 블로킹 (페이지 로드)
+# - page_source: 로드 후 FAKE_PRICE_SEC 가 지나야 StickyNavPrice 가 나타남 (그 전에는 로딩 중 페이지)
+# - 가격은 URL 의 cid 로 정해져서 CID 마다 다르고 같은 CID 는 항상 같다
+# - FAKE_FAIL_RATE 비율의 페이지는 가격이 끝내 나오지 않는다 (재시도 경로 확인용)
+# 시간 값에는 ±FAKE_JITTER 비율의 무작위 편차를 준다
+
+FAKE_LAUNCH_SEC = float(os.environ.get("FAKE_LAUNCH_SEC", "0.2"))
+FAKE_NAV_SEC = float(os.environ.get("FAKE_NAV_SEC", "1.0"))
+FAKE_PRICE_SEC = float(os.environ.get("FAKE_PRICE_SEC", "1.5"))
+FAKE_JITTER = float(os.environ.get("FAKE_JITTER", "0.3"))
+FAKE_FAIL_RATE = float(os.environ.get("FAKE_FAIL_RATE", "0.0"))
+
+logger = logging.getLogger(__name__)
+
+_LOADING_HTML = "<html><head><title>Agoda</title></head><body><div>Loading rooms...</div></body></html>"
+
+
+def _jittered(seconds):
+    return max(0.0, seconds * (1 + random.uniform(-FAKE_JITTER, FAKE_JITTER)))
+
+
+def fake_price(url):
+    """URL 의 cid 로 정해지는 가짜 가격 (₩ 80,000 ~ 120,000)"""
+    match = [p for p in url.split('?', 1)[-1].split('&') if p.startswith('cid=')]
+    digest = hashlib.md5((match[0] if match else url).encode()).digest()
+    return 80000 + int.from_bytes(digest[:2], 'big') % 400 * 100
+
+
+class FakeDriver:
+    """scrape_prices_simple / 브라우저 풀이 쓰는 WebDriver 메서드만 흉내"""
+
+    def __init__(self):
+        time.sleep(_jittered(FAKE_LAUNCH_SEC))
+        self.url = 'about:blank'
+        self._ready_at = 0.0
+        self._fails = False
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        time.sleep(_jittered(FAKE_NAV_SEC))
+        self.url = url
+        self._ready_at = time.time() + _jittered(FAKE_PRICE_SEC)
+        self._fails = random.random() < FAKE_FAIL_RATE
+
+    def execute_script(self, script, *args):
+        if 'innerHTML' in script or 'outerHTML' in script:
+            return self.page_source
+        return 'complete'
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    @property
+    def page_source(self):
+        if self.url == 'about:blank' or self._fails or time.time() < self._ready_at:
+            return _LOADING_HTML
+        return (
+            "<html><body>"
+            f'<div class="StickyNavPrice" data-element-cheapest-room-price="₩ {fake_price(self.url):,}"></div>'
+            '<h1 data-selenium="hotel-header-name">Load Test Hotel</h1>'
+            "</body></html>"
+        )
+
+    def quit(self):
+        pass
+
+
+def launch_fake_driver():
+    return FakeDriver()
@@ -0,0 +1,32 @@
+import os
+
+# 운영용 gunicorn 설정: gunicorn -c gunicorn.conf.py main:app
+# - 앱과 무거운 모듈(selenium/bs4)은 마스터에서 한 번만 import 후 fork (preload_app)
+# - 스크래핑 요청은 수십 초씩 블로킹되므로 스레드 워커(gthread) 사용
+# - 각 워커는 브라우저 풀을 채운 뒤에야 요청을 받는다 (post_worker_init)
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+
+
+def on_starting(server):
+    # fork 전에 import 해 두면 워커들이 copy-on-write로 공유한다
+    import scraper
+    scraper.preload_heavy_modules()
+
+
+def post_worker_init(worker):
+    # 이 훅이 끝나야 워커가 accept 루프에 들어간다
+    from app import warm_up_worker
+    warm_up_worker()
+
+
+def worker_exit(server, worker):
+    from browser_pool import get_pool
+    get_pool().shutdown()
@@ -0,0 +1,323 @@
+"""
+웹 앱 부하 테스트 - script.js 와 같은 단계별 분석 흐름을 N 명의 가상 사용자로 돌리면서 사용자 수를 늘려 간다
+
+- 가상 사용자 1명: POST /scrape step 0 → step 1.. (has_next 가 끝날 때까지), 그동안 /progress 를 폴링,
+  --cancel-rate 비율로 중간에 POST /cancel
+- 기본은 앱을 직접 띄운다 (gunicorn, SCRAPER_BACKEND=fake → fake_browser.py 가 크롬 대신 지연만 흉내)
+- 단계(사용자 수)마다 처리량, 오류율, 엔드포인트별 지연 백분위, 서버 RSS(워커 포함) 를 보고
+
+사용법:
+    python loadtest.py --users 1,2,4,8,16 --stage-sec 60
+    python loadtest.py --server werkzeug --users 1,4 --stage-sec 20 --report loadtest.json
+    python loadtest.py --url http://127.0.0.1:5000 --server-pid 1234   # 이미 떠 있는 서버
+    FAKE_NAV_SEC=2 FAKE_PRICE_SEC=3 python loadtest.py ...               # 가짜 브라우저 지연 조절
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import date, timedelta
+
+import requests
+
+# 체크인은 한 달 뒤 (지난 날짜는 사전 검사(preflight.py)에서 거절된다)
+DEFAULT_TARGET = ("https://www.agoda.com/ko-kr/load-test-hotel/hotel/seoul-kr.html"
+                  f"?cid=1890020&currencyCode=KRW&checkIn={date.today() + timedelta(days=30)}&los=1&adults=2&rooms=1")
+ENDPOINTS = ('/scrape', '/progress', '/cancel')
+
+
+def percentile(values, pct):
+    """최근접 순위 백분위"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# ---- 서버 RSS ----
+def _children(pid):
+    pids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    return pids
+
+
+def process_tree_rss(pid):
+    """pid 와 모든 자식 프로세스의 RSS 합 (바이트, /proc 이 없으면 None)"""
+    total, stack, seen = 0, [pid], set()
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            if current == pid:
+                return None
+            continue
+        stack += _children(current)
+    return total
+
+
+# ---- 서버 실행 ----
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, workers, threads, pool_size, workdir):
+    """SCRAPER_BACKEND=fake 로 앱 실행 → (Popen, base_url)"""
+    port = _free_port()
+    env = dict(os.environ)
+    env.setdefault('SCRAPER_BACKEND', 'fake')
+    env.setdefault('PREFLIGHT_PROBE', '0')   # 가짜 호텔 URL 이므로 실제 아고다에 확인하지 않는다
+    env.update({
+        'BIND': f"127.0.0.1:{port}",
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(threads),
+        'BROWSER_POOL_SIZE': str(pool_size),
+        # 테스트가 남기는 파일은 임시 디렉터리에
+        'SHARED_STATE_URL': f"sqlite:///{os.path.join(workdir, 'shared_state.db')}",
+        'PRICE_HISTORY_DB': os.path.join(workdir, 'price_history.db'),
+        'PAGE_TEXT_DIR': os.path.join(workdir, 'downloads'),
+        'SNAPSHOT_DIR': os.path.join(workdir, 'snapshots'),
+    })
+    here = os.path.dirname(os.path.abspath(__file__))
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app']
+    else:
+        cmd = [sys.executable, '-c',
+               f"from app import app, warm_up_worker; warm_up_worker(); "
+               f"app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"]
+    proc = subprocess.Popen(cmd, cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"서버가 시작하지 못했습니다 (종료 코드 {proc.returncode})")
+        try:
+            if requests.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("서버 준비 시간 초과 (60초)")
+
+
+# ---- 측정 ----
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {e: [] for e in ENDPOINTS}
+        self.errors = {e: 0 for e in ENDPOINTS}
+        self.flows = 0
+        self.cancelled_flows = 0
+
+    def request(self, endpoint, elapsed, ok):
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def flow_done(self, cancelled=False):
+        with self._lock:
+            self.flows += 1
+            if cancelled:
+                self.cancelled_flows += 1
+
+
+class VirtualUser:
+    """script.js 의 analyzeCid() 흐름 1명분"""
+
+    def __init__(self, base_url, recorder, target, mode, poll_interval, cancel_rate, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.target = target
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.cancel_rate = cancel_rate
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def _call(self, method, endpoint, path=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + (path or endpoint), timeout=self.timeout, **kwargs)
+            data = response.json()
+            ok = response.status_code < 400 and not data.get('error')
+        except (requests.RequestException, ValueError):
+            data, ok = None, False
+        self.recorder.request(endpoint, time.perf_counter() - start, ok)
+        return data
+
+    def _poll(self, job_id, stop):
+        while not stop.wait(self.poll_interval):
+            self._call('GET', '/progress', f"/progress?job_id={job_id}")
+
+    def run_flow(self, deadline):
+        job_id = uuid.uuid4().hex[:16]
+        stop = threading.Event()
+        poller = threading.Thread(target=self._poll, args=(job_id, stop), daemon=True)
+        poller.start()
+        cancel_at = random.randint(1, 10) if random.random() < self.cancel_rate else None
+        cancelled = False
+        try:
+            step = 0
+            while True:
+                data = self._call('POST', '/scrape', json={
+                    'url': self.target, 'step': step, 'job_id': job_id, 'mode': self.mode})
+                if not data or data.get('error') or data.get('status') == 'cancelled':
+                    break
+                if not data.get('has_next') or time.time() >= deadline:
+                    break
+                step = data['next_step']
+                if step == cancel_at:
+                    self._call('POST', '/cancel', json={'job_id': job_id})
+                    cancelled = True
+        finally:
+            stop.set()
+            poller.join()
+        self.recorder.flow_done(cancelled)
+
+    def run(self, deadline):
+        while time.time() < deadline:
+            self.run_flow(deadline)
+
+
+def run_stage(base_url, users, seconds, args, server_pid):
+    recorder = Recorder()
+    deadline = time.time() + seconds
+    rss_samples = []
+    sampling = threading.Event()
+
+    def sample_rss():
+        while not sampling.wait(1.0):
+            if server_pid:
+                rss = process_tree_rss(server_pid)
+                if rss is not None:
+                    rss_samples.append(rss)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    start = time.time()
+    threads = [threading.Thread(target=VirtualUser(base_url, recorder, args.target, args.mode, args.poll_interval,
+                                                   args.cancel_rate, args.timeout).run, args=(deadline,), daemon=True)
+               for _ in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    sampling.set()
+    sampler.join()
+
+    total_requests = sum(len(v) for v in recorder.latencies.values())
+    total_errors = sum(recorder.errors.values())
+    return {
+        'users': users,
+        'seconds': round(elapsed, 1),
+        'flows': recorder.flows,
+        'cancelled_flows': recorder.cancelled_flows,
+        'flows_per_min': round(recorder.flows / elapsed * 60, 2) if elapsed else 0,
+        'requests_per_sec': round(total_requests / elapsed, 2) if elapsed else 0,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0,
+        'rss_mb_max': round(max(rss_samples) / 2 ** 20, 1) if rss_samples else None,
+        'endpoints': {
+            endpoint: {
+                'count': len(values),
+                'errors': recorder.errors[endpoint],
+                'p50_ms': _ms(percentile(values, 50)),
+                'p90_ms': _ms(percentile(values, 90)),
+                'p99_ms': _ms(percentile(values, 99)),
+                'max_ms': _ms(max(values) if values else None),
+            } for endpoint, values in recorder.latencies.items()
+        },
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def print_stage(result):
+    print(f"\n== 사용자 {result['users']}명 ({result['seconds']}초) ==")
+    print(f"  분석 {result['flows']}건 (중단 {result['cancelled_flows']}) · {result['flows_per_min']}건/분 · "
+          f"{result['requests_per_sec']} req/s · 오류율 {result['error_rate'] * 100:.2f}% · "
+          f"RSS 최대 {result['rss_mb_max'] if result['rss_mb_max'] is not None else '-'} MB")
+    print(f"  {'엔드포인트':<10} {'요청':>7} {'오류':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for endpoint, s in result['endpoints'].items():
+        cells = [f"{s[k]:>7.1f}ms" if s[k] is not None else f"{'-':>9}" for k in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')]
+        print(f"  {endpoint:<10} {s['count']:>7} {s['errors']:>5} {' '.join(cells)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="웹 앱 부하 테스트 (가상 사용자 단계별 증가)")
+    parser.add_argument('--users', default='1,2,4,8', help="단계별 동시 사용자 수 (쉼표 구분)")
+    parser.add_argument('--stage-sec', type=float, default=60, help="단계당 시간(초)")
+    parser.add_argument('--url', default=None, help="이미 떠 있는 서버 주소 (없으면 직접 실행)")
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--server-pid', type=int, default=None, help="--url 사용 시 RSS 를 잴 서버 pid")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn 워커 수")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn 워커당 스레드 수")
+    parser.add_argument('--pool-size', type=int, default=2, help="워커당 (가짜) 브라우저 수")
+    parser.add_argument('--target', default=DEFAULT_TARGET, help="분석할 아고다 URL")
+    parser.add_argument('--mode', choices=('full', 'fast'), default='full')
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="/progress 폴링 간격 (script.js 와 동일)")
+    parser.add_argument('--cancel-rate', type=float, default=0.1, help="중간에 중단하는 분석 비율")
+    parser.add_argument('--timeout', type=float, default=180, help="요청 타임아웃(초)")
+    parser.add_argument('--report', default=None, help="결과를 JSON 으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    stages = [int(u) for u in args.users.split(',') if u.strip()]
+    proc = None
+    workdir = tempfile.mkdtemp(prefix='loadtest_')
+    try:
+        if args.url:
+            base_url, server_pid = args.url.rstrip('/'), args.server_pid
+        else:
+            proc, base_url = start_server(args.server, args.workers, args.threads, args.pool_size, workdir)
+            server_pid = proc.pid
+            print(f"서버 시작: {base_url} ({args.server}, pid {server_pid}, 작업 디렉터리 {workdir})")
+
+        results = []
+        for users in stages:
+            result = run_stage(base_url, users, args.stage_sec, args, server_pid)
+            results.append(result)
+            print_stage(result)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'stages': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n보고서 저장: {args.report}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import os
+import re
+import gzip
+import time
+import queue
+import logging
+import threading
+
+# /download 로 내려주는 페이지 텍스트 저장소
+# - 키: <job_id>/<호텔>_cid_<cid>.txt  (동시에 여러 사용자가 분석해도 덮어쓰지 않음)
+# - 스크래핑 경로에서는 HTML 을 큐에 넣기만 하고, 텍스트 변환/압축/쓰기는 백그라운드 스레드가 처리
+# - zstandard 가 설치돼 있으면 .zst, 없으면 .gz
+# - 보관 기간/전체 용량 한도를 넘으면 오래된 파일부터 삭제
+
+STORE_DIR = os.environ.get("PAGE_TEXT_DIR", "downloads")
+COMPRESSION = os.environ.get("PAGE_TEXT_COMPRESSION", "zstd")   # zstd | gzip
+MAX_AGE_SEC = int(os.environ.get("PAGE_TEXT_MAX_AGE_SEC", str(24 * 3600)))
+MAX_TOTAL_MB = int(os.environ.get("PAGE_TEXT_MAX_MB", "500"))
+RETENTION_EVERY_SEC = 60
+CHUNK_SIZE = 64 * 1024
+QUEUE_MAX = 128
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}/[A-Za-z0-9_.-]{1,160}\.txt$')
+
+logger = logging.getLogger(__name__)
+
+
+def clean_job_id(value):
+    """클라이언트가 보낸 job_id 정리 (경로로 쓰이므로 영숫자/-/_ 만 허용)"""
+    value = re.sub(r'[^A-Za-z0-9_-]', '', str(value or ''))[:64]
+    return value or None
+
+
+def hotel_slug(url):
+    """URL 경로에서 호텔 식별용 짧은 이름 (/ko-kr/<호텔>/hotel/<도시>.html)"""
+    from urllib.parse import urlparse
+
+    parts = [p for p in urlparse(url).path.split('/') if p]
+    if 'hotel' in parts and parts.index('hotel') > 0:
+        slug = parts[parts.index('hotel') - 1]
+    else:
+        slug = parts[-1] if parts else 'hotel'
+    slug = re.sub(r'\.html?$', '', slug)
+    return re.sub(r'[^A-Za-z0-9_-]', '', slug)[:80] or 'hotel'
+
+
+def make_key(job_id, url, cid):
+    cid = re.sub(r'[^0-9A-Za-z-]', '', str(cid))
+    return f"{clean_job_id(job_id) or 'nojob'}/{hotel_slug(url)}_cid_{cid}.txt"
+
+
+def is_valid_key(key):
+    return bool(_KEY_RE.match(key or '')) and '..' not in key
+
+
+def _use_zstd():
+    return COMPRESSION == 'zstd' and zstandard is not None
+
+
+class PageTextStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._queue = queue.Queue(maxsize=QUEUE_MAX)
+        self._pending = set()
+        self._pending_lock = threading.Condition()
+        self._last_retention = 0
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    # ---- 쓰기 ----
+    def submit(self, key, url, html):
+        """큐에 넣고 바로 반환 - 큐가 가득 차면 이번 페이지는 저장하지 않음"""
+        if not is_valid_key(key):
+            return False
+        with self._pending_lock:
+            self._pending.add(key)
+        try:
+            self._queue.put_nowait((key, url, html, time.time()))
+            return True
+        except queue.Full:
+            self._done(key)
+            logger.warning(f"페이지 텍스트 큐가 가득 차서 건너뜀: {key}")
+            return False
+
+    def _done(self, key):
+        with self._pending_lock:
+            self._pending.discard(key)
+            self._pending_lock.notify_all()
+
+    def _writer_loop(self):
+        while True:
+            key, url, html, captured_at = self._queue.get()
+            try:
+                self._write(key, url, html, captured_at)
+            except Exception as e:
+                logger.warning(f"페이지 텍스트 저장 실패 {key}: {e}")
+            finally:
+                self._done(key)
+            if time.time() - self._last_retention > RETENTION_EVERY_SEC:
+                self.enforce_retention()
+
+    def _write(self, key, url, html, captured_at):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html or '', 'html.parser')
+        for element in soup(["script", "style"]):
+            element.decompose()
+        text = re.sub(r'\n\s*\n+', '\n\n', soup.get_text())
+
+        header = (
+            f"URL: {url}\n"
+            f"스크래핑 시간: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(captured_at))}\n"
+            + "=" * 50 + "\n\n"
+        )
+        data = (header + text).encode('utf-8')
+
+        path = self._path_for(key, zstd=_use_zstd())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        if _use_zstd():
+            with open(tmp_path, 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=6).compress(data))
+        else:
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+    # ---- 읽기 ----
+    def _path_for(self, key, zstd):
+        return os.path.join(self.root, key + ('.zst' if zstd else '.gz'))
+
+    def find(self, key, wait=5.0):
+        """저장된 파일 (경로, 'zstd'|'gzip') - 아직 쓰는 중이면 최대 wait 초 대기"""
+        if not is_valid_key(key):
+            return None, None
+        with self._pending_lock:
+            self._pending_lock.wait_for(lambda: key not in self._pending, timeout=wait)
+        for zstd in (True, False):
+            path = self._path_for(key, zstd)
+            if os.path.exists(path):
+                return path, ('zstd' if zstd else 'gzip')
+        return None, None
+
+    def iter_text(self, path, codec):
+        """압축을 풀면서 CHUNK_SIZE 단위로 내보냄 (파일 전체를 메모리에 올리지 않음)"""
+        if codec == 'zstd':
+            with open(path, 'rb') as raw:
+                reader = zstandard.ZstdDecompressor().stream_reader(raw)
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        else:
+            with gzip.open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def iter_raw(self, path):
+        """압축된 바이트 그대로 (클라이언트가 gzip 을 받을 수 있을 때)"""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    # ---- 보관 정책 ----
+    def enforce_retention(self):
+        self._last_retention = time.time()
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > MAX_AGE_SEC:
+                    self._remove(path)
+                else:
+                    files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        limit = MAX_TOTAL_MB * 1024 * 1024
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            self._remove(path)
+            total -= size
+
+        # 빈 job 디렉터리 정리
+        for name in os.listdir(self.root):
+            job_dir = os.path.join(self.root, name)
+            if os.path.isdir(job_dir) and not os.listdir(job_dir):
+                try:
+                    os.rmdir(job_dir)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PageTextStore()
+        return _store
@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import logging
+import threading
+
+from deadline import Deadline
+from tracing import span
+
+# 링크를 붙여 넣은 직후의 추측 실행 - 사용자가 링크를 확인하고 "분석 시작" 을 누르기 전에 기준가를 미리 조회
+# - /prefetch 가 호출되면 사전 검사(결과는 preflight 캐시에 남아 step 0 이 다시 쓰고), 브라우저 풀을 채우고,
+#   step 0 과 같은 URL(reorder_url_parameters)로 기준가 스크래핑을 백그라운드에서 시작한다
+# - 추측 작업은 scheduler 의 speculative 레인(interactive 다음)에서 PREFETCH_BUDGET_SEC 마감 안에서만 돌고,
+#   프로세스당 PREFETCH_MAX_INFLIGHT 건과 interactive 몫을 뺀 자리 수(SCHED_CAPACITY - SCHED_INTERACTIVE_RESERVE)
+#   중 작은 쪽까지만 - 추측 조회가 실제 /scrape 의 자리를 차지하지 않는다
+#   (워커당 브라우저가 1개인 기본 설정처럼 남는 자리가 없으면 interactive 레인이 비어 있을 때만 1건 -
+#    그 뒤에 온 /scrape 는 진행 중인 추측 조회 1건(최대 PREFETCH_BUDGET_SEC)만 기다린다)
+# - 자리가 없으면 사전 검사/브라우저 준비 없이 'busy', 꺼져 있으면 'disabled' (페이지는 더 보내지 않는다)
+# - step 0 이 같은 URL 을 요청하면 결과를 가져간다 (진행 중이면 그 마감까지만 기다림)
+#   PREFETCH_TTL_SEC 안에 제출되지 않은 결과는 버린다
+# 결과는 이 프로세스에만 있다 - step 0 이 다른 워커로 가면 평소처럼 스크래핑 (추측 결과는 TTL 후 버려짐)
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_BUDGET_SEC = float(os.environ.get("PREFETCH_BUDGET_SEC", "25"))
+PREFETCH_TTL_SEC = float(os.environ.get("PREFETCH_TTL_SEC", "120"))
+PREFETCH_MAX_INFLIGHT = int(os.environ.get("PREFETCH_MAX_INFLIGHT", "2"))
+CLAIM_GRACE_SEC = 2   # 마감 직후 추출이 끝나기를 기다리는 여유
+
+logger = logging.getLogger(__name__)
+
+
+class _Prefetch:
+    __slots__ = ('key', 'tenant', 'created', 'deadline', 'done', 'result')
+
+    def __init__(self, key, tenant):
+        self.key = key
+        self.tenant = tenant
+        self.created = time.time()
+        self.deadline = Deadline.after(PREFETCH_BUDGET_SEC)
+        self.done = threading.Event()
+        self.result = None
+
+
+def prefetch_enabled():
+    return PREFETCH_ENABLED and PREFETCH_MAX_INFLIGHT > 0
+
+
+def max_inflight():
+    """동시에 돌릴 추측 조회 수 - interactive 몫(SCHED_INTERACTIVE_RESERVE)은 남긴다
+    (남는 자리가 없으면 interactive 레인이 비어 있을 때만 1)"""
+    from scheduler import get_scheduler
+    if not prefetch_enabled():
+        return 0
+    scheduler = get_scheduler()
+    spare = scheduler.capacity - scheduler.reserve
+    if spare > 0:
+        return min(PREFETCH_MAX_INFLIGHT, spare)
+    return 1 if scheduler.idle('interactive') else 0
+
+
+def prefetch_key(url):
+    """step 0 이 기준가를 조회하는 URL 과 같은 형태"""
+    from scraper import reorder_url_parameters
+
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return reorder_url_parameters(url)
+
+
+class Prefetcher:
+    def __init__(self):
+        self._entries = {}   # 키 → _Prefetch
+        self._lock = threading.Lock()
+
+    def _purge(self):
+        # 제출되지 않은 결과 정리 (self._lock 안에서)
+        cutoff = time.time() - PREFETCH_TTL_SEC
+        for key in [k for k, e in self._entries.items() if e.created < cutoff and e.done.is_set()]:
+            del self._entries[key]
+
+    def accepts(self, url):
+        """start 가 'busy' 가 아닐지 - 이미 있는 URL 이거나 자리가 남았는지 (/prefetch 가 사전 검사 전에 확인)"""
+        key = prefetch_key(url)
+        with self._lock:
+            self._purge()
+            if key in self._entries:
+                return True
+            return sum(1 for e in self._entries.values() if not e.done.is_set()) < max_inflight()
+
+    def start(self, url, tenant=None):
+        """추측 조회 시작 - 'started' | 'running' | 'ready' | 'busy'"""
+        key = prefetch_key(url)
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key)
+            if entry is not None:
+                return 'ready' if entry.done.is_set() else 'running'
+            if sum(1 for e in self._entries.values() if not e.done.is_set()) >= max_inflight():
+                return 'busy'
+            entry = self._entries[key] = _Prefetch(key, tenant)
+        threading.Thread(target=self._run, args=(entry,), name='prefetch', daemon=True).start()
+        return 'started'
+
+    def _run(self, entry):
+        from async_orchestrator import scrape_url
+
+        currency = re.search(r'currencyCode=([^&]+)', entry.key)
+        try:
+            with span('prefetch', cat='prefetch'):
+                entry.result = scrape_url(entry.key, original_currency_code=currency.group(1) if currency else None,
+                                          deadline=entry.deadline, lane='speculative', tenant=entry.tenant)
+        except Exception as e:
+            logger.info(f"추측 조회 실패: {e}")
+        finally:
+            entry.done.set()
+
+    def claim(self, url):
+        """step 0 에서 호출 - 같은 URL 의 추측 결과 (없거나 마감 안에 끝나지 않으면 None)"""
+        key = prefetch_key(url)
+        with self._lock:
+            self._purge()
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        if not entry.done.wait(entry.deadline.remaining() + CLAIM_GRACE_SEC):
+            logger.info(f"추측 조회가 마감 안에 끝나지 않음 - 다시 조회: {key}")
+            return None
+        return entry.result
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for e in self._entries.values() if not e.done.is_set())
+            return {'running': running, 'ready': len(self._entries) - running}
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
+
+
+def claim_prefetch(url):
+    if not prefetch_enabled():
+        return None
+    return get_prefetcher().claim(url)
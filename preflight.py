@@ -0,0 +1,201 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+# 브라우저를 쓰기 전의 사전 검사 - 잘못된 링크는 크롬을 띄우지 않고 바로 거절
+# 1) 구조 검사 (수 ms): http(s), 아고다 호스트, /<호텔>/hotel/<도시>.html 경로, checkIn 날짜, los 또는 checkOut
+# 2) HTTP 확인 (PREFLIGHT_PROBE=1): 연결을 재사용하는 세션으로 GET 1번 - 404/410, 호텔 페이지가 아닌 곳으로의
+#    리다이렉트는 거절하고, 본문 앞부분에서 호텔 id 를 찾는다. 봇 차단(403/429)·네트워크 오류·5xx 는 판단 불가로 통과
+# 확인 결과는 호텔(호스트 + 경로) 단위로 캐시 - 통과는 PREFLIGHT_CACHE_SEC, 거절/판단 불가는 PREFLIGHT_NEGATIVE_CACHE_SEC
+
+PREFLIGHT_ENABLED = os.environ.get("PREFLIGHT_ENABLED", "1") == "1"
+PREFLIGHT_PROBE = os.environ.get("PREFLIGHT_PROBE", "1") == "1"
+PREFLIGHT_TIMEOUT = float(os.environ.get("PREFLIGHT_TIMEOUT", "4"))
+PREFLIGHT_CACHE_SEC = int(os.environ.get("PREFLIGHT_CACHE_SEC", "3600"))
+PREFLIGHT_NEGATIVE_CACHE_SEC = int(os.environ.get("PREFLIGHT_NEGATIVE_CACHE_SEC", "300"))
+CACHE_MAX = 2048
+PROBE_MAX_BYTES = 256 * 1024   # 호텔 id 는 문서 앞쪽에 있다 - 전체 페이지는 받지 않는다
+ALLOWED_HOST_RE = re.compile(r'(^|\.)agoda\.com$')
+HOTEL_PATH_RE = re.compile(r'/[^/]+/hotel/[^/]+\.html?$', re.I)
+HOTEL_ID_RE = re.compile(r'["\']?hotel_?id["\']?\s*[:=]\s*["\']?(\d{2,})', re.I)
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PreflightResult:
+    ok: bool
+    reason: str = ''
+    hotel_id: str = None
+    final_url: str = None
+    cached: bool = False
+
+
+def _params(url):
+    """쿼리 파라메터 (키는 소문자, 디코딩 없이)"""
+    params = {}
+    for pair in urlparse(url).query.split('&'):
+        key, _, value = pair.partition('=')
+        if key:
+            params[key.lower()] = value
+    return params
+
+
+def _parse_date(text):
+    if not text or not DATE_RE.match(text):
+        return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def check_structure(url, require_dates=True):
+    """URL 구조/필수 파라메터 검사 - 통과하면 None, 아니면 거절 사유"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return '올바른 URL 형식이 아닙니다'
+    if not ALLOWED_HOST_RE.search(parsed.hostname.lower()):
+        return '아고다 링크가 아닙니다'
+    if not HOTEL_PATH_RE.search(parsed.path):
+        return '호텔 상세 페이지 링크가 아닙니다'
+    if not require_dates:
+        return None
+
+    params = _params(url)
+    check_in = _parse_date(params.get('checkin'))
+    if check_in is None:
+        return '체크인 날짜(checkIn)가 없거나 형식이 잘못되었습니다'
+    # 시간대 차이를 감안해 하루 전까지는 허용
+    if check_in < date.today() - timedelta(days=1):
+        return '체크인 날짜가 이미 지났습니다'
+    los = params.get('los')
+    if los is not None:
+        if not los.isdigit() or int(los) < 1:
+            return '숙박일수(los)가 잘못되었습니다'
+    else:
+        check_out = _parse_date(params.get('checkout'))
+        if check_out is None or check_out <= check_in:
+            return '숙박일수(los) 또는 체크아웃 날짜가 없습니다'
+    for key in ('adults', 'rooms'):
+        if key in params and not (params[key].isdigit() and int(params[key]) >= 1):
+            return f'{key} 값이 잘못되었습니다'
+    return None
+
+
+def hotel_key(url):
+    """캐시 키 - 호스트 + 경로 (날짜/CID 가 달라도 같은 호텔)"""
+    parsed = urlparse(url)
+    return f"{(parsed.hostname or '').lower()}{parsed.path.lower()}"
+
+
+class Preflight:
+    def __init__(self, probe=PREFLIGHT_PROBE, timeout=PREFLIGHT_TIMEOUT):
+        self.probe_enabled = probe
+        self.timeout = timeout
+        self._cache = OrderedDict()   # 호텔 키 → (만료 시각, PreflightResult)
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _http(self):
+        # requests 는 첫 확인 때 불러온다 (콜드 스타트 단축) - 연결 풀은 스레드 간 공유
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+                'Accept-Language': 'en-US,en;q=0.9',
+            })
+            self._session = session
+        return self._session
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _remember(self, key, result):
+        # 확인이 끝난 통과만 길게 - 거절과 판단 불가(연결 실패, 봇 차단)는 짧게
+        ttl = PREFLIGHT_CACHE_SEC if result.ok and not result.reason else PREFLIGHT_NEGATIVE_CACHE_SEC
+        with self._lock:
+            self._cache[key] = (time.time() + ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_MAX:
+                self._cache.popitem(last=False)
+
+    def probe(self, url):
+        """HTTP 확인 - 확실히 잘못된 경우만 거절"""
+        try:
+            response = self._http().get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+        except Exception as e:
+            logger.info(f"사전 확인 연결 실패 - 통과 처리: {e}")
+            return PreflightResult(ok=True, reason='unreachable')
+        try:
+            if response.status_code in (404, 410):
+                return PreflightResult(ok=False, reason='존재하지 않는 호텔 페이지입니다', final_url=response.url)
+            if response.status_code >= 400:
+                # 봇 차단/일시 오류 - 브라우저로는 열릴 수 있으므로 판단하지 않음
+                return PreflightResult(ok=True, reason=f'http {response.status_code}', final_url=response.url)
+            if response.history and not HOTEL_PATH_RE.search(urlparse(response.url).path):
+                return PreflightResult(ok=False, reason='호텔 페이지가 아닌 곳으로 이동되는 링크입니다',
+                                       final_url=response.url)
+            head = b''
+            for chunk in response.iter_content(chunk_size=16384):
+                head += chunk
+                if len(head) >= PROBE_MAX_BYTES:
+                    break
+            match = HOTEL_ID_RE.search(head.decode('utf-8', 'ignore'))
+            return PreflightResult(ok=True, hotel_id=match.group(1) if match else None, final_url=response.url)
+        finally:
+            response.close()
+
+    def check(self, url, require_dates=True):
+        reason = check_structure(url, require_dates)
+        if reason:
+            return PreflightResult(ok=False, reason=reason)
+        if not self.probe_enabled:
+            return PreflightResult(ok=True)
+        key = hotel_key(url)
+        cached = self._cached(key)
+        if cached is not None:
+            return PreflightResult(ok=cached.ok, reason=cached.reason, hotel_id=cached.hotel_id,
+                                   final_url=cached.final_url, cached=True)
+        result = self.probe(url)
+        self._remember(key, result)
+        return result
+
+
+_preflight = None
+_preflight_lock = threading.Lock()
+
+
+def get_preflight():
+    global _preflight
+    with _preflight_lock:
+        if _preflight is None:
+            _preflight = Preflight()
+        return _preflight
+
+
+def preflight(url, require_dates=True):
+    """스크래핑 경로에서 호출 - 사전 검사가 꺼져 있으면 항상 통과"""
+    if not PREFLIGHT_ENABLED:
+        return PreflightResult(ok=True)
+    return get_preflight().check(url, require_dates)
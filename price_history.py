@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlparse
+
+from page_text_store import hotel_slug
+
+# CID 별 과거 가격 기록 (SQLite) - CID 우선순위 학습(cid_ranking.py)과 이력 내보내기에 사용
+# 분석 1회(job) 안에서 기준가 1줄 + CID 마다 1줄씩 쌓인다
+#   hotel  : URL 경로의 호텔 이름 (/ko-kr/<hotel>/hotel/<city>.html)
+#   region : URL 경로의 도시 이름
+#   phase  : base(기준가) / 검색창리스트 / 카드리스트 / sweep 등
+# 가격은 Decimal 을 잃지 않도록 문자열로 저장
+
+PRICE_HISTORY_DB = os.environ.get("PRICE_HISTORY_DB", "price_history.db")
+PRICE_HISTORY_ENABLED = os.environ.get("PRICE_HISTORY_ENABLED", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_observations (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    job_id TEXT,
+    url TEXT,
+    hotel TEXT,
+    region TEXT,
+    cid TEXT,
+    cid_name TEXT,
+    phase TEXT,
+    base_price TEXT,
+    price TEXT,
+    currency TEXT,
+    discount REAL,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS price_obs_hotel_idx ON price_observations (hotel, ts);
+CREATE INDEX IF NOT EXISTS price_obs_region_idx ON price_observations (region, ts);
+CREATE INDEX IF NOT EXISTS price_obs_ts_idx ON price_observations (ts);
+CREATE INDEX IF NOT EXISTS price_obs_url_idx ON price_observations (url, ts);
+"""
+
+COLUMNS = ('id', 'ts', 'job_id', 'url', 'hotel', 'region', 'cid', 'cid_name', 'phase',
+           'base_price', 'price', 'currency', 'discount', 'latency')
+
+
+def region_slug(url):
+    """URL 경로에서 도시 이름 (/ko-kr/<호텔>/hotel/<도시>.html → <도시>)"""
+    parts = [p for p in urlparse(url).path.split('/') if p]
+    if 'hotel' in parts and parts.index('hotel') + 1 < len(parts):
+        city = re.sub(r'\.html?$', '', parts[parts.index('hotel') + 1])
+        return re.sub(r'[^A-Za-z0-9_-]', '', city)[:80] or None
+    return None
+
+
+class PriceHistory:
+    def __init__(self, path=PRICE_HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def record(self, job_id, url, cid, cid_name, phase, base_price=None, price=None,
+               currency=None, discount=None, latency=None, ts=None):
+        self._conn().execute(
+            "INSERT INTO price_observations (ts, job_id, url, hotel, region, cid, cid_name, phase, "
+            "base_price, price, currency, discount, latency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts or time.time(), job_id, url, hotel_slug(url), region_slug(url), cid, cid_name, phase,
+             None if base_price is None else str(base_price),
+             None if price is None else str(price),
+             currency, discount, None if latency is None else round(latency, 3)))
+
+    def observations(self, hotel=None, region=None, since=None, limit=20000):
+        """최근 관측치 (dict) - hotel/region 으로 좁힐 수 있음"""
+        where, params = [], []
+        if hotel:
+            where.append("hotel = ?")
+            params.append(hotel)
+        if region:
+            where.append("region = ?")
+            params.append(region)
+        if since:
+            where.append("ts >= ?")
+            params.append(since)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM price_observations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        return [dict(zip(COLUMNS, row)) for row in self._conn().execute(sql, params)]
+
+    def iter_batches(self, after_id=0, batch_size=50000):
+        """id 순으로 after_id 이후의 관측치를 batch_size 개씩 (증분 내보내기용, 메모리는 배치 크기만큼)"""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM price_observations WHERE id > ? ORDER BY id LIMIT ?"
+        while True:
+            rows = self._conn().execute(sql, (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            yield [dict(zip(COLUMNS, row)) for row in rows]
+            after_id = rows[-1][0]
+
+    def latest_price(self, url, cid, max_age):
+        """같은 URL(날짜/인원 포함)·CID 로 max_age 초 안에 관측된 마지막 가격 (dict) - 없으면 None"""
+        row = self._conn().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM price_observations "
+            "WHERE url = ? AND cid = ? AND price IS NOT NULL AND ts >= ? ORDER BY ts DESC LIMIT 1",
+            (url, cid, time.time() - max_age)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = PriceHistory()
+        return _history
+
+
+def record_observation(**kwargs):
+    """스크래핑 경로에서 호출 - 기록 실패가 분석을 막지 않도록 예외는 로그만 남김"""
+    if not PRICE_HISTORY_ENABLED:
+        return
+    try:
+        get_history().record(**kwargs)
+    except Exception as e:
+        logger.warning(f"가격 이력 기록 실패: {e}")
+
+
+def cached_price(url, cid, max_age):
+    """예산이 모자라 스크래핑을 건너뛸 때 쓰는 최근 가격 - 조회 실패는 기록 없음과 같게 본다"""
+    if not PRICE_HISTORY_ENABLED:
+        return None
+    try:
+        return get_history().latest_price(url, cid, max_age)
+    except Exception as e:
+        logger.warning(f"가격 이력 조회 실패: {e}")
+        return None
@@ -0,0 +1,110 @@
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# 가격 문자열 → (정확한 Decimal 금액, ISO 통화 코드)
+# 예) "USD 46.50" → 46.50 USD, "₩ 33,458" → 33458 KRW, "฿1,500" → 1500 THB
+
+CURRENCY_SYMBOLS = {
+    '₩': 'KRW',
+    '￦': 'KRW',
+    '원': 'KRW',
+    '฿': 'THB',
+    '$': 'USD',
+    'US$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '¥': 'JPY',
+    '円': 'JPY',
+}
+
+_SYMBOL_RE = re.compile('|'.join(re.escape(s) for s in sorted(CURRENCY_SYMBOLS, key=len, reverse=True)))
+_ISO_RE = re.compile(r'\b([A-Z]{3})\b')
+_NUMBER_RE = re.compile(r'\d[\d,.]*\d|\d')
+
+
+def _normalize_number(num_text):
+    """천 단위 구분자/소수점 판별 후 Decimal 로 변환"""
+    if ',' in num_text and '.' in num_text:
+        # 마지막에 나온 구분자가 소수점 (1,234.56 / 1.234,56)
+        if num_text.rfind(',') > num_text.rfind('.'):
+            num_text = num_text.replace('.', '').replace(',', '.')
+        else:
+            num_text = num_text.replace(',', '')
+    elif ',' in num_text:
+        head, _, tail = num_text.rpartition(',')
+        if len(tail) == 3 or num_text.count(',') > 1:
+            num_text = num_text.replace(',', '')      # 33,458
+        else:
+            num_text = f"{head.replace(',', '')}.{tail}"  # 46,50
+    elif num_text.count('.') > 1:
+        num_text = num_text.replace('.', '')          # 1.234.567
+    try:
+        return Decimal(num_text)
+    except InvalidOperation:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class PriceQuote:
+    """통화 코드가 붙은 정확한 가격"""
+    amount: Decimal
+    currency: str = None
+    raw: str = ''
+
+    def __float__(self):
+        return float(self.amount)
+
+    def discount_from(self, base):
+        """기준가 대비 할인율(%) - 저렴하면 양수, 비싸면 음수 (소수 1자리)"""
+        return compute_discount(base, self)
+
+
+def parse_price(text, default_currency=None):
+    """가격 문자열을 PriceQuote 로 변환 (숫자가 없으면 None)"""
+    if text is None:
+        return None
+    if isinstance(text, PriceQuote):
+        return text
+    raw = str(text).strip()
+    number_match = _NUMBER_RE.search(raw)
+    if not number_match:
+        return None
+    amount = _normalize_number(number_match.group())
+    if amount is None:
+        return None
+
+    currency = None
+    iso_match = _ISO_RE.search(raw)
+    if iso_match:
+        currency = iso_match.group(1)
+    else:
+        symbol_match = _SYMBOL_RE.search(raw)
+        if symbol_match:
+            currency = CURRENCY_SYMBOLS[symbol_match.group()]
+    if currency is None and default_currency:
+        currency = str(default_currency).upper()
+
+    return PriceQuote(amount=amount, currency=currency, raw=raw)
+
+
+def same_currency(a, b):
+    """두 통화 코드가 같은지 - 어느 한쪽이라도 모르면(None) 비교 가능으로 본다"""
+    return a is None or b is None or a == b
+
+
+def compute_discount(base, current):
+    """기준가(base) 대비 현재가(current) 할인율(%) - 둘 중 하나라도 없거나 통화가 다르면 None"""
+    if isinstance(base, PriceQuote) and isinstance(current, PriceQuote) \
+            and not same_currency(base.currency, current.currency):
+        return None
+    base_amount = base.amount if isinstance(base, PriceQuote) else base
+    current_amount = current.amount if isinstance(current, PriceQuote) else current
+    if base_amount is None or current_amount is None:
+        return None
+    base_amount = Decimal(str(base_amount))
+    current_amount = Decimal(str(current_amount))
+    if base_amount == 0:
+        return None
+    pct = (base_amount - current_amount) / base_amount * 100
+    return float(pct.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
@@ -0,0 +1,231 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import functools
+import threading
+from collections import Counter
+
+# 필요할 때만 켜는 샘플링 프로파일러
+# - 요청 헤더 X-Profile: 1 / JSON profile: true (둘 다 ADMIN_TOKEN 필요) / 관리 페이지에서 켠 job_id 일 때만 동작
+#   job_id 플래그는 shared_state 의 job_state.profile 에 둔다 (워커가 여러 개여도 어느 워커든 같은 값)
+# - 대상 스레드의 스택을 SAMPLE_INTERVAL 마다 sys._current_frames() 로 읽어서 집계 (대상 코드는 그대로 실행)
+# - 꺼져 있으면 플래그 확인 한 번 외에는 아무 비용이 없다
+# - 결과: profiles/<시각>_<이름>.speedscope.json (speedscope.app) + .folded (flamegraph.pl)
+# wall 대비 cpu 시간이 작으면 크롬 대기(소켓/sleep), 크면 파이썬(파싱/정규식) 쪽에서 시간이 쓰인 것
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+MAX_PROFILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+
+logger = logging.getLogger(__name__)
+
+_thread_state = threading.local()
+
+
+def enable_job(job_id):
+    from shared_state import set_job_profile
+    set_job_profile(job_id, True)
+
+
+def disable_job(job_id):
+    from shared_state import set_job_profile
+    set_job_profile(job_id, False)
+
+
+def is_job_enabled(job_id):
+    if not job_id:
+        return False
+    from shared_state import job_profiled
+    return job_profiled(job_id)
+
+
+def enabled_jobs():
+    from shared_state import profiled_jobs
+    return profiled_jobs()
+
+
+class SamplingProfiler:
+    """한 스레드의 호출 스택을 주기적으로 샘플링"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._sampler = None
+        self.wall_time = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        self.wall_time = time.perf_counter() - self._started
+
+    def _run(self):
+        own_file = __file__
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != own_file:
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.sample_count += 1
+
+    # ---- 내보내기 ----
+    def to_folded(self):
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = ';'.join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name, meta=None):
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(round(count * self.interval, 6))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'agoda-magic-price profiling.py',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(self.wall_time, 6),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'meta': meta or {},
+        }
+
+
+def _safe_name(value):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(value))[:60]
+
+
+def _save(profiler, label, job_id, cpu_time):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1000) % 1000:03d}"
+    base = f"{stamp}_{_safe_name(label)}" + (f"_{_safe_name(job_id)}" if job_id else '')
+    meta = {
+        'label': label,
+        'job_id': job_id,
+        'wall_time': round(profiler.wall_time, 3),
+        'cpu_time': round(cpu_time, 3),
+        'samples': profiler.sample_count,
+        'interval': profiler.interval,
+        'created_at': time.time(),
+    }
+    with open(os.path.join(PROFILE_DIR, base + '.speedscope.json'), 'w', encoding='utf-8') as f:
+        json.dump(profiler.to_speedscope(base, meta), f)
+    with open(os.path.join(PROFILE_DIR, base + '.folded'), 'w', encoding='utf-8') as f:
+        f.write(profiler.to_folded())
+    with open(os.path.join(PROFILE_DIR, base + '.meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    _prune()
+    logger.info(f"프로파일 저장: {base} (wall {meta['wall_time']}s, cpu {meta['cpu_time']}s)")
+    return base
+
+
+def _prune():
+    metas = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith('.meta.json'))
+    for name in metas[:-MAX_PROFILES] if len(metas) > MAX_PROFILES else []:
+        base = name[:-len('.meta.json')]
+        for suffix in ('.meta.json', '.speedscope.json', '.folded'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, base + suffix))
+            except OSError:
+                pass
+
+
+def run_profiled(label, fn, *args, job_id=None, **kwargs):
+    """fn 을 현재 스레드에서 실행하면서 샘플링 (이미 프로파일 중이면 그냥 실행)"""
+    if getattr(_thread_state, 'active', False):
+        return fn(*args, **kwargs)
+    profiler = SamplingProfiler(threading.get_ident())
+    _thread_state.active = True
+    cpu_start = time.thread_time()
+    profiler.start()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.stop()
+        _thread_state.active = False
+        try:
+            _save(profiler, label, job_id, time.thread_time() - cpu_start)
+        except Exception as e:
+            logger.warning(f"프로파일 저장 실패: {e}")
+
+
+def enable_for_thread(job_id=None):
+    """이 스레드에서 이후 호출되는 @profiled 함수들을 프로파일 (스윕/워커용)"""
+    _thread_state.requested = True
+    _thread_state.job_id = job_id
+
+
+def disable_for_thread():
+    _thread_state.requested = False
+    _thread_state.job_id = None
+
+
+def profiled(label):
+    """데코레이터 - enable_for_thread() 가 켜진 스레드에서만 프로파일, 아니면 원래 함수 그대로"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not getattr(_thread_state, 'requested', False):
+                return fn(*args, **kwargs)
+            return run_profiled(label, fn, *args, job_id=getattr(_thread_state, 'job_id', None), **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_path(name):
+    """다운로드할 프로파일 파일 경로 (이름 검증 실패/없음이면 None)"""
+    if not re.match(r'^[A-Za-z0-9_-]+\.(speedscope\.json|folded)$', name or ''):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def list_profiles(limit=50):
+    """최근 프로파일 메타 정보 (최신순)"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    metas = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith('.meta.json')), reverse=True)[:limit]
+    result = []
+    for name in metas:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta['base'] = name[:-len('.meta.json')]
+        meta['created'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta.get('created_at', 0)))
+        result.append(meta)
+    return result
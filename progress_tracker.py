@@ -0,0 +1,286 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from shared_state import publish_progress, job_state
+
+# 작업(job) 단위 진행률 / 남은 시간(ETA) - 전역 틱커 대신 실제 단계 이벤트로 계산
+# - 분석 1회가 조회할 CID 목록으로 JobProgress 를 만들고, CID 마다 tracking() 안에서 스크래핑
+# - 스크래퍼는 stage('lease' / 'navigate' / 'poll' / 'extract') 로 현재 단계만 알린다
+# - 단계별 소요 시간은 (호스트, CID, 단계) 별 지수 이동 평균으로 학습해 진행률과 ETA 추정에 사용
+#   기록이 없으면 (호스트, 단계) → (단계) → 기본값 순으로 대신 사용
+# 별도 스레드 없이 /progress 조회 시점에 계산한다. 워커 메모리에 최근 MAX_JOBS 개 job 만 보관 (LRU)
+# 이벤트마다 to_state() 를 공유 상태(shared_state.py)에 올려서, 다른 워커가 받은 /progress 도 같은 값을 계산
+
+MAX_JOBS = int(os.environ.get("PROGRESS_MAX_JOBS", "200"))
+EWMA_ALPHA = 0.3
+# 현재 단계가 예상보다 길어져도 그 단계 끝까지는 채우지 않는다
+STAGE_CAP = 0.95
+
+STAGES = ('lease', 'navigate', 'poll', 'extract')
+STAGE_LABELS = {
+    'lease': '브라우저 준비',
+    'navigate': '페이지 여는 중',
+    'poll': '가격 확인 중',
+    'extract': '가격 정리',
+}
+DEFAULT_STAGE_SEC = {'lease': 0.5, 'navigate': 3.0, 'poll': 4.0, 'extract': 0.5}
+
+_current = contextvars.ContextVar('agoda_job_progress', default=None)   # (JobProgress, key)
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def host_of(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+class StageHistory:
+    """(호스트, CID, 단계) 별 소요 시간 지수 이동 평균"""
+
+    def __init__(self):
+        self._avg = {}
+        self._lock = threading.Lock()
+
+    def observe(self, host, cid, stage, seconds):
+        with self._lock:
+            for key in ((host, cid, stage), (host, None, stage), (None, None, stage)):
+                prev = self._avg.get(key)
+                self._avg[key] = seconds if prev is None else prev + EWMA_ALPHA * (seconds - prev)
+
+    def expected(self, host, cid, stage):
+        with self._lock:
+            for key in ((host, cid, stage), (host, None, stage), (None, None, stage)):
+                if key in self._avg:
+                    return self._avg[key]
+        return DEFAULT_STAGE_SEC[stage]
+
+    def expected_cid(self, host, cid):
+        return sum(self.expected(host, cid, s) for s in STAGES)
+
+
+_history = StageHistory()
+
+
+class _InFlight:
+    def __init__(self, cid, name):
+        self.cid = cid
+        self.name = name
+        self.started = time.time()
+        self.stage = None
+        self.stage_started = self.started
+        self.done_stages = []
+
+
+class JobProgress:
+    """job 1건 - 완료된 CID 수, 진행 중인 CID 의 현재 단계, 남은 CID"""
+
+    def __init__(self, job_id, cids, host='', concurrency=1, history=None, completed=0):
+        self.job_id = job_id
+        self.host = host
+        self.concurrency = max(1, concurrency)
+        self.history = history or _history
+        self.created_at = time.time()
+        self.pending = list(cids)          # 아직 시작하지 않은 cid
+        self.completed = completed
+        self.inflight = {}                 # key → _InFlight
+        self.finished = False
+        self._lock = threading.Lock()
+
+    # ---- 이벤트 ----
+    def start_cid(self, key, cid, name=None):
+        with self._lock:
+            if cid in self.pending:
+                self.pending.remove(cid)
+            self.inflight[key] = _InFlight(cid, name or cid)
+        self.publish()
+
+    def stage(self, key, stage):
+        now = time.time()
+        with self._lock:
+            entry = self.inflight.get(key)
+            if entry is None or entry.stage == stage:
+                return
+            self._close_stage(entry, now)
+            entry.stage = stage
+            entry.stage_started = now
+        self.publish()
+
+    def finish_cid(self, key):
+        with self._lock:
+            entry = self.inflight.pop(key, None)
+            if entry is None:
+                return
+            self._close_stage(entry, time.time())
+            self.completed += 1
+        self.publish()
+
+    def set_remaining(self, cids):
+        """조기 종료 등으로 남은 CID 목록이 바뀐 경우"""
+        with self._lock:
+            self.pending = list(cids)
+        self.publish()
+
+    def finish(self):
+        with self._lock:
+            self.pending = []
+            self.finished = True
+        self.publish()
+
+    def _close_stage(self, entry, now):
+        if entry.stage is not None:
+            self.history.observe(self.host, entry.cid, entry.stage, now - entry.stage_started)
+            entry.done_stages.append(entry.stage)
+
+    # ---- 조회 ----
+    def to_state(self):
+        """현재 상태 (JSON) - 진행 중 CID 의 단계별 예상 시간을 함께 담아 어느 프로세스에서든 snapshot 계산 가능"""
+        with self._lock:
+            inflight = list(self.inflight.values())
+            pending = list(self.pending)
+            state = {'completed': self.completed, 'finished': self.finished, 'concurrency': self.concurrency}
+        state['pending'] = len(pending)
+        state['pending_sec'] = round(sum(self.history.expected_cid(self.host, cid) for cid in pending), 3)
+        state['in_flight'] = [self._entry_state(e) for e in inflight]
+        return state
+
+    def _entry_state(self, entry):
+        return {
+            'cid': entry.cid, 'name': entry.name, 'stage': entry.stage, 'started': entry.started,
+            'stage_started': entry.stage_started, 'done_stages': list(entry.done_stages),
+            'expected': {s: round(self.history.expected(self.host, entry.cid, s), 3) for s in STAGES},
+        }
+
+    def publish(self):
+        publish_progress(self.job_id, self.to_state())
+
+    def snapshot(self):
+        return snapshot_from_state(self.to_state())
+
+
+def _cid_fraction(entry, now):
+    """진행 중인 CID 1건의 진행 비율 (0~1)과 예상 남은 시간"""
+    expected = entry['expected']
+    total = sum(expected.values())
+    done = sum(expected[s] for s in STAGES if s in entry['done_stages'])
+    if entry['stage'] is not None:
+        done += min(now - entry['stage_started'], expected[entry['stage']] * STAGE_CAP)
+    done = min(done, total * STAGE_CAP)
+    return done / total, total - done
+
+
+def snapshot_from_state(state, now=None):
+    """to_state() 결과 → /progress 응답 (pct/msg: 진행 중 CID, job_pct/eta: job 전체)"""
+    now = now or time.time()
+    inflight = state['in_flight']
+    completed = state['completed']
+    finished = state['finished']
+
+    fractions = [_cid_fraction(e, now) for e in inflight]
+    total = completed + len(inflight) + state['pending']
+    done = completed + sum(f for f, _ in fractions)
+    eta = 0.0 if finished else (max((r for _, r in fractions), default=0.0) + state['pending_sec'] / state['concurrency'])
+
+    if inflight:
+        current = inflight[-1]
+        pct = sum(f for f, _ in fractions) / len(fractions) * 100
+        msg = f"{current['name']} {STAGE_LABELS.get(current['stage'], '시작')}"
+    else:
+        pct = 100 if completed else 0
+        msg = '완료' if finished else ''
+    return {
+        'pct': int(pct),
+        'msg': msg,
+        'job_pct': int(done / total * 100) if total else (100 if finished else 0),
+        'eta': round(eta, 1),
+        'completed': completed,
+        'in_flight': [{'cid': e['cid'], 'name': e['name'], 'stage': e['stage'],
+                       'elapsed': round(now - e['started'], 1)} for e in inflight],
+        'remaining': state['pending'],
+        'total': total,
+        'finished': finished,
+    }
+
+
+def start_job(job_id, cids, url='', concurrency=1, completed=0):
+    """분석 시작 - 같은 job_id 의 이전 진행 상태는 버린다"""
+    job = JobProgress(job_id, cids, host=host_of(url), concurrency=concurrency, completed=completed)
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+        _jobs[job_id] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+    job.publish()
+    return job
+
+
+def resume_job(job_id, cids, url=''):
+    """다른 워커가 시작한 job 을 이어받을 때 - 완료 수는 공유 상태에서 가져온다"""
+    shared = job_state(job_id)
+    progress = (shared or {}).get('progress') or {}
+    return start_job(job_id, cids, url, completed=progress.get('completed', 0))
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            _jobs.move_to_end(job_id)
+        return job
+
+
+def job_progress(job_id):
+    """/progress 응답 - 이 워커에 job 이 없으면 공유 상태로 계산 (없으면 None)"""
+    job = get_job(job_id)
+    if job is not None:
+        return job.snapshot()
+    shared = job_state(job_id)
+    if shared is None or not shared.get('progress'):
+        return None
+    return snapshot_from_state(shared['progress'])
+
+
+def drop_job(job_id):
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+
+@contextmanager
+def tracking(job_id, cid, name=None, key=None):
+    """CID 1건의 스크래핑 구간 - 안에서 호출되는 stage() 가 이 job 에 기록된다"""
+    job = get_job(job_id) if job_id else None
+    if job is None:
+        yield None
+        return
+    key = key or cid
+    job.start_cid(key, cid, name)
+    token = _current.set((job, key))
+    try:
+        yield job
+    finally:
+        _current.reset(token)
+        job.finish_cid(key)
+
+
+def stage(name):
+    """스크래퍼에서 호출 - 진행 중인 CID 의 현재 단계 (job 이 없으면 아무것도 하지 않음)"""
+    current = _current.get()
+    if current is not None:
+        current[0].stage(current[1], name)
+
+
+def current_pct():
+    """진행 중인 CID 의 진행률 (progress_cb 호환용)"""
+    current = _current.get()
+    if current is None:
+        return 0
+    job, key = current
+    with job._lock:
+        entry = job.inflight.get(key)
+    if entry is None:
+        return 0
+    return int(_cid_fraction(job._entry_state(entry), time.time())[0] * 100)
@@ -0,0 +1,336 @@
+import json
+from dataclasses import dataclass, fields, replace
+from datetime import date, datetime
+from decimal import Decimal
+
+from price_quote import PriceQuote, parse_price, compute_discount
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 스크래퍼 → app → API 로 오가는 결과 레코드 (frozen + slots - 캐시에 수천 건을 들고 있어도 dict 보다 작다)
+#   PriceEntry   가격 1건 (페이지 표기 그대로 + 찾은 위치)
+#   ScrapeResult 스크래핑 1회 결과 - 모든 경로(고정 바/보조 추출/시간 초과/캐시)가 같은 형태
+#   CidResult    CID 1건의 비교 결과 (PriceQuote 로 해석된 가격, 할인율, 처리 시간)
+#   StepResult   /scrape 단계 응답 (CidResult + job 진행 정보) - 프런트가 읽는 평탄한 JSON 으로 직렬화
+#   JobSummary   큐 작업(/jobs/<id>) 집계
+# 레코드는 get()/[] 로 dict 처럼도 읽힌다 (기존 resp.get('prices') / prices[0]['price'] 코드 호환)
+# 직렬화: dumps() 는 orjson 이 있으면 orjson([fast] extra), 없으면 표준 json - 레코드는 to_dict() 로 변환
+#   encode_batch() 는 {'fields': [...], 'rows': [[...], ...]} 형태 (키를 한 번만 보내는 대량 전송용)
+
+
+class Record:
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__dataclass_fields__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__dataclass_fields__
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass(frozen=True, slots=True)
+class PriceEntry(Record):
+    price: str
+    context: str = ''
+    source: str = ''
+
+    @classmethod
+    def coerce(cls, value):
+        if isinstance(value, PriceEntry):
+            return value
+        return cls(price=value.get('price'), context=value.get('context', ''), source=value.get('source', ''))
+
+
+@dataclass(frozen=True, slots=True)
+class ScrapeResult(Record):
+    prices: tuple = ()
+    page_title: str = ''
+    rooms: tuple = None   # ROOM_OFFERS=1 일 때만 (extractors.RoomOffer)
+    page_text: bool = False   # /download 저장소가 이 페이지 텍스트를 받았는지
+
+    @classmethod
+    def starting(cls, price, page_title=''):
+        """고정 바/텍스트의 "시작가" 1건"""
+        return cls(prices=(PriceEntry(price, f"시작가 {price}", 'starting_price_from_file'),), page_title=page_title)
+
+    @classmethod
+    def coerce(cls, value):
+        """dict / 가격 목록 / None / ScrapeResult → ScrapeResult (저장된 JSON, 예전 형식 포함)"""
+        if isinstance(value, ScrapeResult):
+            return value
+        if not value:
+            return EMPTY_RESULT
+        if isinstance(value, (list, tuple)):
+            return cls(prices=tuple(PriceEntry.coerce(p) for p in value))
+        rooms = value.get('rooms')
+        return cls(prices=tuple(PriceEntry.coerce(p) for p in value.get('prices') or ()),
+                   page_title=value.get('page_title') or '',
+                   rooms=tuple(rooms) if rooms is not None else None,
+                   page_text=bool(value.get('page_text')))
+
+    def with_rooms(self, rooms):
+        return replace(self, rooms=tuple(rooms))
+
+    def with_page_text(self, stored):
+        return replace(self, page_text=True) if stored else self
+
+    @property
+    def first_price(self):
+        return self.prices[0].price if self.prices else None
+
+    def to_dict(self):
+        result = {'prices': [p.to_dict() for p in self.prices], 'page_title': self.page_title}
+        if self.rooms is not None:
+            result['rooms'] = [_plain(r) for r in self.rooms]
+        if self.page_text:
+            result['page_text'] = True
+        return result
+
+
+EMPTY_RESULT = ScrapeResult()
+
+
+@dataclass(frozen=True, slots=True)
+class CidResult(Record):
+    cid: str
+    cid_name: str
+    url: str = None
+    result: ScrapeResult = EMPTY_RESULT
+    quote: PriceQuote = None
+    currency: str = None
+    discount: float = None
+    process_time: float = 0.0
+    phase: str = None
+    check_in: str = None
+    los: int = None
+    stale: bool = False
+    cached_at: float = None
+    dropped: bool = False
+    status: str = None
+    attempts: int = None
+    worker_id: str = None
+    error: str = None
+
+    @classmethod
+    def build(cls, cid, cid_name, resp, currency=None, base=None, **kwargs):
+        """스크래핑 결과의 첫 가격을 해석하고 기준가(base, PriceQuote) 대비 할인율까지"""
+        resp = ScrapeResult.coerce(resp)
+        quote = parse_price(resp.first_price, default_currency=currency)
+        return cls(cid=cid, cid_name=cid_name, result=resp, quote=quote,
+                   currency=quote.currency if quote else currency,
+                   discount=compute_discount(base, quote) if base is not None and quote else None, **kwargs)
+
+    @property
+    def prices(self):
+        return self.result.prices
+
+    @property
+    def page_title(self):
+        return self.result.page_title
+
+    @property
+    def rooms(self):
+        return self.result.rooms
+
+    @property
+    def price(self):
+        return self.result.first_price
+
+    @property
+    def amount(self):
+        return float(self.quote.amount) if self.quote else None
+
+    def to_dict(self):
+        # 항상 나가는 키 + 값이 있을 때만 나가는 키 (스윕 셀/큐 작업마다 쓰는 항목이 다르다)
+        data = {
+            'cid': self.cid,
+            'cid_name': self.cid_name,
+            'url': self.url,
+            'price': self.price,
+            'amount': self.amount,
+            'currency': self.currency,
+            'discount_percentage': self.discount,
+            'found_count': len(self.result.prices),
+            'process_time': self.process_time,
+        }
+        for key in ('phase', 'check_in', 'los', 'cached_at', 'status', 'attempts', 'worker_id', 'error'):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        if self.stale:
+            data['stale'] = True
+        if self.dropped:
+            data['dropped'] = True
+        if self.result.page_title:
+            data['page_title'] = self.result.page_title
+        if self.result.rooms is not None:
+            data['rooms'] = [_plain(r) for r in self.result.rooms]
+        return data
+
+
+# 대량 전송(compact) 때 CidResult 한 줄에 담는 항목
+CID_RESULT_FIELDS = ('cid', 'cid_name', 'check_in', 'los', 'price', 'amount', 'currency',
+                     'discount_percentage', 'process_time', 'status')
+
+
+@dataclass(frozen=True, slots=True)
+class StepResult(Record):
+    step: int
+    job_id: str
+    total_steps: int
+    result: CidResult
+    has_next: bool
+    next_step: int = None
+    next_cid_name: str = None
+    mode: str = None
+    is_search_phase: bool = False
+    phase_name: str = None
+    search_phase_completed: bool = False
+    stopped_early: bool = False
+    skipped_count: int = 0
+    equivalent_cids: tuple = ()
+    download_link: str = None
+    download_filename: str = None
+    base_price: float = None
+    base_price_cid_name: str = ''
+    subprogress_pct: int = 0
+    subprogress_msg: str = ''
+    eta: float = None
+    budget_remaining: float = None
+
+    def to_dict(self):
+        cid = self.result
+        return {
+            'step': self.step,
+            'job_id': self.job_id,
+            'total_steps': self.total_steps,
+            'cid': cid.cid,
+            'cid_name': cid.cid_name,
+            'url': cid.url,
+            'prices': [p.to_dict() for p in cid.prices],
+            'found_count': len(cid.prices),
+            'process_time': cid.process_time,
+            'has_next': self.has_next,
+            'next_step': self.next_step,
+            'next_cid_name': self.next_cid_name,
+            'mode': self.mode,
+            'stopped_early': self.stopped_early,
+            'skipped_count': self.skipped_count,
+            'equivalent_cids': list(self.equivalent_cids),
+            'rooms': [_plain(r) for r in cid.rooms] if cid.rooms is not None else None,
+            'stale': cid.stale,
+            'cached_at': cid.cached_at,
+            'dropped': cid.dropped,
+            'budget_remaining': self.budget_remaining,
+            'is_search_phase': self.is_search_phase,
+            'phase_name': self.phase_name,
+            'search_phase_completed': self.search_phase_completed,
+            'download_link': self.download_link,
+            'download_filename': self.download_filename,
+            'base_price': self.base_price,
+            'base_price_cid_name': self.base_price_cid_name,
+            'currency': cid.currency,
+            'current_price': cid.amount,
+            'discount_percentage': cid.discount,
+            'subprogress_pct': self.subprogress_pct,
+            'subprogress_msg': self.subprogress_msg,
+            'eta': self.eta,
+            'page_title': cid.page_title,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class JobSummary(Record):
+    job_id: str
+    total: int
+    finished: int
+    counts: dict
+    base_price: str = None
+    results: tuple = ()
+
+    @property
+    def status(self):
+        return 'done' if self.finished == self.total else 'running'
+
+    def to_dict(self, compact=False):
+        return {
+            'job_id': self.job_id,
+            'total': self.total,
+            'finished': self.finished,
+            'counts': self.counts,
+            'status': self.status,
+            'base_price': self.base_price,
+            'results': encode_batch(self.results) if compact else [r.to_dict() for r in self.results],
+        }
+
+
+# ---- 직렬화 ----
+def _plain(obj):
+    """JSON 기본 타입이 아닌 값 → 직렬화 가능한 값"""
+    if isinstance(obj, Record) or hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, PriceQuote):
+        return {'amount': str(obj.amount), 'currency': obj.currency, 'raw': obj.raw}
+    if isinstance(obj, Decimal):
+        return str(obj)   # 정확한 금액 그대로 (float 로 바꾸면 자릿수가 틀어질 수 있음)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # dataclass 는 orjson 이 직접 풀지 않고 _plain(→ to_dict) 을 거치게 한다 (API 형태 유지)
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=_plain, option=_ORJSON_OPTIONS)
+
+    def dumps(obj):
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_plain)
+
+    def dumps(obj):
+        return _encoder.encode(obj)
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+
+    def loads(data):
+        return json.loads(data)
+
+
+def iter_ndjson(items):
+    """레코드/dict 를 한 줄씩 (스트리밍 응답용 - 전체를 한 번에 만들지 않는다)"""
+    for item in items:
+        yield dumps_bytes(item) + b"\n"
+
+
+def encode_batch(items, field_names=CID_RESULT_FIELDS):
+    """[레코드, ...] → {'fields': [...], 'rows': [[...], ...]} (키를 행마다 반복하지 않는다)"""
+    rows = []
+    for item in items:
+        data = item.to_dict() if isinstance(item, Record) else item
+        rows.append([data.get(name) for name in field_names])
+    return {'fields': list(field_names), 'rows': rows}
+
+
+def decode_batch(payload):
+    names = payload['fields']
+    return [dict(zip(names, row)) for row in payload['rows']]
@@ -0,0 +1,115 @@
+"""
+스냅샷 아카이브 재생 - 저장된 페이지 전체에 현재 추출 로직을 다시 돌려서 결과 차이와 처리량을 보고
+
+사용법:
+    python replay_snapshots.py                      # snapshots/ 전체, CPU 코어 수만큼 병렬
+    python replay_snapshots.py --workers 4 --limit 1000 --report replay_report.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from multiprocessing import Pool
+
+from snapshot_archive import SnapshotArchive, SNAPSHOT_DIR
+from records import ScrapeResult
+
+
+def _summary(result):
+    """비교용 요약 - 첫 번째 가격과 호텔명"""
+    result = ScrapeResult.coerce(result)
+    return {
+        'price': str(result.first_price) if result.prices else None,
+        'page_title': (result.page_title or '').strip(),
+    }
+
+
+def _replay_one(args):
+    root, digest = args
+    from scraper import extract_from_html
+
+    archive = SnapshotArchive(root)
+    start = time.perf_counter()
+    try:
+        html = archive.get_html(digest)
+        result = extract_from_html(html)
+        error = None
+    except Exception as e:
+        html, result, error = '', None, str(e)
+    return digest, len(html), _summary(result), error, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스냅샷 아카이브 추출 회귀 검사")
+    parser.add_argument('--archive', default=SNAPSHOT_DIR)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--limit', type=int, default=0, help="최근 N건만 (0 = 전체)")
+    parser.add_argument('--report', default=None, help="차이 목록을 JSON 으로 저장할 경로")
+    parser.add_argument('--show', type=int, default=20, help="화면에 보여줄 차이 건수")
+    args = parser.parse_args(argv)
+
+    archive = SnapshotArchive(args.archive)
+    entries = list(archive.entries())
+    if args.limit:
+        entries = entries[-args.limit:]
+    if not entries:
+        print(f"스냅샷이 없습니다: {args.archive}")
+        return 1
+
+    # 같은 HTML 은 한 번만 추출
+    digests = list(dict.fromkeys(e['sha256'] for e in entries))
+
+    start = time.perf_counter()
+    replayed = {}
+    total_bytes = 0
+    errors = 0
+    with Pool(processes=max(1, args.workers)) as pool:
+        for digest, size, summary, error, _ in pool.imap_unordered(
+                _replay_one, ((args.archive, d) for d in digests), chunksize=8):
+            replayed[digest] = (summary, error)
+            total_bytes += size
+            errors += 1 if error else 0
+    elapsed = time.perf_counter() - start
+
+    diffs = []
+    for entry in entries:
+        summary, error = replayed[entry['sha256']]
+        before = _summary(entry.get('result'))
+        if error or summary != before:
+            diffs.append({
+                'url': entry.get('url'),
+                'cid': entry.get('cid'),
+                'ts': entry.get('ts'),
+                'sha256': entry['sha256'],
+                'before': before,
+                'after': summary,
+                'error': error,
+            })
+
+    pages_per_sec = len(digests) / elapsed if elapsed > 0 else 0
+    mb_per_sec = total_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0
+    print(f"캡처 {len(entries)}건 / 고유 페이지 {len(digests)}개 / 워커 {args.workers}개")
+    print(f"소요 {elapsed:.2f}초 - {pages_per_sec:.1f} 페이지/초, {mb_per_sec:.1f} MB/초")
+    print(f"추출 오류 {errors}건, 결과 차이 {len(diffs)}건")
+    for diff in diffs[:args.show]:
+        print(f"- CID {diff['cid']} {diff['url']}")
+        print(f"    이전: {diff['before']}  →  현재: {diff['after']}" + (f"  (오류: {diff['error']})" if diff['error'] else ''))
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({
+                'entries': len(entries),
+                'unique_pages': len(digests),
+                'elapsed_sec': round(elapsed, 3),
+                'pages_per_sec': round(pages_per_sec, 1),
+                'mb_per_sec': round(mb_per_sec, 1),
+                'errors': errors,
+                'diffs': diffs,
+            }, f, ensure_ascii=False, indent=2)
+
+    return 1 if diffs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
 cd /home/agoda-app/
 source venv/bin/activate
 git pull
-python app.py
+gunicorn -c gunicorn.conf.py main:app
@@ -0,0 +1,215 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager, asynccontextmanager
+
+from tracing import span
+
+# 브라우저를 쓰는 CID 스크래핑의 입장 순서 (프로세스당 1개 - 동기 경로와 async_orchestrator 가 함께 쓴다)
+# - 레인(우선순위): interactive(/scrape) > speculative(링크 입력 직후 추측 조회, prefetch.py)
+#   > scheduled(예약 갱신) > bulk(스윕 등 대량 작업)
+#   자리가 나면 항상 높은 레인의 대기부터 - 낮은 레인은 CID 1건마다 자리를 반납하고 다시 줄을 서므로
+#   새 interactive 작업이 오면 CID 경계에서 바로 밀려난다 (진행 중인 CID 는 끊지 않음)
+# - 같은 레인 안에서는 테넌트(사용자/API 키)별 줄을 번갈아 가며 1건씩 (큰 작업 하나가 레인을 독차지하지 않음)
+# - 전체 동시 실행 수는 SCHED_CAPACITY(기본: 브라우저 풀 크기), 레인별 상한은 SCHED_LIMIT_<레인>
+#   interactive 이외 레인(speculative + scheduled + bulk)은 합쳐서 SCHED_INTERACTIVE_RESERVE(기본 1) 자리를 남겨 둔다
+#   → 추측 조회나 대량 작업이 쌓여 있어도
+#   interactive 는 (자리가 2개 이상이면) 기다리지 않고, 1개여도 진행 중인 CID 1건만 기다린다
+
+LANES = ('interactive', 'speculative', 'scheduled', 'bulk')
+DEFAULT_LANE = 'interactive'
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def tenant_key(api_key=None, fallback=None):
+    """공정 분배 단위 - API 키는 해시로만 (통계/로그에 키가 남지 않도록), 없으면 fallback(접속 주소 등)"""
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+    return fallback or 'anonymous'
+
+
+class _Waiter:
+    __slots__ = ('lane', 'tenant', 'notify', 'granted', 'abandoned', 'since')
+
+    def __init__(self, lane, tenant, notify):
+        self.lane = lane
+        self.tenant = tenant
+        self.notify = notify
+        self.granted = False
+        self.abandoned = False
+        self.since = time.monotonic()
+
+
+class LaneScheduler:
+    def __init__(self, capacity, limits=None, reserve=0):
+        self.capacity = max(1, int(capacity))
+        limits = limits or {}
+        self.limits = {lane: max(1, min(self.capacity, int(limits.get(lane, self.capacity)))) for lane in LANES}
+        # interactive 이외 레인이 함께 쓸 수 있는 자리 (reserve 만큼은 interactive 몫, 최소 1)
+        self.reserve = max(0, int(reserve))
+        self.background_limit = max(1, self.capacity - self.reserve)
+        self._running = {lane: 0 for lane in LANES}
+        self._queues = {lane: OrderedDict() for lane in LANES}   # 테넌트 → deque[_Waiter] (앞 테넌트부터 1건씩)
+        self._granted = {lane: 0 for lane in LANES}
+        self._lock = threading.Lock()
+
+    # ---- 내부 (self._lock 안에서) ----
+    def _enqueue(self, waiter):
+        self._queues[waiter.lane].setdefault(waiter.tenant, deque()).append(waiter)
+        self._dispatch()
+
+    def _next_waiter(self, lane):
+        tenants = self._queues[lane]
+        while tenants:
+            tenant, waiters = next(iter(tenants.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                tenants.move_to_end(tenant)   # 이 테넌트는 한 건 받았으니 줄 맨 뒤로
+            else:
+                del tenants[tenant]
+            if not waiter.abandoned:
+                return waiter
+        return None
+
+    def _dispatch(self):
+        while sum(self._running.values()) < self.capacity:
+            background = sum(self._running[lane] for lane in LANES if lane != 'interactive')
+            for lane in LANES:
+                if self._running[lane] >= self.limits[lane] or not self._queues[lane]:
+                    continue
+                if lane != 'interactive' and background >= self.background_limit:
+                    continue
+                waiter = self._next_waiter(lane)
+                if waiter is None:
+                    continue
+                waiter.granted = True
+                self._running[lane] += 1
+                self._granted[lane] += 1
+                waiter.notify()
+                break
+            else:
+                return
+
+    def _abandon(self, waiter):
+        """대기를 포기 - 이미 자리를 받았으면 반납. 줄에서는 _next_waiter 가 건너뛴다"""
+        with self._lock:
+            if waiter.granted:
+                self._running[waiter.lane] -= 1
+                self._dispatch()
+            else:
+                waiter.abandoned = True
+
+    # ---- 공개 ----
+    def release(self, lane):
+        with self._lock:
+            self._running[lane] -= 1
+            self._dispatch()
+
+    def acquire(self, lane=DEFAULT_LANE, tenant=None, timeout=None):
+        """자리를 받을 때까지 대기 (스레드) - timeout 이 지나면 False"""
+        lane = normalize_lane(lane)
+        event = threading.Event()
+        waiter = _Waiter(lane, tenant or 'anonymous', event.set)
+        with self._lock:
+            self._enqueue(waiter)
+        if event.wait(timeout):
+            return True
+        # 시간 초과와 자리 배정이 엇갈렸으면 _abandon 이 그 자리를 반납한다
+        self._abandon(waiter)
+        return False
+
+    async def acquire_async(self, lane=DEFAULT_LANE, tenant=None):
+        """이벤트 루프용 - 취소되면 줄에서 빠지고, 이미 받은 자리는 반납"""
+        lane = normalize_lane(lane)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        waiter = _Waiter(lane, tenant or 'anonymous', notify)
+        with self._lock:
+            self._enqueue(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    @contextmanager
+    def slot(self, lane=DEFAULT_LANE, tenant=None):
+        lane = normalize_lane(lane)
+        with span('sched.wait', lane=lane):
+            self.acquire(lane, tenant)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    @asynccontextmanager
+    async def slot_async(self, lane=DEFAULT_LANE, tenant=None):
+        lane = normalize_lane(lane)
+        with span('sched.wait', lane=lane):
+            await self.acquire_async(lane, tenant)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def idle(self, lane):
+        """이 레인에 실행 중이거나 기다리는 작업이 없는지"""
+        with self._lock:
+            waiting = any(not w.abandoned for waiters in self._queues[lane].values() for w in waiters)
+            return self._running[lane] == 0 and not waiting
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            lanes = {}
+            for lane in LANES:
+                waiting = [w for waiters in self._queues[lane].values() for w in waiters if not w.abandoned]
+                lanes[lane] = {
+                    'running': self._running[lane],
+                    'limit': self.limits[lane],
+                    'waiting': len(waiting),
+                    'tenants': len(self._queues[lane]),
+                    'oldest_wait_sec': round(max((now - w.since for w in waiting), default=0.0), 2),
+                    'granted': self._granted[lane],
+                }
+            return {'capacity': self.capacity, 'background_limit': self.background_limit, 'lanes': lanes}
+
+
+def normalize_lane(lane):
+    return lane if lane in LANES else DEFAULT_LANE
+
+
+def _default_limits(capacity, reserve):
+    return {
+        'interactive': _env_int("SCHED_LIMIT_INTERACTIVE", capacity),
+        'speculative': _env_int("SCHED_LIMIT_SPECULATIVE", max(1, capacity - reserve)),
+        'scheduled': _env_int("SCHED_LIMIT_SCHEDULED", capacity),
+        'bulk': _env_int("SCHED_LIMIT_BULK", capacity),
+    }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """프로세스(워커)당 하나 - 자리 수는 브라우저 풀 크기에 맞춘다"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from browser_pool import POOL_SIZE
+            capacity = _env_int("SCHED_CAPACITY", max(1, POOL_SIZE))
+            reserve = _env_int("SCHED_INTERACTIVE_RESERVE", 1)
+            _scheduler = LaneScheduler(capacity, _default_limits(capacity, reserve), reserve=reserve)
+        return _scheduler
@@ -1,36 +1,30 @@
 import re
-from bs4 import BeautifulSoup
 import logging
-import requests
-import time  
+import time
 
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from flask import current_app
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+import threading
 
-from flask import current_app
-
-import threading, time, logging
-
-_progress_cb=None
-_process_pct = 0
-_progress_lock = threading.Lock()
-_ticker_thread = None
-_ticker_stop = threading.Event()
+# selenium / bs4 / flask 는 모듈 import 시점에 불러오지 않는다 (콜드 스타트 단축)
+# 필요한 함수 안에서 지연 import 하고, gunicorn 마스터에서는 preload_heavy_modules()로 미리 올린다
 
 # debug_utils.py
 import os
 import sys
 from datetime import datetime
 
+from profiling import profiled
+from tracing import span
+from progress_tracker import stage, current_pct
+from records import ScrapeResult, PriceEntry, EMPTY_RESULT
+
 DEBUG_FILE = "debug.log"   # 디버그 로그 파일 이름
+# 1이면 최저가 외에 페이지의 모든 객실 요금(객실/조식/취소 규정/요금 기준)도 결과의 'rooms' 에 담는다
+ROOM_OFFERS = os.environ.get("ROOM_OFFERS", "0") == "1"
+# 시작가가 없을 때 후보 셀렉터/텍스트의 가격을 결과로 쓸지 (기본: 쓰지 않음 - 빈 결과)
+# 켜도 URL 의 currencyCode 와 통화가 같은 후보만 (통화를 모르면 후보를 쓰지 않는다)
+FALLBACK_CANDIDATES = os.environ.get("FALLBACK_CANDIDATES", "0") == "1"
 
 def print_file(*args, sep=" ", end="\n", file=None, flush=False):
     """
@@ -58,70 +52,26 @@ def print_file(*args, sep=" ", end="\n", file=None, flush=False):
         os.fsync(f.fileno())
 
 
-def get_global_process():
-    with _progress_lock:
-        return _process_pct
-
-def set_global_process(val):
-    global _process_pct
-    with _progress_lock:
-        _process_pct = int(val)
-
-def _progress_ticker_loop(logger):
-    global _process_pct
-    while not _ticker_stop.is_set():
-        with _progress_lock:
-            if _process_pct < 95:
-                _process_pct += 1
-
-                try:
-                    set_progress(_process_pct, " ")
-                except Exception:
-                    pass
-        # 1초마다 +1
-        if _ticker_stop.wait(0.5):
-            break
-
-def start_progress_ticker(logger=None):
-    """앱 생애주기 동안 1회만 시작"""
-    global _ticker_thread
-    if logger is None:
-        logger = logging.getLogger(__name__)
-    if _ticker_thread and _ticker_thread.is_alive():
-        return
-    _ticker_stop.clear()
-    _ticker_thread = threading.Thread(target=_progress_ticker_loop, args=(logger,), daemon=True)
-    _ticker_thread.start()
-
-def stop_progress_ticker():
-    """앱 종료 시 필요하면 호출"""
-    _ticker_stop.set()
-
-
-_progress_state = {"pct": 0, "msg": ""}
+def preload_heavy_modules():
+    """무거운 모듈을 미리 import (gunicorn 마스터에서 fork 전에 1회 호출)"""
+    import bs4  # noqa: F401
+    import selenium.webdriver  # noqa: F401
+    import selenium.webdriver.chrome.options  # noqa: F401
+    import selenium.webdriver.support.ui  # noqa: F401
 
-def set_progress(pct, msg=""):
-    """서버 전역 진행률 업데이트"""
-    global _progress_state
-    _progress_state["pct"] = int(pct)
-    _progress_state["msg"] = msg
-
-def get_progress_state():
-    """현재 진행률 조회"""
-    return _progress_state
-
-
-def _safe_progress(progress_cb, pct, msg=None):
-    current_app.logger.info(f"Progress: {pct}% - {msg or ''}")
 
+def _app_logger():
+    """flask 앱 컨텍스트가 있으면 앱 로거, 없으면 모듈 로거"""
     try:
-        if progress_cb:
-            progress_cb(pct, " ")
+        from flask import current_app
+        return current_app.logger
     except Exception:
-        pass
+        return logging.getLogger(__name__)
+
 
 def _to_plain_text(x):
     try:
+        from bs4 import Tag
         if isinstance(x, Tag):
             return x.get_text(strip=True)
     except Exception:
@@ -149,93 +99,176 @@ def get_outer_html_with_hard_timeout(driver, timeout=15):
 
     return result["html"]  # 시간 초과 시 빈 문자열
 
-def BeautifulSoupTimeout(driver, timeout=15):
-    soup = BeautifulSoup("", 'html.parser')
-    
+def get_page_source_with_timeout(driver, timeout=15):
+    """driver.page_source 를 별도 스레드에서 읽고, 시간 초과 시 빈 문자열"""
+    result = {"html": ""}
     def _run():
-        nonlocal soup   # 바깥 soup을 쓰겠다 선언
-
         try:
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-        except:
-            soup = BeautifulSoup("", 'html.parser')
-            pass
-            
+            result["html"] = driver.page_source
+        except Exception:
+            result["html"] = ""
     t = threading.Thread(target=_run, daemon=True)
     t.start()
     t.join(timeout)
 
-    return soup
-    
-def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
+    return result["html"]
+
+def BeautifulSoupTimeout(driver, timeout=15):
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(get_page_source_with_timeout(driver, timeout), 'html.parser')
+
+
+def extract_fallback_prices(soup, titleText="", extractor=None, currency=None):
+    """
+    StickyNavPrice 가 없을 때의 보조 추출 (페이지 텍스트의 "시작가" 패턴) - 없으면 빈 결과
+    FALLBACK_CANDIDATES=1 이고 currency(URL 의 currencyCode)를 알면 같은 통화의 후보 가격을 대신 반환
+    브라우저 없이 soup 만으로 동작 - 스냅샷 재생(replay_snapshots.py)에서도 그대로 사용
+    셀렉터/패턴/제외 단어는 사이트 정의(extractors.py)에서 가져온다 (기본: 아고다)
+    """
+    from extractors import get_extractor
+
+    extractor = extractor or get_extractor()
+
+    # 후보 요소는 script/style 을 지우기 전에 (모든 후보 셀렉터를 문서 1회 순회로 매칭)
+    use_candidates = FALLBACK_CANDIDATES and bool(currency)
+    prices_found = extractor.candidate_prices(soup, limit=3) if use_candidates else []
+
+    # script와 style 태그 제거
+    for element in soup(["script", "style"]):
+        element.decompose()
+
+    all_text = soup.get_text()
+
+    text_size_bytes = len(all_text.encode('utf-8'))
+    _app_logger().info(f"텍스트 크기: {text_size_bytes} bytes")
+
+    # 페이지 텍스트에서 "시작가" 뒤의 가격 찾기
+    starting_price = None
+    try:
+        # "시작가" 뒤의 가격 패턴 검색 (다양한 통화 단위 지원)
+        price_text = extractor.start_price(all_text)
+        # 원본 가격 텍스트를 그대로 사용 (통화 단위 포함)
+        if price_text:
+            starting_price = {
+                'price': price_text,  # 원본 형태 그대로 (₩, THB, $ 등 포함)
+                'context': f"시작가 {price_text}",
+                'source': 'starting_price_from_file'
+            }
+            _app_logger().info(f"시작가 발견: {starting_price['price']}")
+
+    except Exception as e:
+        _app_logger().info(f"시작가 검색 오류: {e}")
+
+    # 시작가를 찾았으면 반환
+    if starting_price:
+        return ScrapeResult(prices=(PriceEntry.coerce(starting_price),), page_title=titleText)
+    if not use_candidates:
+        return EMPTY_RESULT
+
+    # 후보 요소에서 부족하면 전체 텍스트 검색 - URL 통화와 다른 가격($ 표기 등)은 버린다
+    if len(prices_found) < 2:
+        prices_found += extractor.text_prices(all_text, seen={p['price'] for p in prices_found},
+                                              limit=5 - len(prices_found))
+    prices_found = [p for p in prices_found if _same_currency_price(p['price'], currency)]
+    if prices_found:
+        _app_logger().info(f"시작가 없음 - 후보 가격 {len(prices_found)}개 사용 ({currency})")
+        return ScrapeResult(prices=tuple(PriceEntry.coerce(p) for p in prices_found), page_title=titleText)
+    return EMPTY_RESULT
+
+
+def _same_currency_price(price_text, currency):
+    """통화 표기가 있으면 currency 와 같아야 하고, 숫자만 있으면 currency 로 본다"""
+    from price_quote import parse_price
+
+    currency = currency.upper()
+    quote = parse_price(price_text, default_currency=currency)
+    return quote is not None and quote.currency == currency
+
+
+def extract_sticky_price(soup, extractor=None):
+    """아고다 상단 고정 바(StickyNavPrice)의 최저 객실가와 호텔명 - 없으면 (0, "")"""
+    from extractors import get_extractor
+
+    return (extractor or get_extractor()).primary_price(soup)
+
+
+def extract_room_offers(soup, extractor=None):
+    """페이지의 모든 객실 요금 → (RoomOffer(room, price, board, cancellation, basis), ...)"""
+    from extractors import get_extractor
+
+    return tuple((extractor or get_extractor()).room_offers(soup))
+
+
+def extract_from_soup(soup, currency=None):
+    """스크래핑 루프의 최종 추출과 동일한 결과 ScrapeResult (ROOM_OFFERS=1 이면 rooms 포함)
+    currency: URL 의 currencyCode (FALLBACK_CANDIDATES=1 일 때 후보 가격 통화 검사용)"""
+    price, titleText = extract_sticky_price(soup)
+    if( price ):
+        result = ScrapeResult.starting(price, titleText)  # 원본 형태 그대로 (₩, THB, $ 등 포함)
+    else:
+        result = extract_fallback_prices(soup, titleText, currency=currency)
+    if ROOM_OFFERS:
+        result = result.with_rooms(extract_room_offers(soup))
+    return result
+
+
+def extract_from_html(html, currency=None):
+    """저장된 HTML 에서 추출 (브라우저 불필요)"""
+    from bs4 import BeautifulSoup
+    return extract_from_soup(BeautifulSoup(html or "", 'html.parser'), currency=currency)
+
+
+@profiled('scrape_prices_simple')
+def scrape_prices_simple(url, original_currency_code=None, progress_cb=None, page_text_key=None, deadline=None):
     """
     단순하고 빠른 가격 스크래핑 - 이미지 처리 없음
-    Returns a list of dictionaries containing price and context information
+    Returns a ScrapeResult (records.py) - prices: (PriceEntry(price, context, source), ...)
     original_currency_code: 원본 URL의 통화 코드 (예: USD, KRW, THB)
+    page_text_key: 주면 페이지 텍스트를 /download 저장소에 백그라운드로 저장 (page_text_store.make_key)
+    deadline: deadline.Deadline - 주면 모든 대기가 마감까지 남은 시간으로 줄고, 마감이 지나면 폴링을 멈춘다
     """
 
-    _progress_cb = progress_cb
-
     print_file("scrape_prices_simple start" )
 
     # 앱 로거 안전하게 확보
     try:
-        logger = current_app.logger
+        logger = _app_logger()
     except Exception:
         logger = logging.getLogger(__name__)
 
-    # 전역 틱커가 이미 돌고 있어야 함. (안 돌면 시작)
-    #start_progress_ticker(logger=logger)
-
-    # 필요 시 시작 시점 보정
-    set_global_process(0)  # 혹은 유지하고 싶으면 제거
-
-    # 진행 상황 수동 가산
-    def report(pct, msg=""):
-        # 전역 %도 함께 맞춰주고, 콜백 호출
-        set_global_process(pct)
+    # 진행 단계 알림 - 진행률/ETA 는 progress_tracker 가 단계별 소요 시간 기록으로 계산
+    def report(name):
+        stage(name)
         try:
             if progress_cb:
-                progress_cb(int(pct), msg)
+                progress_cb(current_pct(), name)
         except Exception:
             pass
         try:
-            logger.info(f"[scrape] {pct}% - {msg}")
+            logger.info(f"[scrape] {name}")
         except Exception:
             pass
 
 
+    from bs4 import BeautifulSoup
+    from selenium.webdriver.support.ui import WebDriverWait
+    from browser_pool import get_pool, ACQUIRE_TIMEOUT
+
+    def wait_for(cap):
+        # 고정 타임아웃(cap)을 CID 마감까지 남은 시간으로 제한
+        return deadline.timeout(cap) if deadline else cap
+
     process = 0
+    driver = None
     try:
-        # Selenium 사용 - 간단한 설정
-
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        #chrome_options.add_argument('--disable-javascript')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=640,360')  
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--log-level=3')
-        #chrome_options.add_argument('--blink-setting=imagesEnable=false')
-        #chrome_options.page_load_strategy = 'eager' # 또는 'none'으로 변경 가능
-        chrome_options.page_load_strategy = 'none' # 또는 'none'으로 변경 가능
-        chrome_options.add_argument('--disable-extensions')
-        # 실제 브라우저처럼 보이게 하는 옵션들
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        chrome_options.add_argument('--accept-language=en-US,en;q=0.9')
-        chrome_options.add_argument('--accept-encoding=gzip, deflate, br')
-        chrome_options.add_argument('--accept=text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8')
-        #chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        #chrome_options.add_experimental_option('useAutomationExtension', False)
-
-        driver = webdriver.Chrome(options=chrome_options)
-        actions = ActionChains(driver)
-
-        #process += 5
-        #report( process, "준비")
-        report( 11, "" )
+        # Selenium 사용 - 워커 풀에 미리 띄워 둔 브라우저를 빌려 쓴다
+        # (옵션/타임아웃은 browser_pool.make_chrome_options / launch_driver 참고)
+        report('lease')
+        with span('browser.lease'):
+            driver = get_pool().acquire(timeout=wait_for(ACQUIRE_TIMEOUT))
+
+        report('navigate')
         print_file( "-------------------------------------")
 
         # 봇 탐지 우회
@@ -268,21 +301,19 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
         start_time = time.localtime()
 
         try:
-            current_app.logger.info(f"start driver.get(): {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            _app_logger().info(f"start driver.get(): {time.strftime('%Y-%m-%d %H:%M:%S')}")
             #f.flush()
 
-            driver.set_page_load_timeout(20)
-            driver.implicitly_wait(20)
-            driver.set_script_timeout(20)
+            driver.set_page_load_timeout(wait_for(20))
+            driver.implicitly_wait(wait_for(20))
+            driver.set_script_timeout(wait_for(20))
             #time.sleep(0.5)
-            driver.get(url)
+            with span('navigate'):
+                driver.get(url)
             #f.write(f"finish driver.get(): {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
             #f.flush()
 
-            current_app.logger.info(f"driver.get() end")
-            #process += 5
-            #report( process, "URL 체크 시작")
-            report( 5, "" )
+            _app_logger().info(f"driver.get() end")
 
 
             # Send a space to the element
@@ -297,17 +328,21 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
             #time.sleep(0.5)
             #page_source = driver.page_source
 
-            WebDriverWait(driver, 2).until(
-                lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
-            )
+            with span('ready_state'):
+                if hasattr(driver, 'wait_ready'):
+                    # CDP 백엔드: DOMContentLoaded 이벤트 대기 (스크립트 폴링 없음)
+                    driver.wait_ready(wait_for(2))
+                else:
+                    WebDriverWait(driver, wait_for(2)).until(
+                        lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
+                    )
 
         except:
             
             print_file("driver.get fail: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-            current_app.logger.info(f"driver.get() fail")
-            _progress_cb = None
-            return {'prices': [], 'page_title': ''}
+            _app_logger().info(f"driver.get() fail")
+            return EMPTY_RESULT
 
             #f.write(f"driver.get fail: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
             #f.flush()
@@ -315,29 +350,24 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
         #f.write(f"start parsing: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
         #f.flush()
 
-        current_app.logger.info(f'get page_source')
+        _app_logger().info(f'get page_source')
         print_file("get page_source")
         #driver.execute_script("window.scrollTo(0, 0);")
         #page_source = driver.page_source
         # BeautifulSoup으로 파싱
         #f.write( page_source )
 
-        #process += 5
-        #report( process, "")
-        report( 10, "" )
+        report('poll')
 
-        #current_app.logger.info(f'BeautifulSoup')
+        #_app_logger().info(f'BeautifulSoup')
         soup = BeautifulSoup("", 'html.parser')
-        #current_app.logger.info(f'BeautifulSoup end')
-
-        #process += 5
-        #report( process, "")
-        report( 11, "" )
+        #_app_logger().info(f'BeautifulSoup end')
 
         price = 0
         titleText = ""
+        page_html = ""
 
-#current_app.logger.info(f'BeautifulSoup end')
+#_app_logger().info(f'BeautifulSoup end')
         #print("send_keys-------------")
         #actions.send_keys(Keys.END).perform()
         #print("execute_script-------------")
@@ -347,6 +377,10 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
             print("start check-------------")
             print_file("start check-------------")
             for tt in range(20):
+                if deadline and deadline.expired():
+                    # 마감 - 지금까지 읽은 페이지로 보조 추출만 하고 끝낸다
+                    _app_logger().info(f"CID 마감 도달 (폴링 {tt}회)")
+                    break
                 try:      
                     print(tt, "-------------")
                     print_file(tt, "-------------")
@@ -356,10 +390,8 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
                     #    process += 1
                     #    report( process, "")
 
-                    report( 12, "" )
-
-
-                    time.sleep(0.5)
+                    with span('poll.wait', attempt=tt):
+                        time.sleep(wait_for(0.5))
                     #print("2-------------")
                     soup.clear()
                     #print("3-------------")
@@ -381,10 +413,10 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
                     
                     #soup = BeautifulSoup(driver.page_source, 'html.parser' )
 
-                    soup = BeautifulSoupTimeout( driver, 20 )
-
-                    report( 13, "" )
-
+                    with span('poll.page_source', attempt=tt):
+                        page_html = get_page_source_with_timeout( driver, wait_for(20) )
+                    with span('poll.parse', attempt=tt, bytes=len(page_html)):
+                        soup = BeautifulSoup( page_html, 'html.parser' )
 
                     #print("6-------------")
 
@@ -396,57 +428,48 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
                     #        print( "############Price Found : ",  price )
                     #        break
                         
-                    priceText = soup.find('div', attrs={"class": "StickyNavPrice"})
-                    if( priceText ):
-                        price = priceText["data-element-cheapest-room-price"]
-                        if( price ):
-                            report( 14, "" )
-
-                            print( "Price Found : ",  price )
-                            print_file( "Price Found : ",  price )
-                            
-                            if( len(titleText) <= 1 ):
-                                soupTitle = soup.find('h1', attrs={"data-selenium": "hotel-header-name"})
-                                if( soupTitle ):
-                                    titleText = soupTitle.get_text()
-                                    print( "Title Found : ",  titleText )
-                                    print_file( "Title Found : ",  titleText )
-                            break
-
-                    text_len = len(soup.get_text())
-                    current_app.logger.info(f'text_len = {text_len}')    
+                    with span('poll.extract', attempt=tt):
+                        price, foundTitle = extract_sticky_price(soup)
+                    if( price ):
+                        print( "Price Found : ",  price )
+                        print_file( "Price Found : ",  price )
+
+                        if( len(titleText) <= 1 and foundTitle ):
+                            titleText = foundTitle
+                            print( "Title Found : ",  titleText )
+                            print_file( "Title Found : ",  titleText )
+                        break
 
-                    if( text_len == 0 and tt > 5 ):
-                        report( 92, "" )
+                    with span('poll.text_len', attempt=tt):
+                        text_len = len(soup.get_text())
+                    _app_logger().info(f'text_len = {text_len}')    
 
-                        driver.quit()
-                        _progress_cb = None
+                    if( text_len == 0 and tt > 5 ):
                         print("driver time out -------------")
                         print_file("driver time out -------------")
-                        return {'prices': [], 'page_title': ''}
+                        return EMPTY_RESULT
 
                     if text_len > 40000:
                         break
 
                 except :
-                    report( 93, "" )
-
                     print("EXCEPTION-------------")
                     print_file("EXCEPTION-------------")
-                    _progress_cb = None
 
-                    return {'prices': [], 'page_title': ''}
+                    return EMPTY_RESULT
 
 
         #f.write( '---------------------------------------\n')
         #f.write( soup.get_text() )
         #f.flush()
 
-        driver.quit()
+        # 파싱에는 브라우저가 필요 없으므로 바로 반납
+        get_pool().release(driver)
+        driver = None
 
         _to_plain_text( titleText )
 
-        _progress_cb = None
+        report('extract')
 
         if( price != 0 ):
             #process = 100
@@ -457,361 +480,36 @@ def scrape_prices_simple(url, original_currency_code=None, progress_cb=None):
             print(f"걸린 시간: {elapsed:.3f}초")
             print_file(f"걸린 시간: {elapsed:.3f}초")
 
-            current_app.logger.info(f'time : {time}')
-            starting_price = {
-                'price': price,  # 원본 형태 그대로 (₩, THB, $ 등 포함)
-                'context': f"시작가 {price}",
-                'source': 'starting_price_from_file'
-            }
-            if starting_price:
-                return {'prices': [starting_price], 'page_title': titleText }
-            else:
-                return {'prices': [], 'page_title': ''}
-                
-        current_app.logger.info(f"start parsing: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        #f.flush()
-
-        prices_found = []
-        seen_prices = set()
-
-        # 1단계: 특정 가격 요소들부터 우선 찾기 (실제 예약 가격)
-        price_selectors = [
-            # 일반적인 호텔 예약 사이트 가격 클래스들
-            '[class*="price"]',
-            '[class*="cost"]', 
-            '[class*="rate"]',
-            '[class*="amount"]',
-            '[class*="total"]',
-            '[class*="nightly"]',
-            '[data-testid*="price"]',
-            '[data-price]',
-            # 더 구체적인 셀렉터들
-            '.room-price',
-            '.hotel-price',
-            '.booking-price',
-            '.final-price'
-        ]
-
-        for selector in price_selectors:
-            try:
-                elements = soup.select(selector)
-                for element in elements:
-                    text = element.get_text(strip=True)
-
-                    # 가격 패턴 찾기
-                    price_patterns = [
-                        r'(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # $100-99999.99
-                        r'([1-9]\d{2,4}(?:\.\d{2})?\s*USD)',  # 123.45 USD
-                        r'(\$[1-9]\d{1,2})',  # $10-999
-                    ]
-
-                    for pattern in price_patterns:
-                        matches = re.findall(pattern, text, re.IGNORECASE)
-                        for price_text in matches:
-                            if price_text not in seen_prices:
-                                # 평균가격 제외
-                                parent_text = element.parent.get_text(strip=True).lower() if element.parent else text.lower()
-
-                                is_average_price = (
-                                    'average' in parent_text or
-                                    'avg' in parent_text or
-                                    'stands at' in parent_text or
-                                    'typical' in parent_text
-                                )
-
-                                if not is_average_price:
-                                    seen_prices.add(price_text)
-                                    prices_found.append({
-                                        'price': price_text,
-                                        'context': f"Found in {selector}: {text[:100]}",
-                                        'source': 'targeted_element'
-                                    })
-
-                                    if len(prices_found) >= 3:
-                                        break
-
-                        if len(prices_found) >= 3:
-                            break
-
-                    if len(prices_found) >= 3:
-                        break
-            except Exception:
-                continue
-
-            if len(prices_found) >= 3:
-                break
-
-        # 2단계: 특정 요소에서 못 찾으면 전체 텍스트 검색
-        if len(prices_found) < 2:
-            # script와 style 태그 제거
-            for element in soup(["script", "style"]):
-                element.decompose()
-
-            # 텍스트 추출
-            text_content = soup.get_text()
-
-            # 더 적극적인 가격 패턴 검색
-            price_patterns = [
-                # 실제 예약 가격이 나올 가능성이 높은 패턴들
-                r'(\$[1-9]\d{2,4}(?:\.\d{2})?)\s*(?:per night|night|/night)',  # $123 per night
-                r'(\$[1-9]\d{2,4}(?:\.\d{2})?)\s*(?:total|Total)',  # $123 total
-                r'(?:from|From)\s*(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # from $123
-                r'(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # 일반 $123
-                r'([1-9]\d{2,4}(?:\.\d{2})?\s*USD)',  # 123 USD
-            ]
-
-            for pattern in price_patterns:
-                matches = re.finditer(pattern, text_content, re.IGNORECASE)
-
-                for match in matches:
-                    price_text = match.group(1).strip()
-
-                    if price_text in seen_prices:
-                        continue
-
-                    # 컨텍스트 추출
-                    start_pos = max(0, match.start() - 80)
-                    end_pos = min(len(text_content), match.end() + 80)
-                    context = text_content[start_pos:end_pos].strip()
-                    context_lower = context.lower()
-
-                    # 평균가격 및 기타 불필요한 가격 제외
-                    skip_keywords = [
-                        'with an average room price of',
-                        'which stands at',
-                        'average room price',
-                        'typical price',
-                        'generally costs',
-                        'usually costs'
-                    ]
-
-                    should_skip = any(keyword in context_lower for keyword in skip_keywords)
-
-                    if should_skip:
-                        continue
-
-                    context = re.sub(r'\s+', ' ', context)[:150]
-
-                    seen_prices.add(price_text)
-                    prices_found.append({
-                        'price': price_text,
-                        'context': context,
-                        'source': 'text_search'
-                    })
-
-                    # 최대 5개로 제한
-                    if len(prices_found) >= 5:
-                        break
-
-                if len(prices_found) >= 5:
-                    break
-
-        # 디버그: 실제 페이지에 어떤 가격 정보가 있는지 확인
-        # (실제 배포시에는 제거)
-        debug_patterns = [
-            r'(\$\d+)',  # 모든 $ 가격
-            r'(\d+\.\d+)',  # 소수점 숫자
-            r'(USD)',  # USD 텍스트
-            r'(price|Price|PRICE)',  # price 텍스트
-            r'(total|Total)',  # total 텍스트
-            r'(night|Night)',  # night 텍스트
-        ]
-
-        debug_info = {}
-        all_text = soup.get_text()
-
-        # 5KB 제한: 텍스트가 5KB를 넘으면 5KB까지만 자르고 즉시 종료
-        text_size_bytes = len(all_text.encode('utf-8'))
-        current_app.logger.info(f"텍스트 크기: {text_size_bytes} bytes")
-        #f.write(f"{all_text}\n")
-
-        #if text_size_bytes > 5 * 1024:  # 5KB = 5 * 1024 bytes
-            # UTF-8 기준 5KB까지만 자르기 (안전하게)
-            #truncated_text = all_text
-            #while len(truncated_text.encode('utf-8')) > 5 * 1024:
-            #    truncated_text = truncated_text[:-100]  # 100글자씩 줄이기
-            #all_text = truncated_text + "... [5KB 제한으로 텍스트 일부만 수집됨]"
-
-            # 즉시 파일 저장하고 가격 분석 건너뛰기
-            #try:
-                #import os
-                #if not os.path.exists('downloads'):
-                #    os.makedirs('downloads')
-
-                # CID 정보 추출
-                #cid_match = re.search(r'cid=([^&]+)', url)
-                #cid_value = cid_match.group(1) if cid_match else 'unknown'
-
-                # 파일명 생성
-                #filename = f"page_text_cid_{cid_value}.txt"
-                #filepath = os.path.join('downloads', filename)
-
-                # 전체 텍스트 저장
-                #with open(filepath, 'w', encoding='utf-8') as f:
-                #f.write(f"2----------------------------------\n")
-                #f.write(f"URL: {url}\n")
-                ##f.write(f"CID: {cid_value}\n")
-                #f.write(f"스크래핑 시간: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                #f.write(f"파일 크기: 5KB 제한 적용\n")
-                #f.write("="*50 + "\n\n")
-                #f.write(all_text)
-
-                #print(f"5KB 제한 - 텍스트 파일 저장됨: {filepath}")
-
-            #except Exception as save_error:
-                #print(f"텍스트 파일 저장 오류: {save_error}")
-
-            # txt 파일에서 "시작가" 뒤의 가격 찾기
-        starting_price = None
-        try:
-            # "시작가" 뒤의 가격 패턴 검색 (다양한 통화 단위 지원)
-            starting_price_patterns = [
-                r'시작가\s*(USD\s+[\d,]+(?:\.\d+)?)',         # USD 46 형태
-                r'시작가\s*(KRW\s+[\d,]+(?:\.\d+)?)',         # KRW 46000 형태  
-                r'시작가\s*(THB\s+[\d,]+(?:\.\d+)?)',         # THB 1500 형태
-                r'시작가\s*([₩]\s*[\d,]+(?:\.\d+)?)',         # ₩ 33,458 형태 (공백 포함)
-                r'시작가\s*([₩][\d,]+(?:\.\d+)?)',           # ₩46000 형태
-                r'시작가\s*([฿]\s*[\d,]+(?:\.\d+)?)',         # ฿ 1,500 형태 (공백 포함)
-                r'시작가\s*([฿][\d,]+(?:\.\d+)?)',           # ฿1500 형태
-                r'시작가\s*(\$\s*[\d,]+(?:\.\d+)?)',         # $ 46 형태 (공백 포함)
-                r'시작가\s*(\$[\d,]+(?:\.\d+)?)',            # $46 형태
-                r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*USD)',      # 46 USD 형태
-                r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*THB)',      # 46 THB 형태
-                r'시작가[^\d]*([\d,]+(?:\.\d+)?\s*KRW)',      # 46 KRW 형태
-            ]
-
-            match = None
-            for pattern in starting_price_patterns:
-                match = re.search(pattern, all_text, re.IGNORECASE)
-                if match:
-                    break
-
-            if match:
-                price_text = match.group(1).strip()
-                # 원본 가격 텍스트를 그대로 사용 (통화 단위 포함)
-                if price_text:
-                    starting_price = {
-                        'price': price_text,  # 원본 형태 그대로 (₩, THB, $ 등 포함)
-                        'context': f"시작가 {price_text}",
-                        'source': 'starting_price_from_file'
-                    }
-                    current_app.logger.info(f"시작가 발견: {starting_price['price']}")
-
-        except Exception as e:
-            current_app.logger.info(f"시작가 검색 오류: {e}")
-
-        # 시작가를 찾았으면 반환, 못 찾았으면 빈 결과
-        if starting_price:
-            return {'prices': [starting_price], 'page_title': titleText }
+            _app_logger().info(f'time : {time}')
+            result = ScrapeResult.starting(price, titleText)  # 원본 형태 그대로 (₩, THB, $ 등 포함)
         else:
-            return {'prices': [], 'page_title': ''}
-
-        for pattern in debug_patterns:
-            matches = re.findall(pattern, all_text, re.IGNORECASE)
-            if matches:
-                debug_info[pattern] = matches[:10]  # 처음 10개만
-
-        # 더 광범위한 가격 패턴 검색
-        all_price_patterns = [
-            # 달러 패턴
-            r'(\$[1-9]\d{2,4}(?:\.\d{2})?)',  # $100-99999.99
-            r'(\$[1-9]\d{1,2})',  # $10-999
-            # USD 패턴
-            r'([1-9]\d{2,4}(?:\.\d{2})?\s*USD)',  # 100-9999.99 USD
-            r'USD\s*([1-9]\d{2,4}(?:\.\d{2})?)',  # USD 100-9999.99
-            r'USD\s*([1-9]\d{1,2})',  # USD 10-999
-            # 순수 숫자 패턴 (가격일 가능성)
-            r'\b([2-9]\d{2})\b',  # 200-999 (3자리)
-            r'\b([1-9]\d{3})\b',  # 1000-9999 (4자리)
-        ]
-
-        all_prices = []
-
-        for pattern in all_price_patterns:
-            matches = re.finditer(pattern, all_text, re.IGNORECASE)
-            for match in matches:
-                price_text = match.group(1).strip()
-
-                if price_text not in seen_prices:
-                    context_start = max(0, match.start() - 60)
-                    context_end = min(len(all_text), match.end() + 60)
-                    context = all_text[context_start:context_end].strip()
-                    context_lower = context.lower()
-                    context = re.sub(r'\s+', ' ', context)[:150]
-
-                    # 평균가격 강화 필터링 
-                    is_average_price = (
-                        'with an average room price of' in context_lower or
-                        'which stands at' in context_lower or
-                        '평균 객실 가격은' in context_lower or
-                        'average room price' in context_lower or
-                        '평균 가격' in context_lower or
-                        '평균 객실' in context_lower or
-                        '방콕의 평균' in context_lower
-                    )
+            _app_logger().info(f"start parsing: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            with span('extract.fallback'):
+                result = extract_fallback_prices(soup, titleText, currency=original_currency_code)
 
-                    # 명백한 ID나 날짜만 제외
-                    is_not_price = (
-                        any(year in context for year in ['2024', '2025', '2026']) or
-                        (price_text.isdigit() and len(price_text) > 4)  # 긴 ID만 제외
-                    )
+        # 같은 페이지(soup)에서 객실별 요금까지 - 추가 페이지 로드 없음
+        if ROOM_OFFERS:
+            with span('extract.rooms'):
+                result = result.with_rooms(extract_room_offers(soup))
 
-                    if not is_average_price and not is_not_price:
-                        seen_prices.add(price_text)
-                        all_prices.append({
-                            'price': f"${price_text}" if not price_text.startswith('$') else price_text,
-                            'context': context,
-                            'source': 'all_price_search'
-                        })
-
-                        # 더 많이 수집 (두 번째 가격을 찾기 위해)
-                        if len(all_prices) >= 20:
-                            break
-
-            if len(all_prices) >= 20:
-                current_app.logger.info("20개 이상의 가격 발견 - 수집 중지")
-                break
-
-        # 가격 분석 전에 먼저 전체 텍스트를 파일로 저장 (다운로드용)
-        #try:
-            #import os
-            #if not os.path.exists('downloads'):
-            #    os.makedirs('downloads')
-
-            # CID 정보 추출
-            #cid_match = re.search(r'cid=([^&]+)', url)
-            #cid_value = cid_match.group(1) if cid_match else 'unknown'
-
-            # 파일명 생성
-            #filename = f"page_text_cid_{cid_value}.txt"
-            #filepath = os.path.join('downloads', filename)
-
-            # 전체 텍스트 저장
-            #with open(filepath, 'w', encoding='utf-8') as f:
-            #f.write(f"3------------------------\n")
-            #f.write(f"URL: {url}\n")
-            #f.write(f"CID: {cid_value}\n")
-            #f.write(f"스크래핑 시간: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            #f.write("="*50 + "\n\n")
-            #f.write(all_text)
-
-            #print(f"텍스트 파일 저장됨: {filepath}")
-
-        #except Exception as save_error:
-            #print(f"텍스트 파일 저장 오류: {save_error}")
-
-        # 두 번째 가격만 반환 (사용자 요구사항)
-        if len(all_prices) >= 2:
-            prices_found = [all_prices[1]]  # 두 번째 가격만
-        elif len(all_prices) >= 1:
-            prices_found = [all_prices[0]]  # 첫 번째라도 반환
-        else:
-            prices_found = all_prices  # 없으면 빈 리스트
+        # 스냅샷 아카이브 (SNAPSHOT_CAPTURE=1 일 때만, 압축/저장은 백그라운드)
+        from snapshot_archive import capture_snapshot
+        capture_snapshot(url, page_html, result)
 
-        return prices_found
+        # /download 용 페이지 텍스트 (변환/압축/쓰기는 백그라운드) - 저장소가 받았을 때만 page_text=True
+        if page_text_key and page_html:
+            from page_text_store import get_store
+            result = result.with_page_text(get_store().submit(page_text_key, url, page_html))
+
+        return result
 
     except Exception as e:
-        return {'prices': [], 'page_title': ''}
+        return EMPTY_RESULT
+
+    finally:
+        # 사용한 브라우저는 항상 반납 (조기 return 경로 포함)
+        if driver is not None:
+            get_pool().release(driver)
 
 def process_all_cids_sequential(base_url, cid_list):
     """
@@ -864,7 +562,7 @@ def process_all_cids_sequential(base_url, cid_list):
 
             # 스크래핑 실행
             start_time = time.time()
-            prices = scrape_prices_simple(new_url,progress_cb=progress_cb)
+            resp = scrape_prices_simple(new_url,progress_cb=progress_cb)
             process_time = time.time() - start_time
 
             # 즉시 결과 반환
@@ -874,8 +572,8 @@ def process_all_cids_sequential(base_url, cid_list):
                 'total': total_cids,
                 'cid': cid_label,
                 'url': new_url,
-                'prices': prices,
-                'found_count': len(prices),
+                'prices': resp.prices,
+                'found_count': len(resp.prices),
                 'process_time': round(process_time, 1)
             }
 
@@ -901,6 +599,54 @@ def extract_cid_from_url(url):
     match = re.search(r'cid=([^&]+)', url)
     return match.group(1) if match else None
 
+def canonical_url(url):
+    """cid 를 뺀 URL - 같은 호텔/날짜/인원 조건의 분석을 한 키로 묶는다 (파라메터 순서는 그대로)"""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    pairs = [p for p in parsed.query.split('&') if p and p.split('=', 1)[0].lower() != 'cid']
+    return urlunparse(parsed._replace(netloc=parsed.netloc.lower(), query='&'.join(pairs), fragment=''))
+
+def replace_cid_in_url(url, cid):
+    """URL의 cid 값을 교체 (없으면 추가)"""
+    original_cid = extract_cid_from_url(url)
+    if original_cid:
+        return url.replace(f"cid={original_cid}", f"cid={cid}")
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}cid={cid}"
+
+def set_stay_dates(url, check_in, los):
+    """
+    URL의 체크인/체크아웃/숙박일수(los) 교체 - 다른 파라메터는 디코딩 없이 그대로 유지
+    check_in: datetime.date, los: 숙박일수(int)
+    """
+    from datetime import timedelta
+
+    parsed_url = urlparse(url)
+    check_out = check_in + timedelta(days=int(los))
+    values = {
+        'checkin': check_in.strftime('%Y-%m-%d'),
+        'checkout': check_out.strftime('%Y-%m-%d'),
+        'los': str(int(los)),
+    }
+
+    pairs = parsed_url.query.split('&') if parsed_url.query else []
+    seen = set()
+    new_pairs = []
+    for pair in pairs:
+        key = pair.split('=', 1)[0]
+        if key.lower() in values:
+            seen.add(key.lower())
+            new_pairs.append(f"{key}={values[key.lower()]}")
+        else:
+            new_pairs.append(pair)
+    # 원본에 없던 파라메터는 camelCase 로 추가
+    for lower_key, camel_key in (('checkin', 'checkIn'), ('checkout', 'checkOut'), ('los', 'los')):
+        if lower_key not in seen:
+            new_pairs.append(f"{camel_key}={values[lower_key]}")
+
+    return urlunparse(parsed_url._replace(query="&".join(new_pairs)))
+
 def reorder_url_parameters(url):
     """
     URL의 파라메터를 지정된 순서로 재정렬하고 필요한 파라메터만 유지
@@ -0,0 +1,312 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from task_queue import is_postgres_url, sqlite_path
+from records import dumps, loads
+
+# 여러 gunicorn 워커(또는 여러 웹 노드)가 함께 보는 job 상태 - 진행률, 중단 플래그, 상태
+# - /scrape 를 처리하는 프로세스와 /progress, /cancel 을 받는 프로세스가 달라도 같은 값을 본다
+# - SHARED_STATE_URL 이 postgres(ql):// 이면 Postgres (웹 노드가 여러 대일 때), 아니면 로컬 SQLite WAL
+#   (기본 shared_state.db - 같은 머신의 워커끼리는 이것으로 충분)
+# - 읽기는 기본 키 조회 1번 (폴링 주기로 호출해도 부담 없음), 쓰기는 job 단위 upsert
+# - STATE_TTL_SEC 이 지난 job 은 주기적으로 삭제
+# 진행률은 progress_tracker.JobProgress.to_state() 형식 그대로 저장 (읽는 쪽에서 현재 시각 기준으로 계산)
+# profile: 관리 페이지(/admin/profiles)에서 켠 job 별 프로파일 플래그 - 어느 워커가 단계를 받아도 같은 값
+# job_checkpoints: /scrape 단계 결과(응답 JSON + 이어 가는 데 필요한 세션 값)를 (job, 정규화 URL, 단계) 로 저장
+#   - 워커가 재시작되거나 클라이언트가 다시 접속해도 끝난 단계는 바로 재생하고 빠진 단계만 스크래핑
+# job_trace_events: tracing.py 의 스팬 이벤트 묶음 (워커마다 job_scope 가 끝날 때 추가) - /jobs/<id>/trace 가 합친다
+
+SHARED_STATE_URL = os.environ.get("SHARED_STATE_URL", "sqlite:///shared_state.db")
+STATE_TTL_SEC = int(os.environ.get("SHARED_STATE_TTL_SEC", str(6 * 3600)))
+PURGE_EVERY = 500   # 쓰기 N 번마다 오래된 job 정리
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_state (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT,
+    status TEXT,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    progress TEXT,
+    profile INTEGER NOT NULL DEFAULT 0,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_state_updated_idx ON job_state (updated_at);
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job_id TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    cid TEXT,
+    result TEXT NOT NULL,
+    state TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (job_id, url_key, step)
+);
+CREATE INDEX IF NOT EXISTS job_checkpoints_created_idx ON job_checkpoints (created_at);
+CREATE TABLE IF NOT EXISTS job_trace_events (
+    job_id TEXT NOT NULL,
+    events TEXT NOT NULL,
+    threads TEXT,
+    dropped INTEGER NOT NULL DEFAULT 0,
+    created_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_trace_events_job_idx ON job_trace_events (job_id);
+CREATE INDEX IF NOT EXISTS job_trace_events_created_idx ON job_trace_events (created_at);
+"""
+
+# 이미 만들어진 테이블에 나중에 추가된 열 (있으면 실패 - 무시)
+_MIGRATIONS = (
+    "ALTER TABLE job_state ADD COLUMN profile INTEGER NOT NULL DEFAULT 0",
+)
+
+_COLUMNS = ('job_id', 'kind', 'status', 'cancelled', 'progress', 'updated_at')
+
+
+class SharedState:
+    def __init__(self, url=SHARED_STATE_URL):
+        self.url = url
+        self.is_postgres = is_postgres_url(url)
+        self._local = threading.local()
+        self._writes = 0
+        for statement in (s.strip() for s in _SCHEMA.split(';')):
+            if statement:
+                self._execute(statement)
+        for statement in _MIGRATIONS:
+            try:
+                self._execute(statement)
+            except Exception:
+                pass
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.is_postgres:
+                import psycopg2
+                conn = psycopg2.connect(self.url)
+                conn.autocommit = True
+            else:
+                conn = sqlite3.connect(sqlite_path(self.url), timeout=30, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql, params=(), fetch=False):
+        if self.is_postgres:
+            sql = sql.replace('?', '%s')
+        cur = self._conn().cursor()
+        try:
+            cur.execute(sql, params)
+            if fetch == 'all':
+                return cur.fetchall()
+            return cur.fetchone() if fetch else cur.rowcount
+        finally:
+            cur.close()
+
+    def _upsert(self, job_id, column, value):
+        self._execute(
+            f"INSERT INTO job_state (job_id, {column}, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT (job_id) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at",
+            (job_id, value, time.time()))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge()
+
+    # ---- 쓰기 ----
+    def start(self, job_id, kind='scrape'):
+        """새 job - 이전 상태(중단 플래그 포함)를 지우고 running 으로"""
+        self._execute(
+            "INSERT INTO job_state (job_id, kind, status, cancelled, progress, updated_at) VALUES (?, ?, 'running', 0, NULL, ?) "
+            "ON CONFLICT (job_id) DO UPDATE SET kind = excluded.kind, status = 'running', cancelled = 0, "
+            "progress = NULL, updated_at = excluded.updated_at",
+            (job_id, kind, time.time()))
+
+    def set_status(self, job_id, status):
+        self._upsert(job_id, 'status', status)
+
+    def set_progress(self, job_id, progress):
+        self._upsert(job_id, 'progress', dumps(progress))
+
+    def cancel(self, job_id):
+        now = time.time()
+        self._execute(
+            "INSERT INTO job_state (job_id, status, cancelled, updated_at) VALUES (?, 'cancelled', 1, ?) "
+            "ON CONFLICT (job_id) DO UPDATE SET status = 'cancelled', cancelled = 1, updated_at = excluded.updated_at",
+            (job_id, now))
+
+    def set_profile(self, job_id, enabled):
+        self._upsert(job_id, 'profile', 1 if enabled else 0)
+
+    def save_checkpoint(self, job_id, url_key, step, cid, result, state=None):
+        self._execute(
+            "INSERT INTO job_checkpoints (job_id, url_key, step, cid, result, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (job_id, url_key, step) DO UPDATE SET cid = excluded.cid, result = excluded.result, "
+            "state = excluded.state, created_at = excluded.created_at",
+            (job_id, url_key, step, cid, dumps(result),
+             dumps(state) if state is not None else None, time.time()))
+
+    def append_trace(self, job_id, events, threads, dropped=0):
+        self._execute(
+            "INSERT INTO job_trace_events (job_id, events, threads, dropped, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, dumps(events), dumps(threads), dropped, time.time()))
+
+    def purge(self, max_age=STATE_TTL_SEC):
+        cutoff = time.time() - max_age
+        self._execute("DELETE FROM job_checkpoints WHERE created_at < ?", (cutoff,))
+        self._execute("DELETE FROM job_trace_events WHERE created_at < ?", (cutoff,))
+        return self._execute("DELETE FROM job_state WHERE updated_at < ?", (cutoff,))
+
+    # ---- 읽기 ----
+    def get(self, job_id):
+        row = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM job_state WHERE job_id = ?", (job_id,), fetch=True)
+        if row is None:
+            return None
+        state = dict(zip(_COLUMNS, row))
+        state['cancelled'] = bool(state['cancelled'])
+        state['progress'] = loads(state['progress']) if state['progress'] else None
+        return state
+
+    def checkpoints(self, job_id, url_key, step=None):
+        """저장된 단계들 [{'step', 'cid', 'result', 'state'}] (단계 순) - step 을 주면 그 단계만"""
+        sql = "SELECT step, cid, result, state FROM job_checkpoints WHERE job_id = ? AND url_key = ?"
+        params = [job_id, url_key]
+        if step is not None:
+            sql += " AND step = ?"
+            params.append(step)
+        rows = self._execute(sql + " ORDER BY step", params, fetch='all')
+        return [{'step': row[0], 'cid': row[1], 'result': loads(row[2]),
+                 'state': loads(row[3]) if row[3] else None} for row in rows]
+
+    def trace_chunks(self, job_id):
+        """기록된 순서대로 [{'events', 'threads', 'dropped', 'created_at'}]"""
+        rows = self._execute("SELECT events, threads, dropped, created_at FROM job_trace_events WHERE job_id = ? "
+                             "ORDER BY created_at", (job_id,), fetch='all')
+        return [{'events': loads(row[0]), 'threads': loads(row[1]) if row[1] else [],
+                 'dropped': row[2], 'created_at': row[3]} for row in rows]
+
+    def is_cancelled(self, job_id):
+        row = self._execute("SELECT cancelled FROM job_state WHERE job_id = ?", (job_id,), fetch=True)
+        return bool(row and row[0])
+
+    def is_profiled(self, job_id):
+        row = self._execute("SELECT profile FROM job_state WHERE job_id = ?", (job_id,), fetch=True)
+        return bool(row and row[0])
+
+    def profiled_jobs(self):
+        return [row[0] for row in self._execute(
+            "SELECT job_id FROM job_state WHERE profile = 1 ORDER BY job_id", fetch='all')]
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = SharedState()
+        return _state
+
+
+# 스크래핑 경로에서 호출하는 함수들 - 상태 저장소 오류가 분석을 막지 않도록 예외는 로그만 남김
+def reset_job_state(job_id, kind='scrape'):
+    try:
+        get_state().start(job_id, kind)
+    except Exception as e:
+        logger.warning(f"공유 상태 기록 실패 ({job_id}): {e}")
+
+
+def set_job_status(job_id, status):
+    try:
+        get_state().set_status(job_id, status)
+    except Exception as e:
+        logger.warning(f"공유 상태 기록 실패 ({job_id}): {e}")
+
+
+def publish_progress(job_id, progress):
+    try:
+        get_state().set_progress(job_id, progress)
+    except Exception as e:
+        logger.warning(f"진행률 공유 실패 ({job_id}): {e}")
+
+
+def cancel_job(job_id):
+    get_state().cancel(job_id)
+
+
+def job_cancelled(job_id):
+    try:
+        return get_state().is_cancelled(job_id)
+    except Exception as e:
+        logger.warning(f"중단 플래그 조회 실패 ({job_id}): {e}")
+        return False
+
+
+def job_state(job_id):
+    try:
+        return get_state().get(job_id)
+    except Exception as e:
+        logger.warning(f"공유 상태 조회 실패 ({job_id}): {e}")
+        return None
+
+
+def save_checkpoint(job_id, url_key, step, cid, result, state=None):
+    try:
+        get_state().save_checkpoint(job_id, url_key, step, cid, result, state)
+    except Exception as e:
+        logger.warning(f"체크포인트 기록 실패 ({job_id} step {step}): {e}")
+
+
+def load_checkpoints(job_id, url_key, step=None):
+    try:
+        return get_state().checkpoints(job_id, url_key, step)
+    except Exception as e:
+        logger.warning(f"체크포인트 조회 실패 ({job_id}): {e}")
+        return []
+
+
+def set_job_profile(job_id, enabled):
+    try:
+        get_state().set_profile(job_id, enabled)
+    except Exception as e:
+        logger.warning(f"프로파일 플래그 기록 실패 ({job_id}): {e}")
+
+
+def job_profiled(job_id):
+    try:
+        return get_state().is_profiled(job_id)
+    except Exception as e:
+        logger.warning(f"프로파일 플래그 조회 실패 ({job_id}): {e}")
+        return False
+
+
+def profiled_jobs():
+    try:
+        return get_state().profiled_jobs()
+    except Exception as e:
+        logger.warning(f"프로파일 job 목록 조회 실패: {e}")
+        return []
+
+
+def append_trace(job_id, events, threads, dropped=0):
+    try:
+        get_state().append_trace(job_id, events, threads, dropped)
+        return True
+    except Exception as e:
+        logger.warning(f"트레이스 기록 실패 ({job_id}): {e}")
+        return False
+
+
+def load_trace(job_id):
+    """None 이면 조회 실패 (빈 목록은 기록 없음)"""
+    try:
+        return get_state().trace_chunks(job_id)
+    except Exception as e:
+        logger.warning(f"트레이스 조회 실패 ({job_id}): {e}")
+        return None
@@ -0,0 +1,119 @@
+import os
+import gzip
+import time
+import queue
+import hashlib
+import logging
+import threading
+
+from records import dumps, loads
+
+# 렌더링된 페이지 HTML 스냅샷 아카이브 (내용 주소 기반 + 중복 제거 + gzip 압축)
+#   snapshots/objects/ab/abcdef....html.gz   ← HTML 본문 (sha256 기준 1개만 저장)
+#   snapshots/index.jsonl                     ← 캡처 1건당 1줄 (정규화 URL, CID, 시각, 해시, 당시 추출 결과)
+# SNAPSHOT_CAPTURE=1 일 때만 저장하며, 압축/쓰기는 백그라운드 스레드에서 처리한다
+# 재생/회귀 검사는 replay_snapshots.py 참고
+
+SNAPSHOT_CAPTURE = os.environ.get("SNAPSHOT_CAPTURE", "0") == "1"
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+QUEUE_MAX = 64
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotArchive:
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._index_lock = threading.Lock()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.html.gz")
+
+    def put_html(self, html):
+        """HTML 저장 후 sha256 반환 (이미 있으면 쓰지 않음)"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # 원자적 교체 - 동시에 같은 페이지를 써도 안전
+        return digest, len(data)
+
+    def get_html(self, digest):
+        with gzip.open(self.object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def add(self, url, html, result, captured_at=None):
+        from scraper import reorder_url_parameters, extract_cid_from_url
+
+        digest, size = self.put_html(html)
+        entry = {
+            'ts': captured_at or time.time(),
+            'url': reorder_url_parameters(url),
+            'cid': extract_cid_from_url(url),
+            'sha256': digest,
+            'size': size,
+            'result': result,
+        }
+        line = dumps(entry)
+        with self._index_lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        return entry
+
+    def entries(self):
+        """인덱스 전체 (깨진 줄은 건너뜀)"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield loads(line)
+                except ValueError:
+                    continue
+
+
+_archive = None
+_queue = None
+_writer = None
+_init_lock = threading.Lock()
+
+
+def get_archive():
+    global _archive
+    with _init_lock:
+        if _archive is None:
+            _archive = SnapshotArchive()
+        return _archive
+
+
+def _writer_loop():
+    archive = get_archive()
+    while True:
+        url, html, result, captured_at = _queue.get()
+        try:
+            archive.add(url, html, result, captured_at)
+        except Exception as e:
+            logger.warning(f"스냅샷 저장 실패: {e}")
+
+
+def capture_snapshot(url, html, result):
+    """스크래핑 경로에서 호출 - 큐에 넣기만 하고 바로 반환 (꺼져 있으면 아무것도 안 함)"""
+    global _queue, _writer
+    if not SNAPSHOT_CAPTURE or not html:
+        return
+    with _init_lock:
+        if _writer is None or not _writer.is_alive():
+            _queue = queue.Queue(maxsize=QUEUE_MAX)
+            _writer = threading.Thread(target=_writer_loop, daemon=True)
+            _writer.start()
+    try:
+        _queue.put_nowait((url, html, result, time.time()))
+    except queue.Full:
+        logger.warning("스냅샷 큐가 가득 차서 이번 페이지는 건너뜀")
@@ -12,6 +12,16 @@ let totalSteps = 18; // 기준가격설정(1) + 검색창리스트(9) + 카드
 let currentLanguage = 'ko'; // 기본값: 한국어
 let isAnalyzing = false; // 분석 중인 상태 추적
 let abortController = null; // 중단용 AbortController
+let currentJobId = null; // 분석 1회를 묶는 job id (서버 다운로드 파일 등의 네임스페이스)
+let nextCidName = null; // 서버가 정한 다음 CID 이름 (빠른 모드에서는 순서가 분석마다 다름)
+let stepRetries = 0; // 네트워크 오류로 같은 단계를 다시 요청한 횟수
+const RUN_STORAGE_KEY = 'agodaActiveRun'; // 진행 중인 분석 (새로고침/재접속 시 이어 하기)
+const MAX_STEP_RETRIES = 3;
+// 붙여 넣은 링크가 이 형태면 분석 시작 전에 서버가 기준가를 미리 조회 (prefetch.py)
+const PREFETCH_URL_RE = /^(https?:\/\/)?([a-z0-9-]+\.)*agoda\.com\/[^?#]+\/hotel\/[^?#]+\.html?\?.*checkin=/i;
+let prefetchTimer = null;
+let lastPrefetchUrl = '';
+let prefetchDisabled = false; // 서버가 'disabled' 라고 답하면 더 보내지 않음
 
 // 부드러운 진행률 애니메이션을 위한 변수들
 let currentProgressPercentage = 0;
@@ -93,6 +103,8 @@ const translations = {
         noPrice: '가격 없음',
         errorTitle: '링크 오류',
         invalidLink: '잘못된 링크를 입력한 것 같습니다\n사용법을 확인해 주세요',
+        etaSeconds: '약 {n}초 남음',
+        etaMinutes: '약 {n}분 남음',
         ok: 'OK'
     },
     en: {
@@ -118,6 +130,8 @@ const translations = {
         noPrice: 'No Price',
         errorTitle: 'Link Error',
         invalidLink: 'It seems you entered an invalid link\nPlease check the usage guide',
+        etaSeconds: 'About {n}s left',
+        etaMinutes: 'About {n} min left',
         ok: 'OK'
     }
 };
@@ -127,9 +141,13 @@ document.addEventListener('DOMContentLoaded', function() {
     scrapeForm.addEventListener('submit', handleFormSubmit);
     continueBtn.addEventListener('click', continueAnalysis);
     newSearchBtn.addEventListener('click', startNewSearch);
+    urlInput.addEventListener('input', schedulePrefetch);
 
     // 폴링 초기화는 analyzeCid에서 시작
 
+    // 끝나지 않은 분석이 있으면 이어 하기 (완료된 단계는 서버 체크포인트에서 바로 재생)
+    resumeSavedRun();
+
     // 언어 전환 버튼
     const languageToggle = document.getElementById('languageToggle');
     if (languageToggle) {
@@ -151,15 +169,23 @@ document.addEventListener('DOMContentLoaded', function() {
 // 실시간 서브 진행률 폴링 타이머
 let stepProgressTimer = null;
 
+// 남은 시간 표시 (서버가 단계별 소요 시간 기록으로 계산한 job 전체 ETA)
+function formatEta(eta) {
+  if (typeof eta !== 'number' || eta <= 0) return ' ';
+  const t = translations[currentLanguage];
+  if (eta < 90) return t.etaSeconds.replace('{n}', Math.max(1, Math.round(eta)));
+  return t.etaMinutes.replace('{n}', Math.round(eta / 60));
+}
+
 function startStepProgressPolling() {
   stopStepProgressPolling(); // 중복 방지
   stepProgressTimer = setInterval(() => {
-    fetch('/progress')
+    fetch(`/progress?job_id=${encodeURIComponent(currentJobId || '')}`)
       .then(r => r.ok ? r.json() : null)
       .then(p => {
         if (!p) return;
         if (typeof p.pct === 'number') {
-          setStepProgress(p.pct, ' ');
+          setStepProgress(p.pct, formatEta(p.eta));
         }
       })
       .catch(() => { /* 네트워크 일시 오류 무시 */ });
@@ -174,6 +200,27 @@ function stopStepProgressPolling() {
 }
 
 
+// 링크 입력 힌트 - 입력이 잠시 멈추면 같은 링크당 한 번만 (분석은 응답을 기다리지 않음, 결과는 step 0 이 가져간다)
+function schedulePrefetch() {
+    if (prefetchDisabled) return;
+    clearTimeout(prefetchTimer);
+    prefetchTimer = setTimeout(() => {
+        const url = urlInput.value.trim();
+        if (isAnalyzing || url === lastPrefetchUrl || !PREFETCH_URL_RE.test(url)) return;
+        lastPrefetchUrl = url;
+        fetch('/prefetch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ url: url })
+        })
+            .then(r => r.json())
+            .then(data => {
+                if (data && data.status === 'disabled') prefetchDisabled = true;
+            })
+            .catch(() => { /* 힌트일 뿐 - 실패해도 분석은 평소대로 */ });
+    }, 300);
+}
+
 // 폼 제출 처리 (분석 시작/중단 토글)
 function handleFormSubmit(e) {
     e.preventDefault();
@@ -197,8 +244,17 @@ function handleFormSubmit(e) {
 function startAnalysis(url) {
 
     console.log('startAnalysis() 호출됨')
-    // 초기화
+    beginAnalysis(url, newJobId());
+
+    // 첫 번째 CID 분석 시작
+    analyzeCid();
+}
+
+// 분석 상태/화면 초기화 (새 분석, 이어 하기 공통)
+function beginAnalysis(url, jobId) {
     currentUrl = url;
+    currentJobId = jobId;
+    stepRetries = 0;
     abortController = new AbortController(); // 새 AbortController 생성
     currentStep = 0;
     allResults = [];
@@ -209,7 +265,8 @@ function startAnalysis(url) {
     lowestPriceCidName = '';
     basePrice = null;
     isAnalyzing = true;
-    totalSteps = allCids.length + 1;
+    totalSteps = allCids.length + 1;  // 빠른 모드면 step 0 응답의 total_steps 로 갱신
+    nextCidName = null;
 
     // 진행률 애니메이션 초기화 및 시작
     currentProgressPercentage = 0;
@@ -227,9 +284,95 @@ function startAnalysis(url) {
 
     // 버튼 텍스트 변경
     updateAnalysisButton();
+}
 
-    // 첫 번째 CID 분석 시작
-    analyzeCid();
+// 진행 중인 분석 기억 / 지우기
+function saveRunState() {
+    try {
+        localStorage.setItem(RUN_STORAGE_KEY, JSON.stringify({ job_id: currentJobId, url: currentUrl }));
+    } catch (e) { /* 저장소 사용 불가 - 이어 하기만 안 됨 */ }
+}
+
+function clearRunState() {
+    try {
+        localStorage.removeItem(RUN_STORAGE_KEY);
+    } catch (e) { /* 무시 */ }
+}
+
+// 새로고침/재접속 후 끊긴 분석 이어 하기
+function resumeSavedRun() {
+    let saved = null;
+    try {
+        saved = JSON.parse(localStorage.getItem(RUN_STORAGE_KEY) || 'null');
+    } catch (e) {
+        saved = null;
+    }
+    if (!saved || !saved.job_id || !saved.url) return;
+
+    fetch('/resume', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(saved)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.results || data.results.length === 0) {
+            clearRunState();
+            return;
+        }
+        urlInput.value = saved.url;
+        beginAnalysis(saved.url, saved.job_id);
+        data.results.forEach(result => {
+            if (result.total_steps) totalSteps = result.total_steps;
+            nextCidName = result.next_cid_name || null;
+            processResult(result);
+        });
+        if (data.finished) {
+            showComplete();
+            return;
+        }
+        currentStep = data.next_step;
+        analyzeCid();
+    })
+    .catch(error => console.error('이어 하기 실패:', error));
+}
+
+// 빠른 모드(기본) / 전체 CID 검사
+function analysisMode() {
+    const toggle = document.getElementById('fullScanToggle');
+    return toggle && toggle.checked ? 'full' : 'fast';
+}
+
+// 검색창리스트 CID 인지 (빠른 모드에서는 검색창/카드 CID 가 섞여서 진행됨)
+function isSearchCidName(name) {
+    return searchCids.some(c => c.name === name);
+}
+
+// 같은 가격으로 묶여 생략된 CID 표시
+function equivalentNote(data) {
+    if (!data.equivalent_cids || data.equivalent_cids.length === 0) {
+        return '';
+    }
+    return `<div class="small text-muted">= ${data.equivalent_cids.join(', ')}</div>`;
+}
+
+// 시간 예산이 모자라 스크래핑하지 않은 CID 표시 (캐시 가격 / 생략)
+function budgetNote(data) {
+    if (data.stale) {
+        return `<div class="small text-warning">${data.prices[0].context}</div>`;
+    }
+    if (data.dropped) {
+        return '<div class="small text-muted">시간 예산 초과로 생략</div>';
+    }
+    return '';
+}
+
+// 분석마다 새 job id
+function newJobId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID().replace(/-/g, '').slice(0, 16);
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 10);
 }
 
 // 분석 중단
@@ -247,7 +390,8 @@ function stopAnalysis() {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
-        }
+        },
+        body: JSON.stringify({ job_id: currentJobId })
     }).then(response => response.json())
     .then(data => {
         console.log('서버 중단 응답:', data);
@@ -257,6 +401,7 @@ function stopAnalysis() {
 
     // 분석 상태 초기화
     isAnalyzing = false;
+    clearRunState();
 
     // 진행률 애니메이션 중지
     stopSmoothProgress();
@@ -324,7 +469,9 @@ function analyzeCid() {
         },
         body: JSON.stringify({
             url: currentUrl,
-            step: currentStep
+            step: currentStep,
+            job_id: currentJobId,
+            mode: analysisMode()
         }),
         signal: abortController ? abortController.signal : undefined
     })
@@ -370,11 +517,22 @@ function analyzeCid() {
 
         stopStepProgressPolling();
         //if (typeof data.subprogress_pct === 'number') {
-        setStepProgress(data.subprogress_pct, ' ');
+        setStepProgress(data.subprogress_pct, formatEta(data.eta));
         //}
 
+        // 서버가 정한 CID 순서/개수 반영
+        if (data.total_steps) {
+            totalSteps = data.total_steps;
+        }
+        nextCidName = data.next_cid_name || null;
+        if (data.stopped_early) {
+            console.log(`빠른 모드 조기 종료 - ${data.skipped_count}개 CID 생략`);
+        }
+
         // 결과 처리
+        stepRetries = 0;
         processResult(data);
+        saveRunState();
 
         // 다음 단계가 있는지 확인 - 자동으로 계속 진행
         if (data.has_next) {
@@ -399,6 +557,16 @@ function analyzeCid() {
             return;
         }
 
+        // 네트워크 끊김/워커 재시작 - 같은 단계를 다시 요청 (서버에 끝난 결과가 있으면 바로 재생됨)
+        if (isAnalyzing && stepRetries < MAX_STEP_RETRIES) {
+            stepRetries++;
+            console.log(`단계 ${currentStep} 재시도 (${stepRetries}/${MAX_STEP_RETRIES})`);
+            setTimeout(() => {
+                if (isAnalyzing) analyzeCid();
+            }, 2000 * stepRetries);
+            return;
+        }
+
         showError('분석 중 오류가 발생했습니다: ' + error.message);
     });
 }
@@ -531,7 +699,7 @@ function displaySearchResult(data) {
         <div class="search-result-card">
             <div class="text-center">
                 ${priceDisplay}
-                <div class="search-result-name mb-2">${data.cid_name}</div>
+                <div class="search-result-name mb-2">${data.cid_name}${equivalentNote(data)}${budgetNote(data)}</div>
                 <button class="btn btn-outline-primary btn-sm search-open-btn" 
                         data-url="${data.url}" 
                         ${!hasPrice ? 'disabled' : ''}>
@@ -587,7 +755,7 @@ function displayCardResult(data) {
     cardCol.innerHTML = `
         <div class="card-result-item ${cardClass}">
             <div class="d-flex justify-content-between align-items-center mb-2">
-                <h6 class="mb-0">${data.cid_name}</h6>
+                <h6 class="mb-0">${data.cid_name}${equivalentNote(data)}${budgetNote(data)}</h6>
                 ${badgeText ? `<span class="badge ${badgeClass}">${badgeText}</span>` : ''}
             </div>
             <div class="text-center">
@@ -745,9 +913,8 @@ function updateProgress() {
         // step 0은 기준가격 설정, step 1부터 allCids[0] 처리
         if (currentStep === 0) {
             currentCidNameEl.textContent = '기준 가격';
-        } else if (currentStep <= allCids.length) {
-            const currentCid = allCids[currentStep - 1];  // step 1: allCids[0], step 2: allCids[1] ...
-            currentCidNameEl.textContent = currentCid.name;
+        } else if (nextCidName) {
+            currentCidNameEl.textContent = nextCidName;
         }
     }
 
@@ -756,7 +923,7 @@ function updateProgress() {
     if (currentStep === 0) {
         isSearchPhase = false;  // 기준가격은 검색창리스트에 표시하지 않음
     } else {
-        isSearchPhase = currentStep <= searchCids.length;  // step 1부터 searchCids 처리
+        isSearchPhase = isSearchCidName(nextCidName);
     }
 
     if (currentPhaseEl) {
@@ -772,9 +939,8 @@ function updateProgress() {
         // step 0은 기준가격 설정, step 1부터 allCids[0] 처리
         if (currentStep === 0) {
             loadingCid.textContent = '기준 가격';
-        } else if (currentStep <= allCids.length) {
-            const currentCid = allCids[currentStep - 1];  // step 1: allCids[0], step 2: allCids[1] ...
-            loadingCid.textContent = currentCid.name;
+        } else if (nextCidName) {
+            loadingCid.textContent = nextCidName;
         }
     }
 }
@@ -786,8 +952,8 @@ function showContinueButton(nextStep) {
     if (nextCidInfo) {
         if (nextStep === 0) {
             nextCidInfo.textContent = '기준가격 설정';
-        } else if (nextStep <= allCids.length) {
-            nextCidInfo.textContent = allCids[nextStep - 1].name;  // step 1: allCids[0], step 2: allCids[1] ...
+        } else if (nextCidName) {
+            nextCidInfo.textContent = nextCidName;
         }
     }
 
@@ -798,6 +964,7 @@ function showContinueButton(nextStep) {
 // 완료 표시
 function showComplete() {
     console.log('🎯 showComplete() 함수 호출됨');
+    clearRunState();
 
     // 부드러운 진행률 애니메이션 중지
     stopSmoothProgress();
@@ -893,9 +1060,10 @@ function updateAnalysisButton() {
 
 // 숫자 가격 추출 (비교용)
 function extractNumericPrice(priceString) {
-    const matches = priceString.match(/[\d,]+/);
+    // 소수점 포함 (USD 46.50 → 46.5)
+    const matches = String(priceString).match(/\d[\d,]*(?:\.\d+)?/);
     if (matches) {
-        return parseInt(matches[0].replace(/,/g, ''));
+        return parseFloat(matches[0].replace(/,/g, ''));
     }
     return null;
 }
@@ -1116,7 +1284,7 @@ function updateDynamicTexts() {
     // 진행률 페이즈 업데이트
     const currentPhase = document.getElementById('currentPhase');
     if (currentPhase) {
-        const isSearchPhase = currentStep < searchCids.length;
+        const isSearchPhase = isSearchCidName(nextCidName);
         currentPhase.textContent = isSearchPhase ? t.searchPhase : t.cardPhase;
     }
 
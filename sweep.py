@@ -0,0 +1,286 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from cids import ALL_CIDS, CID_NAMES
+from scraper import (extract_cid_from_url, replace_cid_in_url, set_stay_dates,
+                     reorder_url_parameters, scrape_prices_simple)
+from records import CidResult, ScrapeResult, EMPTY_RESULT, encode_batch
+from async_orchestrator import ASYNC_ORCHESTRATOR, get_orchestrator
+from tracing import job_scope, span, instant
+from shared_state import reset_job_state, set_job_status, publish_progress, cancel_job, job_cancelled
+from profiling import is_job_enabled, enable_job, enable_for_thread, disable_for_thread
+from scheduler import get_scheduler
+
+# 체크인 날짜 스윕: 호텔 URL 하나를 (체크인 날짜 × 숙박일수 × CID) 격자로 펼쳐서 한 번에 비교
+# 1단계: 날짜별 기준가(첫 CID)만 먼저 조회
+# 2단계: 기준가가 싼 날짜부터 나머지 CID 를 브라우저 풀 크기만큼 병렬로 조회
+# 결과는 들어오는 대로 job.results 에 쌓이고, /sweep/<id> 폴링으로 달력 행렬을 받아간다
+
+SWEEP_CONCURRENCY = int(os.environ.get("SWEEP_CONCURRENCY", os.environ.get("BROWSER_POOL_SIZE", "2")))
+MAX_SWEEP_DAYS = 31
+MAX_SWEEP_CELLS = 1000
+MAX_KEPT_JOBS = 20
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def _url_check_in(url):
+    match = re.search(r'[?&]check[Ii]n=(\d{4}-\d{2}-\d{2})', url)
+    return _parse_date(match.group(1)) if match else None
+
+
+def _url_los(url):
+    match = re.search(r'[?&]los=(\d+)', url)
+    return int(match.group(1)) if match else 1
+
+
+def expand_sweep_grid(url, start_date=None, days=7, los_list=None, cids=None):
+    """
+    URL → [(check_in, los, cid, cid_name, url), ...]
+    start_date 가 없으면 URL 의 checkIn, los_list 가 없으면 URL 의 los 를 사용
+    """
+    start = _parse_date(start_date) if start_date else (_url_check_in(url) or date.today())
+    days = max(1, min(int(days), MAX_SWEEP_DAYS))
+    los_list = [int(x) for x in (los_list or [_url_los(url)])]
+    cids = list(cids or ALL_CIDS)
+
+    cells = []
+    for offset in range(days):
+        check_in = start + timedelta(days=offset)
+        for los in los_list:
+            dated_url = set_stay_dates(url, check_in, los)
+            for cid, cid_name in cids:
+                cell_url = reorder_url_parameters(replace_cid_in_url(dated_url, cid))
+                cells.append((check_in, los, cid, cid_name, cell_url))
+
+    if len(cells) > MAX_SWEEP_CELLS:
+        raise ValueError(f"스윕 범위가 너무 큽니다 ({len(cells)}칸 > {MAX_SWEEP_CELLS}칸)")
+    return cells
+
+
+class SweepJob:
+    """스윕 1건의 상태 - 결과는 완료되는 순서대로 results 에 추가된다"""
+
+    def __init__(self, url, cells, base_cid, currency=None, lane='bulk', tenant=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.cells = cells
+        self.base_cid = base_cid
+        self.currency = currency
+        self.lane = lane          # scheduler 레인 - 셀(CID) 1건마다 자리를 받고 반납한다
+        self.tenant = tenant
+        self.results = []
+        self.status = 'running'
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+        try:
+            cancel_job(self.id)
+        except Exception as e:
+            logger.warning(f"스윕 중단 플래그 기록 실패: {e}")
+        if ASYNC_ORCHESTRATOR:
+            get_orchestrator().cancel_job(self.id)
+
+    @property
+    def cancelled(self):
+        # 다른 워커가 받은 /sweep/<id>/cancel 은 공유 상태로 전달된다
+        if not self._cancel.is_set() and job_cancelled(self.id):
+            self._cancel.set()
+        return self._cancel.is_set()
+
+    def add_result(self, cell, resp, elapsed):
+        check_in, los, cid, cid_name, cell_url = cell
+        # 달력에는 첫 가격만 필요 - 셀 수천 개를 들고 있어도 가볍게 (호텔명/객실 요금은 버린다)
+        resp = ScrapeResult(prices=ScrapeResult.coerce(resp).prices[:1])
+        record = CidResult.build(cid, cid_name, resp, currency=self.currency, url=cell_url,
+                                 check_in=check_in.isoformat(), los=los, process_time=round(elapsed, 1))
+        with self._lock:
+            self.results.append(record)
+            done = len(self.results)
+        publish_progress(self.id, {'done': done, 'total': len(self.cells)})
+
+    def results_since(self, cursor=0):
+        with self._lock:
+            return list(self.results[cursor:])
+
+    def calendar(self):
+        """(숙박일수, 체크인) 별 CID 가격 행렬과 최저가 CID - 통화가 섞여 있으면 ValueError"""
+        from comparison import build_price_matrix, compare_matrix
+
+        results = self.results_since(0)
+        los_values = sorted({c[1] for c in self.cells})
+        dates = sorted({c[0].isoformat() for c in self.cells})
+        cids = list(dict.fromkeys(c[2] for c in self.cells))
+        # PriceQuote 그대로 - 같은 숙박일수 행에 통화가 섞이면 build_price_matrix 가 ValueError
+        records = [(r.los, r.cid, r.check_in, r.quote) for r in results]
+        matrix = build_price_matrix(records, hotels=los_values, cids=cids, dates=dates)
+        summary = compare_matrix(matrix, base_cid=self.base_cid)
+        rows = summary.to_rows()
+        for row in rows:
+            row['los'] = row.pop('hotel')
+            row['best_cid_name'] = CID_NAMES.get(row['best_cid'], row['best_cid'])
+        return {
+            'dates': dates,
+            'los': los_values,
+            'cids': [{'cid': c, 'name': CID_NAMES.get(c, c)} for c in cids],
+            'rows': rows,
+        }
+
+    def to_dict(self, cursor=0, compact=False, calendar=True):
+        results = self.results_since(cursor)
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'total': len(self.cells),
+            'done': len(self.results),
+            'cursor': len(self.results),
+            # compact: {'fields': [...], 'rows': [[...]]} - 셀마다 키를 반복하지 않는다
+            'results': encode_batch(results) if compact else [r.to_dict() for r in results],
+            'calendar': self.calendar() if calendar else None,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class SweepBusyError(Exception):
+    """보관 중인 스윕이 모두 실행 중이라 새 스윕을 받을 수 없음"""
+
+
+def get_sweep(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _remember(job):
+    """새 스윕 보관 - 끝난 스윕부터 오래된 순으로 정리하고, 실행 중인 스윕은 건드리지 않는다
+    (MAX_KEPT_JOBS 개가 모두 실행 중이면 SweepBusyError)"""
+    with _jobs_lock:
+        while len(_jobs) >= MAX_KEPT_JOBS:
+            finished = [j for j in _jobs.values() if j.status != 'running']
+            if not finished:
+                raise SweepBusyError(f"실행 중인 스윕이 너무 많습니다 ({MAX_KEPT_JOBS}개) - 잠시 후 다시 시도해 주세요")
+            del _jobs[min(finished, key=lambda j: j.created_at).id]
+        _jobs[job.id] = job
+
+
+def _run_cell(job, cell):
+    if job.cancelled:
+        return None
+    start = time.time()
+    if is_job_enabled(job.id):
+        enable_for_thread(job.id)
+    try:
+        with job_scope(job.id, cid=cell[2], check_in=cell[0].isoformat(), los=cell[1]), span('cid', phase='sweep'), \
+                get_scheduler().slot(job.lane, job.tenant):
+            if job.cancelled:   # 자리를 기다리는 동안 중단됨
+                return None
+            start = time.time()   # 처리 시간에 자리 대기는 넣지 않는다
+            resp = scrape_prices_simple(cell[4], original_currency_code=job.currency)
+    except Exception as e:
+        logger.warning(f"스윕 셀 실패 {cell[0]} {cell[2]}: {e}")
+        resp = EMPTY_RESULT
+    finally:
+        disable_for_thread()
+    _record_cell(job, cell, resp, time.time() - start)
+    return resp
+
+
+def _record_cell(job, cell, resp, elapsed):
+    job.add_result(cell, resp, elapsed)
+    with job_scope(job.id, cid=cell[2], check_in=cell[0].isoformat(), los=cell[1]):
+        instant('emit', found_count=len(resp.prices))
+
+
+async def _run_cells_async(job, cells):
+    """ASYNC_ORCHESTRATOR=1 - 셀마다 스레드를 쓰지 않고 오케스트레이터 루프에서 브라우저 수만큼 동시에"""
+    orchestrator = get_orchestrator()
+
+    async def one(cell):
+        start = time.time()
+        with job_scope(job.id, cid=cell[2], check_in=cell[0].isoformat(), los=cell[1]), span('cid', phase='sweep'):
+            resp = await orchestrator.scrape(cell[4], original_currency_code=job.currency, job_id=job.id,
+                                             lane=job.lane, tenant=job.tenant)
+        _record_cell(job, cell, resp, time.time() - start)
+
+    await asyncio.gather(*(one(c) for c in cells if not job.cancelled), return_exceptions=True)
+
+
+def _run_cells(job, cells, pool):
+    if ASYNC_ORCHESTRATOR:
+        orchestrator = get_orchestrator()
+        orchestrator.run_sync(_run_cells_async(job, cells))
+    else:
+        list(pool.map(lambda c: _run_cell(job, c), cells))
+
+
+def _run_sweep(job):
+    try:
+        base_cells = [c for c in job.cells if c[2] == job.base_cid]
+        other_cells = [c for c in job.cells if c[2] != job.base_cid]
+
+        with ThreadPoolExecutor(max_workers=max(1, SWEEP_CONCURRENCY)) as pool:
+            # 1단계: 날짜별 기준가
+            _run_cells(job, base_cells, pool)
+
+            # 2단계: 기준가가 싼 (날짜, 숙박일수) 부터 - 기준가를 못 구한 날짜는 맨 뒤
+            base_amount = {(r.check_in, r.los): r.amount for r in job.results_since(0)}
+
+            def sort_key(cell):
+                amount = base_amount.get((cell[0].isoformat(), cell[1]))
+                return (amount is None, amount or 0, cell[0], cell[1])
+
+            other_cells.sort(key=sort_key)
+            _run_cells(job, other_cells, pool)
+
+        job.status = 'cancelled' if job.cancelled else 'done'
+    except Exception as e:
+        logger.error(f"스윕 실패: {e}")
+        job.status = 'error'
+    finally:
+        job.finished_at = time.time()
+        set_job_status(job.id, job.status)
+
+
+def start_sweep(url, start_date=None, days=7, los_list=None, cids=None, profile=False, lane='bulk', tenant=None):
+    """스윕 작업을 백그라운드로 시작하고 SweepJob 반환 (lane: 'bulk' 또는 예약 갱신용 'scheduled')"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    currency_match = re.search(r'currencyCode=([^&]+)', url) or re.search(r'[?&]currency=([^&]+)', url)
+    currency = currency_match.group(1) if currency_match else None
+
+    cells = expand_sweep_grid(url, start_date=start_date, days=days, los_list=los_list, cids=cids)
+
+    # 기준 CID: 원본 URL 의 CID 가 비교 목록에 있으면 그것, 아니면 첫 번째 CID
+    cid_values = [c[2] for c in cells]
+    original_cid = extract_cid_from_url(url)
+    base_cid = original_cid if original_cid in cid_values else cid_values[0]
+
+    job = SweepJob(url, cells, base_cid, currency=currency, lane=lane, tenant=tenant)
+    _remember(job)
+    reset_job_state(job.id, kind='sweep')
+    with job_scope(job.id):
+        instant('admission', cells=len(cells))
+    if profile:
+        enable_job(job.id)
+    threading.Thread(target=_run_sweep, args=(job,), daemon=True).start()
+    return job
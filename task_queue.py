@@ -0,0 +1,302 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from cids import ALL_CIDS, CID_NAMES
+from records import dumps, loads
+
+# 여러 대의 머신에서 CID 스크래핑을 나눠 처리하기 위한 DB 기반 작업 큐
+# - DATABASE_URL 이 postgres(ql):// 이면 Postgres (psycopg2), 아니면 SQLite (로컬 개발용, 기본 task_queue.db)
+# - 워커는 작업을 VISIBILITY_TIMEOUT 동안 임대(lease)하고 HEARTBEAT_SEC 마다 연장한다
+# - 임대가 만료된 작업(워커가 죽은 경우)은 다시 queued 로 돌아가고, MAX_ATTEMPTS 를 넘으면 failed
+# - 웹 노드는 enqueue_comparison() 으로 넣고 job_summary() 로 결과를 모으기만 한다
+# 워커 실행: python worker.py (worker.py 참고)
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///task_queue.db")
+VISIBILITY_TIMEOUT = float(os.environ.get("TASK_VISIBILITY_TIMEOUT", "90"))
+HEARTBEAT_SEC = float(os.environ.get("TASK_HEARTBEAT_SEC", "15"))
+MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", "3"))
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_tasks (
+    id {id_type} PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    cid TEXT,
+    cid_name TEXT,
+    phase TEXT,
+    url TEXT NOT NULL,
+    currency TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until DOUBLE PRECISION,
+    result TEXT,
+    error TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrape_tasks_status_idx ON scrape_tasks (status, id);
+CREATE INDEX IF NOT EXISTS scrape_tasks_job_idx ON scrape_tasks (job_id, seq);
+"""
+
+_COLUMNS = "id, job_id, seq, cid, cid_name, phase, url, currency, status, worker_id, attempts"
+
+
+def is_postgres_url(url):
+    return url.startswith(('postgres://', 'postgresql://'))
+
+
+def sqlite_path(url):
+    """sqlite:///상대경로, sqlite:////절대경로, 또는 그냥 파일 경로"""
+    return url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+
+
+class TaskQueue:
+    def __init__(self, url=DATABASE_URL):
+        self.url = url
+        self.is_postgres = is_postgres_url(url)
+        self._local = threading.local()
+        self.init_schema()
+
+    # ---- 연결 ----
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.is_postgres:
+                import psycopg2
+                conn = psycopg2.connect(self.url)
+            else:
+                # isolation_level=None: 트랜잭션을 직접 BEGIN IMMEDIATE 로 연다
+                conn = sqlite3.connect(sqlite_path(self.url), timeout=30, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _sql(self, sql):
+        return sql.replace('?', '%s') if self.is_postgres else sql
+
+    def _run(self, fn):
+        """fn(cursor) 를 한 트랜잭션으로 실행 (SQLite 는 쓰기 잠금을 먼저 잡는다)"""
+        conn = self._conn()
+        cur = conn.cursor()
+        try:
+            if not self.is_postgres:
+                cur.execute("BEGIN IMMEDIATE")
+            result = fn(cur)
+            if self.is_postgres:
+                conn.commit()
+            else:
+                cur.execute("COMMIT")
+            return result
+        except Exception:
+            if self.is_postgres:
+                conn.rollback()
+            else:
+                try:
+                    cur.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            raise
+        finally:
+            cur.close()
+
+    def init_schema(self):
+        id_type = "BIGSERIAL" if self.is_postgres else "INTEGER"
+        statements = [s.strip() for s in _SCHEMA.format(id_type=id_type).split(';') if s.strip()]
+
+        def create(cur):
+            for statement in statements:
+                cur.execute(statement)
+        self._run(create)
+
+    # ---- 웹 노드 ----
+    def enqueue(self, job_id, tasks):
+        """tasks: [{'cid', 'cid_name', 'phase', 'url', 'currency'}, ...] (순서 = seq)"""
+        now = time.time()
+        rows = [(job_id, seq, t.get('cid'), t.get('cid_name'), t.get('phase'), t['url'], t.get('currency'), now, now)
+                for seq, t in enumerate(tasks)]
+
+        def insert(cur):
+            cur.executemany(self._sql(
+                "INSERT INTO scrape_tasks (job_id, seq, cid, cid_name, phase, url, currency, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"), rows)
+        self._run(insert)
+        return len(rows)
+
+    def job_tasks(self, job_id):
+        def select(cur):
+            cur.execute(self._sql(
+                f"SELECT {_COLUMNS}, result, error FROM scrape_tasks WHERE job_id = ? ORDER BY seq"), (job_id,))
+            return cur.fetchall()
+        names = _COLUMNS.split(', ') + ['result', 'error']
+        tasks = []
+        for row in self._run(select):
+            task = dict(zip(names, row))
+            task['result'] = loads(task['result']) if task['result'] else None
+            tasks.append(task)
+        return tasks
+
+    def cancel_job(self, job_id):
+        def cancel(cur):
+            cur.execute(self._sql(
+                "UPDATE scrape_tasks SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status = 'queued'"),
+                (time.time(), job_id))
+            return cur.rowcount
+        return self._run(cancel)
+
+    # ---- 워커 ----
+    def requeue_expired(self):
+        """임대가 만료된 작업을 다시 queued 로 (시도 횟수를 넘었으면 failed)"""
+        now = time.time()
+
+        def requeue(cur):
+            cur.execute(self._sql(
+                "UPDATE scrape_tasks SET status = 'failed', error = 'lease expired', worker_id = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?"), (now, now, MAX_ATTEMPTS))
+            failed = cur.rowcount
+            cur.execute(self._sql(
+                "UPDATE scrape_tasks SET status = 'queued', worker_id = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_until < ?"), (now, now))
+            return cur.rowcount, failed
+        requeued, failed = self._run(requeue)
+        if requeued or failed:
+            logger.warning(f"만료된 임대 {requeued}건 재등록, {failed}건 실패 처리")
+        return requeued
+
+    def lease(self, worker_id, limit=1):
+        """queued 작업을 limit 개까지 임대 - 다른 워커와 같은 작업을 가져가지 않는다"""
+        now = time.time()
+        names = _COLUMNS.split(', ')
+
+        def take(cur):
+            if self.is_postgres:
+                cur.execute(
+                    "UPDATE scrape_tasks SET status = 'leased', worker_id = %s, lease_until = %s, "
+                    "attempts = attempts + 1, updated_at = %s "
+                    "WHERE id IN (SELECT id FROM scrape_tasks WHERE status = 'queued' "
+                    "ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED) "
+                    f"RETURNING {_COLUMNS}",
+                    (worker_id, now + VISIBILITY_TIMEOUT, now, limit))
+                return cur.fetchall()
+            # SQLite: BEGIN IMMEDIATE 로 쓰기 잠금을 잡은 상태라 SELECT 후 UPDATE 가 원자적
+            cur.execute(f"SELECT {_COLUMNS} FROM scrape_tasks WHERE status = 'queued' ORDER BY id LIMIT ?", (limit,))
+            rows = cur.fetchall()
+            for row in rows:
+                cur.execute(
+                    "UPDATE scrape_tasks SET status = 'leased', worker_id = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + VISIBILITY_TIMEOUT, now, row[0]))
+            return [row[:8] + ('leased', worker_id, row[10] + 1) for row in rows]
+
+        return [dict(zip(names, row)) for row in self._run(take)]
+
+    def _update_owned(self, task_id, worker_id, sets, params):
+        def update(cur):
+            cur.execute(self._sql(
+                f"UPDATE scrape_tasks SET {sets}, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'leased'"),
+                (*params, time.time(), task_id, worker_id))
+            return cur.rowcount == 1
+        return self._run(update)
+
+    def heartbeat(self, task_id, worker_id):
+        """임대 연장 - False 면 이미 다른 워커에게 넘어간 작업"""
+        return self._update_owned(task_id, worker_id, "lease_until = ?", (time.time() + VISIBILITY_TIMEOUT,))
+
+    def complete(self, task_id, worker_id, result):
+        return self._update_owned(task_id, worker_id, "status = 'done', result = ?, error = NULL",
+                                  (dumps(result),))
+
+    def fail(self, task_id, worker_id, error, attempts):
+        """실패 - 시도 횟수가 남아 있으면 다시 queued"""
+        status = 'failed' if attempts >= MAX_ATTEMPTS else 'queued'
+        return self._update_owned(task_id, worker_id, "status = ?, error = ?, worker_id = NULL",
+                                  (status, str(error)[:500]))
+
+
+def build_comparison_tasks(url, cids=ALL_CIDS):
+    """호텔 URL 하나 → 기준가(원본 CID) + CID 별 작업 목록 (/scrape 와 같은 URL 정규화)"""
+    import re
+    from scraper import extract_cid_from_url, replace_cid_in_url, reorder_url_parameters
+
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    currency_match = re.search(r'currencyCode=([^&]+)', url)
+    currency = currency_match.group(1) if currency_match else None
+    base_url = reorder_url_parameters(url)
+    if not currency:
+        currency_param = re.search(r'[?&]currency=([^&]+)', base_url)
+        currency = currency_param.group(1) if currency_param else None
+
+    original_cid = extract_cid_from_url(url)
+    tasks = [{
+        'cid': original_cid,
+        'cid_name': CID_NAMES.get(original_cid, f'원본 CID({original_cid})') if original_cid else '기준가격 설정',
+        'phase': 'base',
+        'url': base_url,
+        'currency': currency,
+    }]
+    for cid, name in cids:
+        tasks.append({
+            'cid': cid,
+            'cid_name': name,
+            'phase': 'cid',
+            'url': reorder_url_parameters(replace_cid_in_url(url, cid)),
+            'currency': currency,
+        })
+    return tasks
+
+
+def enqueue_comparison(job_id, url):
+    tasks = build_comparison_tasks(url)
+    get_queue().enqueue(job_id, tasks)
+    return len(tasks)
+
+
+def job_summary(job_id):
+    """작업 상태 + 기준가 대비 할인율 (웹 노드에서 결과 집계) - records.JobSummary"""
+    from records import CidResult, JobSummary
+    from price_quote import parse_price
+
+    tasks = get_queue().job_tasks(job_id)
+    if not tasks:
+        return None
+
+    base_task = next((t for t in tasks if t['phase'] == 'base' and t['status'] == 'done'), None)
+    base_quote = None
+    if base_task:
+        base_prices = (base_task['result'] or {}).get('prices') or []
+        base_quote = parse_price(base_prices[0]['price'], default_currency=base_task['currency']) if base_prices else None
+
+    counts = {}
+    results = []
+    for task in tasks:
+        counts[task['status']] = counts.get(task['status'], 0) + 1
+        done = task['status'] == 'done'
+        results.append(CidResult.build(
+            task['cid'], task['cid_name'], task['result'] if done else None, currency=task['currency'], url=task['url'],
+            base=base_quote if task['phase'] != 'base' else None,
+            process_time=(task['result'] or {}).get('elapsed', 0.0), phase=task['phase'], status=task['status'],
+            attempts=task['attempts'], worker_id=task['worker_id'], error=task['error']))
+
+    return JobSummary(job_id=job_id, total=len(tasks),
+                      finished=sum(counts.get(s, 0) for s in ('done', 'failed', 'cancelled')), counts=counts,
+                      base_price=str(base_quote.amount) if base_quote else None, results=tuple(results))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = TaskQueue()
+        return _queue
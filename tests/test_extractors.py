@@ -0,0 +1,55 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scraper
+from extractors import AGODA, CandidateMatcher
+from scraper import extract_from_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fixture_html(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_sticky_price_wins_over_candidates():
+    result = extract_from_html(fixture_html('sticky_price.html'), currency='KRW')
+    assert [p.price for p in result.prices] == ['₩ 95,000']
+    assert result.page_title == 'Sample Hotel Seoul'
+
+
+def test_starting_price_from_page_text():
+    result = extract_from_html(fixture_html('starting_price.html'), currency='KRW')
+    assert [p.price for p in result.prices] == ['₩ 88,500']
+    assert result.prices[0].source == 'starting_price_from_file'
+
+
+def test_no_starting_price_returns_empty_result():
+    result = extract_from_html(fixture_html('no_starting_price.html'), currency='KRW')
+    assert result.prices == ()
+
+
+def test_candidates_are_opt_in_and_match_url_currency(monkeypatch):
+    monkeypatch.setattr(scraper, 'FALLBACK_CANDIDATES', True)
+    html = fixture_html('no_starting_price.html')
+
+    # 원화 호텔에서 $ 후보는 가격으로 쓰지 않는다
+    assert extract_from_html(html, currency='KRW').prices == ()
+    # 통화를 모르면 후보를 쓰지 않는다
+    assert extract_from_html(html).prices == ()
+    # 같은 통화면 후보 순서대로 (평균 가격 문구는 제외)
+    prices = [p.price for p in extract_from_html(html, currency='USD').prices]
+    assert prices[:2] == ['$129', '$150']
+    assert '$210' not in prices
+
+
+@pytest.mark.parametrize('name', ['sticky_price.html', 'starting_price.html', 'no_starting_price.html'])
+def test_candidate_matcher_matches_soup_select(name):
+    soup = BeautifulSoup(fixture_html(name), 'html.parser')
+    selectors = AGODA['candidates'] + ['div', 'h1[data-selenium="hotel-header-name"]', '[data-element-cheapest-room-price]']
+    buckets = CandidateMatcher(selectors).match(soup)
+    for selector, elements in zip(selectors, buckets):
+        assert [id(e) for e in elements] == [id(e) for e in soup.select(selector)], selector
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+
+# 작업(job) 단위 스팬 타임라인 - Chrome trace-event 형식으로 내보냄 (chrome://tracing, Perfetto, speedscope)
+# - job_scope(job_id, cid=...) 안에서 호출되는 span()/instant() 가 해당 job 에 기록된다
+# - job 이 없으면 span() 은 아무것도 하지 않는다
+# - 워커 메모리에 최근 MAX_TRACES 개 job 만 보관 (LRU)
+# - job_id 를 준 job_scope 가 끝날 때마다 새 이벤트를 shared_state(job_trace_events)에 묶어서 추가
+#   → 한 job 의 단계가 여러 워커에 나뉘어도 조회하는 워커가 모든 워커의 이벤트를 합쳐서 돌려준다
+# 조회: GET /jobs/<job_id>/trace
+
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "1") == "1"
+MAX_TRACES = int(os.environ.get("TRACE_MAX_JOBS", "100"))
+MAX_EVENTS_PER_TRACE = int(os.environ.get("TRACE_MAX_EVENTS", "20000"))
+
+_current = contextvars.ContextVar('agoda_job_trace', default=None)   # (JobTrace, tags)
+_traces = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def _now_us():
+    return time.time() * 1_000_000
+
+
+class JobTrace:
+    """job 1건의 이벤트 목록"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.created_at = time.time()
+        self.events = []
+        self.dropped = 0
+        self._threads = {}
+        self._flushed = 0           # 공유 저장소에 보낸 이벤트 수
+        self._flushed_dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # 같은 구간을 두 번 보내지 않도록 (스윕 셀 스레드들이 동시에 끝남)
+
+    def add(self, event):
+        thread = threading.current_thread()
+        event['pid'] = os.getpid()
+        event['tid'] = thread.ident
+        with self._lock:
+            self._threads[(event['pid'], thread.ident)] = thread.name
+            if len(self.events) >= MAX_EVENTS_PER_TRACE:
+                self.dropped += 1
+                return
+            self.events.append(event)
+
+    def flush(self):
+        """아직 보내지 않은 이벤트를 shared_state 에 한 묶음으로 추가 (실패하면 다음에 다시)"""
+        from shared_state import append_trace
+
+        with self._flush_lock:
+            with self._lock:
+                events = self.events[self._flushed:]
+                dropped = self.dropped - self._flushed_dropped
+                if not events and not dropped:
+                    return True
+                threads = [[pid, tid, name] for (pid, tid), name in self._threads.items()]
+                end = len(self.events)
+            if not append_trace(self.job_id, events, threads, dropped):
+                return False
+            with self._lock:
+                self._flushed = end
+                self._flushed_dropped += dropped
+            return True
+
+    def pending(self):
+        """공유 저장소에 아직 없는 이벤트/스레드 이름"""
+        with self._lock:
+            return (self.events[self._flushed:], [[pid, tid, name] for (pid, tid), name in self._threads.items()],
+                    self.dropped - self._flushed_dropped)
+
+    def to_chrome(self):
+        with self._lock:
+            events = list(self.events)
+            threads = [[pid, tid, name] for (pid, tid), name in self._threads.items()]
+        return _chrome_json(self.job_id, self.created_at, events, threads, self.dropped)
+
+
+def _chrome_json(job_id, created_at, events, threads, dropped):
+    threads = {(pid, tid): name for pid, tid, name in threads}
+    meta = [{
+        'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+        'args': {'name': f"worker {pid}"},
+    } for pid in sorted({pid for pid, _ in threads})]
+    meta += [{
+        'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+        'args': {'name': name},
+    } for (pid, tid), name in threads.items()]
+    return {
+        'traceEvents': meta + sorted(events, key=lambda e: e['ts']),
+        'displayTimeUnit': 'ms',
+        'otherData': {'job_id': job_id, 'created_at': created_at, 'dropped_events': dropped},
+    }
+
+
+def _trace_for(job_id):
+    with _traces_lock:
+        trace = _traces.get(job_id)
+        if trace is None:
+            trace = _traces[job_id] = JobTrace(job_id)
+            while len(_traces) > MAX_TRACES:
+                _traces.popitem(last=False)
+        else:
+            _traces.move_to_end(job_id)
+        return trace
+
+
+def get_trace(job_id):
+    """Chrome trace-event JSON (dict) - 모든 워커가 공유 저장소에 남긴 이벤트 + 이 워커의 아직 안 보낸 이벤트
+    없으면 None"""
+    from shared_state import load_trace
+
+    with _traces_lock:
+        trace = _traces.get(job_id)
+    if trace is not None:
+        trace.flush()
+    chunks = load_trace(job_id)
+    if chunks is None:
+        # 공유 저장소를 못 읽으면 이 워커의 기록만
+        return trace.to_chrome() if trace else None
+    events, threads, dropped = [], [], 0
+    for chunk in chunks:
+        events.extend(chunk['events'])
+        threads.extend(chunk['threads'])
+        dropped += chunk['dropped']
+    if trace is not None:
+        local_events, local_threads, local_dropped = trace.pending()
+        events.extend(local_events)
+        threads.extend(local_threads)
+        dropped += local_dropped
+    if not events and trace is None:
+        return None
+    created_at = min([c['created_at'] for c in chunks] + ([trace.created_at] if trace else []))
+    return _chrome_json(job_id, created_at, events, threads, dropped)
+
+
+@contextmanager
+def job_scope(job_id=None, **tags):
+    """이 블록 안의 span 을 job_id 에 기록 (job_id 가 없으면 바깥 job 을 이어받고 태그만 추가)"""
+    current = _current.get()
+    if not TRACE_ENABLED or (job_id is None and current is None):
+        yield
+        return
+    trace = _trace_for(job_id) if job_id is not None else current[0]
+    merged = dict(current[1]) if current and current[0] is trace else {}
+    merged.update({k: v for k, v in tags.items() if v is not None})
+    token = _current.set((trace, merged))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        if job_id is not None:
+            trace.flush()
+
+
+@contextmanager
+def span(name, cat='scrape', **args):
+    """구간 하나를 "X"(complete) 이벤트로 기록"""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    trace, tags = current
+    start = _now_us()
+    try:
+        yield
+    except BaseException as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        trace.add({
+            'name': name, 'cat': cat, 'ph': 'X',
+            'ts': start, 'dur': _now_us() - start,
+            'args': {**tags, **args},
+        })
+
+
+def instant(name, cat='scrape', **args):
+    """시점 하나를 "i" 이벤트로 기록 (접수, 결과 전송 등)"""
+    current = _current.get()
+    if current is None:
+        return
+    trace, tags = current
+    trace.add({
+        'name': name, 'cat': cat, 'ph': 'i', 's': 't',
+        'ts': _now_us(),
+        'args': {**tags, **args},
+    })
@@ -0,0 +1,128 @@
+"""
+스크래핑 워커 - 공유 작업 큐(task_queue.py)에서 CID 작업을 임대해서 scrape_prices_simple 로 처리
+
+사용법:
+    DATABASE_URL=postgresql://user:pass@db/agoda python worker.py --concurrency 2
+    python worker.py                                   # 로컬 SQLite (task_queue.db)
+    python worker.py --scrape-fn mymodule:fake_scrape  # 크롬 없이 동작 확인용 대체 함수
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+import importlib
+import threading
+
+import task_queue
+from task_queue import TaskQueue, HEARTBEAT_SEC
+from records import ScrapeResult
+
+POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "1.0"))
+
+logger = logging.getLogger("worker")
+
+
+def load_scrape_fn(spec):
+    """'모듈:함수' → 함수 (기본: scraper.scrape_prices_simple)"""
+    module_name, _, attr = (spec or 'scraper:scrape_prices_simple').partition(':')
+    return getattr(importlib.import_module(module_name), attr or 'scrape_prices_simple')
+
+
+class Worker:
+    def __init__(self, queue, scrape_fn, worker_id, concurrency=1):
+        self.queue = queue
+        self.scrape_fn = scrape_fn
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        if not self._stop.is_set():
+            logger.info("종료 요청 - 진행 중인 작업만 마치고 종료합니다")
+        self._stop.set()
+
+    def _heartbeat_loop(self, task, done):
+        while not done.wait(HEARTBEAT_SEC):
+            try:
+                if not self.queue.heartbeat(task['id'], self.worker_id):
+                    logger.warning(f"작업 {task['id']} 임대를 잃었습니다 (다른 워커에게 재할당됨)")
+                    return
+            except Exception as e:
+                logger.warning(f"하트비트 실패 {task['id']}: {e}")
+
+    def process(self, task):
+        from page_text_store import make_key
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(task, done), daemon=True)
+        heartbeat.start()
+        start = time.time()
+        try:
+            kwargs = {'original_currency_code': task['currency']}
+            if task['cid']:
+                kwargs['page_text_key'] = make_key(task['job_id'], task['url'], task['cid'])
+            resp = ScrapeResult.coerce(self.scrape_fn(task['url'], **kwargs))
+            # /scrape 와 같이 가격을 못 찾으면 1회 재시도
+            if not resp.prices:
+                resp = ScrapeResult.coerce(self.scrape_fn(task['url'], **kwargs))
+            result = dict(resp.to_dict(), elapsed=round(time.time() - start, 2), worker_id=self.worker_id)
+            if not self.queue.complete(task['id'], self.worker_id, result):
+                logger.warning(f"작업 {task['id']} 결과 버림 - 임대가 만료되어 다른 워커가 처리 중")
+        except Exception as e:
+            logger.error(f"작업 {task['id']} 실패 (CID {task['cid']}): {e}")
+            self.queue.fail(task['id'], self.worker_id, e, task['attempts'])
+        finally:
+            done.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.queue.requeue_expired()
+                tasks = self.queue.lease(self.worker_id, limit=1)
+            except Exception as e:
+                logger.error(f"작업 큐 조회 실패: {e}")
+                tasks = []
+            if not tasks:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            for task in tasks:
+                logger.info(f"작업 {task['id']} 시작: job {task['job_id']} CID {task['cid_name']}({task['cid']})")
+                self.process(task)
+
+    def run(self):
+        threads = [threading.Thread(target=self._loop, name=f"worker-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=0.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공유 작업 큐 스크래핑 워커")
+    parser.add_argument('--database-url', default=task_queue.DATABASE_URL)
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get("BROWSER_POOL_SIZE", "1")),
+                        help="동시에 처리할 작업 수 (크롬 인스턴스 수)")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument('--scrape-fn', default=None, help="'모듈:함수' 형식의 대체 스크래핑 함수")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    worker = Worker(TaskQueue(args.database_url), load_scrape_fn(args.scrape_fn),
+                    args.worker_id, concurrency=args.concurrency)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    logger.info(f"워커 시작: {args.worker_id} (동시 {worker.concurrency}개)")
+    worker.run()
+    if args.scrape_fn is None:
+        from browser_pool import get_pool
+        get_pool().shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())